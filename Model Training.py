@@ -28,6 +28,9 @@ from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
 import warnings
 import pickle
+
+from token_sampler import TokenSampler
+from seq2seq_decoder import Seq2SeqDecoder
 warnings.filterwarnings('ignore')
 
 print("STEP 1: CREATING SAMPLE DATA")
@@ -1448,44 +1451,34 @@ print("\n" + "="*60)
 print("CREATING RESPONSE GENERATOR WITH DYNAMIC DATA")
 print("="*60)
 
-def decode_sequence_simple(input_seq):
-    """Simple greedy decoding for pattern-based model"""
-    states_value = encoder_model.predict(input_seq, verbose=0)
-
-    target_seq = np.zeros((1, 1))
-    target_seq[0, 0] = output_tokenizer.word_index['<OOV>']
-
-    decoded_sentence = ''
-    max_decoded_len = 30
-
-    for _ in range(max_decoded_len):
-        output_tokens, h, c = decoder_model.predict(
-            [target_seq] + states_value, verbose=0)
-
-        # Greedy decoding
-        sampled_token_index = np.argmax(output_tokens[0, -1, :])
-        sampled_word = None
-
-        for word, index in output_tokenizer.word_index.items():
-            if index == sampled_token_index:
-                sampled_word = word
+# Greedy picks plus an id -> word table for the decoder below
+output_sampler = TokenSampler.from_tokenizer(output_tokenizer, vocab_size=vocab_size)
+
+# Batched decoding: the <OOV> id starts a response, padding or <OOV> ends it
+max_decoded_len = 30
+response_decoder = Seq2SeqDecoder(encoder_model, decoder_model, output_sampler,
+                                  start_id=output_tokenizer.word_index['<OOV>'],
+                                  stop_ids=[0, output_tokenizer.word_index['<OOV>']],
+                                  max_length=max_decoded_len)
+
+def decode_sequences_simple(input_seqs, beam_width=1, length_penalty=0.6):
+    """Greedy (or beam search for beam_width > 1) decoding of a batch for pattern-based model"""
+    decoded_sentences = []
+    for response in response_decoder.decode(input_seqs, beam_width=beam_width, length_penalty=length_penalty):
+        decoded_sentence = ''
+        for sampled_word in response.split(' ') if response else []:
+            decoded_sentence += ' ' + sampled_word
+
+            # Stop if we predict end of sentence
+            if sampled_word in ['.', '!', '?'] and len(decoded_sentence) > 10:
                 break
+        decoded_sentences.append(decoded_sentence.strip())
 
-        if sampled_word is None or sampled_word == '<OOV>':
-            break
-
-        decoded_sentence += ' ' + sampled_word
-
-        # Stop if we predict end of sentence
-        if sampled_word in ['.', '!', '?'] and len(decoded_sentence) > 10:
-            break
+    return decoded_sentences
 
-        # Update
-        target_seq = np.zeros((1, 1))
-        target_seq[0, 0] = sampled_token_index
-        states_value = [h, c]
-
-    return decoded_sentence.strip()
+def decode_sequence_simple(input_seq):
+    """Simple greedy decoding for pattern-based model"""
+    return decode_sequences_simple(input_seq)[0]
 
 def generate_response_with_data(user_input, user_data=None):
     """
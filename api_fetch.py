@@ -0,0 +1,213 @@
+"""
+Cached HTTP fetching shared by the APIDataFetchers
+
+CachedFetchMixin requests API endpoints through a pooled requests
+session and applies the HTTPResponseCache rules: fresh entries are
+served from disk, stale ones are revalidated with a conditional request,
+and in offline mode only the cache is consulted. Streamed bodies are
+spooled to the cache while they are read and replayed from disk.
+"""
+
+import os
+import threading
+from typing import Iterator, Optional
+
+import requests
+
+
+class CachedFetchMixin:
+    """
+    HTTP requests for a fetcher with session, http_cache (or None) and offline attributes
+    """
+
+    def fetch_from_api(self, api_url: str, params: dict = None,
+                       headers: dict = None, method: str = 'GET',
+                       data: dict = None, timeout: int = 30) -> Optional[dict]:
+        """
+        Fetch data from a single API endpoint
+
+        With an HTTP cache, entries younger than the cache TTL are served
+        without touching the network and older ones are revalidated with
+        If-None-Match / If-Modified-Since, a 304 being answered from disk.
+        In offline mode only the cache is consulted.
+        """
+        cache_key, cached = None, None
+        if self.http_cache is not None:
+            cache_key = self.http_cache.make_key(method, api_url, params, data)
+            cached, servable = self.http_cache.lookup(cache_key, self.offline)
+            if servable:
+                return cached['data']
+
+        if self.offline:
+            if self.http_cache is not None:
+                self.http_cache.record('miss')
+            print(f"Offline: no cached response for {api_url}")
+            return None
+
+        try:
+            # Update headers if provided
+            request_headers = self.session.headers.copy()
+            if headers:
+                request_headers.update(headers)
+
+            # Conditional request for a stale cache entry
+            if cached is not None:
+                request_headers.update(self.http_cache.conditional_headers(cached))
+
+            if method.upper() == 'GET':
+                response = self.session.get(
+                    api_url,
+                    params=params,
+                    headers=request_headers,
+                    timeout=timeout
+                )
+            elif method.upper() == 'POST':
+                response = self.session.post(
+                    api_url,
+                    json=data,
+                    params=params,
+                    headers=request_headers,
+                    timeout=timeout
+                )
+            else:
+                raise ValueError(f"Unsupported HTTP method: {method}")
+
+            if response.status_code == 304 and cached is not None:
+                # Unchanged: restart the entry's TTL, keeping any validators the server didn't resend
+                self.http_cache.put_response(cache_key, api_url, method, cached['data'],
+                                             response.headers, previous=cached)
+                self.http_cache.record('revalidated')
+                return cached['data']
+
+            response.raise_for_status()
+
+            # Try to parse JSON
+            try:
+                result = response.json()
+            except:
+                # If not JSON, return as text
+                result = {"text": response.text}
+
+            if self.http_cache is not None:
+                self.http_cache.record('miss')
+                if self.http_cache.storable(response.headers):
+                    self.http_cache.put_response(cache_key, api_url, method, result, response.headers)
+            return result
+
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching {api_url}: {e}")
+            if cached is not None:
+                # Better stale data than none when the server is unreachable
+                print(f"Serving stale cached response for {api_url}")
+                self.http_cache.record('stale')
+                return cached['data']
+            return None
+        except Exception as e:
+            print(f"Unexpected error with {api_url}: {e}")
+            return None
+
+    def open_api_stream(self, api_url: str, params: dict = None,
+                        headers: dict = None, method: str = 'GET',
+                        data: dict = None, timeout: int = 30,
+                        chunk_size: int = 1 << 16) -> Optional[Iterator[bytes]]:
+        """
+        Raw response body of an endpoint as byte chunks, for the streaming extractors
+
+        Follows the same HTTP cache rules as fetch_from_api; the body is
+        spooled to the cache while it is read and replayed from disk on a
+        fresh hit or a 304.
+        """
+        cache_key, cached = None, None
+        if self.http_cache is not None:
+            cache_key = self.http_cache.make_key(method, api_url, params, data, variant='stream')
+            cached, servable = self.http_cache.lookup(cache_key, self.offline, with_body=True)
+            if servable:
+                return self._iter_file_chunks(self.http_cache.body_path(cache_key), chunk_size)
+
+        if self.offline:
+            if self.http_cache is not None:
+                self.http_cache.record('miss')
+            print(f"Offline: no cached response for {api_url}")
+            return None
+
+        try:
+            request_headers = self.session.headers.copy()
+            if headers:
+                request_headers.update(headers)
+            if cached is not None:
+                request_headers.update(self.http_cache.conditional_headers(cached))
+
+            if method.upper() not in ('GET', 'POST'):
+                raise ValueError(f"Unsupported HTTP method: {method}")
+            response = self.session.request(
+                method.upper(),
+                api_url,
+                params=params,
+                json=data if method.upper() == 'POST' else None,
+                headers=request_headers,
+                timeout=timeout,
+                stream=True
+            )
+
+            if response.status_code == 304 and cached is not None:
+                response.close()
+                self.http_cache.put_response(cache_key, api_url, method, None, response.headers, previous=cached)
+                self.http_cache.record('revalidated')
+                return self._iter_file_chunks(self.http_cache.body_path(cache_key), chunk_size)
+
+            response.raise_for_status()
+
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching {api_url}: {e}")
+            if cached is not None:
+                print(f"Serving stale cached response for {api_url}")
+                self.http_cache.record('stale')
+                return self._iter_file_chunks(self.http_cache.body_path(cache_key), chunk_size)
+            return None
+        except Exception as e:
+            print(f"Unexpected error with {api_url}: {e}")
+            return None
+
+        if self.http_cache is None:
+            return self._iter_response_chunks(response, chunk_size)
+
+        self.http_cache.record('miss')
+        if not self.http_cache.storable(response.headers):
+            return self._iter_response_chunks(response, chunk_size)
+        return self._spool_response_chunks(response, chunk_size, cache_key, api_url, method)
+
+    @staticmethod
+    def _iter_file_chunks(path: str, chunk_size: int) -> Iterator[bytes]:
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    @staticmethod
+    def _iter_response_chunks(response, chunk_size: int) -> Iterator[bytes]:
+        try:
+            yield from response.iter_content(chunk_size=chunk_size)
+        finally:
+            response.close()
+
+    def _spool_response_chunks(self, response, chunk_size: int, cache_key: str,
+                               api_url: str, method: str) -> Iterator[bytes]:
+        # Pass chunks through while writing them to the cache; only a fully read body is committed
+        body_path = self.http_cache.body_path(cache_key)
+        tmp_path = f"{body_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        complete = False
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            response.close()
+            if complete:
+                os.replace(tmp_path, body_path)
+                self.http_cache.put_response(cache_key, api_url, method, None, response.headers)
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,161 @@
+"""
+Fast drop-in encoder for a fitted Keras Tokenizer
+
+Imports a Tokenizer's settings and vocabulary (fitted in memory or
+unpickled from disk) into one word -> id table that already folds in
+num_words and the OOV token. Each text is then lower-cased, filtered and
+split by C-level string methods and looked up with a single map over the
+table, giving exactly what Tokenizer.texts_to_sequences gives without its
+per-word Python loop. Generation loops can append the ids of each new
+word to an existing sequence instead of re-encoding the whole text for
+every token.
+"""
+
+import itertools
+import pickle
+from typing import Iterable, List
+
+# Table value of words Keras leaves out: cut off by num_words without an OOV token, or empty
+_DROP = -1
+
+
+class FastTokenizer:
+    """
+    Batch and incremental texts_to_sequences over a compiled vocabulary table
+    """
+
+    def __init__(self, word_index: dict, num_words: int = None, oov_token: str = None,
+                 filters: str = '!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n', lower: bool = True,
+                 split: str = ' ', char_level: bool = False, analyzer=None):
+        self.word_index = word_index
+        self.num_words = num_words
+        self.oov_token = oov_token
+        self.filters = filters
+        self.lower = lower
+        self.split = split
+        self.char_level = char_level
+        self.analyzer = analyzer
+
+        # What Keras emits for a word: its id, the OOV id once num_words cuts it off, or nothing
+        oov_id = word_index.get(oov_token)
+        self.unknown_id = _DROP if oov_token is None else oov_id
+        cut_id = _DROP if oov_id is None else oov_id
+        self.table = {word: idx if not num_words or idx < num_words else cut_id
+                      for word, idx in word_index.items()}
+        # Splitting leaves empty strings between repeated separators; Keras drops them
+        self.table[''] = _DROP
+
+        # Filter characters become the split string, as in text_to_word_sequence
+        self.translate_map = str.maketrans({c: split for c in filters}) if filters else None
+
+        # Analyzers and character-level tokenizers keep the original Keras loop
+        self.exact_only = analyzer is not None or char_level
+        self._encode_cache = {}
+
+    @classmethod
+    def from_keras(cls, tokenizer) -> 'FastTokenizer':
+        """
+        Compile the vocabulary and settings of a Keras Tokenizer
+        """
+        fast_tokenizer = cls(tokenizer.word_index, num_words=tokenizer.num_words,
+                             oov_token=tokenizer.oov_token, filters=tokenizer.filters,
+                             lower=tokenizer.lower, split=tokenizer.split,
+                             char_level=tokenizer.char_level, analyzer=getattr(tokenizer, 'analyzer', None))
+        fast_tokenizer.source = tokenizer
+        return fast_tokenizer
+
+    @classmethod
+    def load(cls, tokenizer_path: str) -> 'FastTokenizer':
+        """
+        Compile a pickled Keras Tokenizer
+        """
+        with open(tokenizer_path, 'rb') as f:
+            return cls.from_keras(pickle.load(f))
+
+    def matches(self, tokenizer) -> bool:
+        """
+        Whether this table still reflects tokenizer (fitting or loading replaces its word_index)
+        """
+        return (tokenizer.word_index is self.word_index and tokenizer.num_words == self.num_words
+                and tokenizer.oov_token == self.oov_token)
+
+    def _split(self, text: str) -> List[str]:
+        # text_to_word_sequence without dropping the empty strings
+        if self.lower:
+            text = text.lower()
+        if self.translate_map is not None:
+            text = text.translate(self.translate_map)
+        return text.split(self.split)
+
+    def tokens(self, text: str) -> List[str]:
+        """
+        Words of a text, as text_to_word_sequence splits them
+        """
+        return [token for token in self._split(text) if token]
+
+    def _encode_exact(self, text) -> List[int]:
+        # The Keras loop itself, for analyzers, character level and list inputs
+        if self.char_level or isinstance(text, list):
+            if self.lower:
+                text = [item.lower() for item in text] if isinstance(text, list) else text.lower()
+            words = text
+        elif self.analyzer is not None:
+            words = self.analyzer(text)
+        else:
+            words = self.tokens(text)
+
+        oov_id = self.word_index.get(self.oov_token)
+        sequence = []
+        for word in words:
+            idx = self.word_index.get(word)
+            if idx is not None:
+                if self.num_words and idx >= self.num_words:
+                    if oov_id is not None:
+                        sequence.append(oov_id)
+                else:
+                    sequence.append(idx)
+            elif self.oov_token is not None:
+                sequence.append(oov_id)
+        return sequence
+
+    def _encode_fast(self, text: str) -> List[int]:
+        ids = list(map(self.table.get, self._split(text), itertools.repeat(self.unknown_id)))
+        if _DROP in ids:
+            ids = [idx for idx in ids if idx != _DROP]
+        return ids
+
+    def encode(self, text: str) -> List[int]:
+        """
+        Ids of one text, as texts_to_sequences([text])[0]
+        """
+        if self.exact_only or not isinstance(text, str):
+            return self._encode_exact(text)
+
+        # Generation appends the same few words over and over
+        if len(text) > 64:
+            return self._encode_fast(text)
+        cached = self._encode_cache.get(text)
+        if cached is None:
+            cached = self._encode_fast(text)
+            if len(self._encode_cache) < 100000:
+                self._encode_cache[text] = cached
+        return list(cached)
+
+    def texts_to_sequences(self, texts: Iterable[str]) -> List[List[int]]:
+        """
+        Batch encode, same output as Tokenizer.texts_to_sequences
+        """
+        if self.exact_only:
+            return [self._encode_exact(text) for text in texts]
+        encode_fast = self._encode_fast
+        return [encode_fast(text) if isinstance(text, str) else self._encode_exact(text) for text in texts]
+
+    def append(self, sequence: List[int], text: str) -> List[int]:
+        """
+        Extend sequence in place with the ids of text and return it
+
+        Matches encoding the original text and text joined by the split
+        string, e.g. seed_text + " " + next_word with the default split.
+        """
+        sequence.extend(self.encode(text))
+        return sequence
@@ -0,0 +1,157 @@
+"""
+On-disk HTTP response cache shared by the API fetchers
+
+HTTPResponseCache keeps parsed responses with their ETag / Last-Modified
+validators, so a repeated fetch within the TTL is served locally and an
+expired one can be revalidated with a conditional request.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+
+class HTTPResponseCache:
+    """
+    Persistent cache of parsed API responses with ETag/Last-Modified validators
+    """
+
+    def __init__(self, cache_dir: str, ttl: float = 3600.0):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.counts = {'hit': 0, 'revalidated': 0, 'miss': 0, 'stale': 0}
+
+    @staticmethod
+    def make_key(method: str, url: str, params: dict = None, body=None, variant: str = None) -> str:
+        """
+        Key on method, URL, params and a hash of the request body
+
+        variant separates entries for the same request, e.g. 'stream' for raw bodies.
+        """
+        body_hash = hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        parts = [method.upper(), url, params or {}, body_hash]
+        if variant:
+            parts.append(variant)
+        return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def body_path(self, key: str) -> str:
+        """
+        File holding the raw response body of a streamed entry
+        """
+        return os.path.join(self.cache_dir, f"{key}.body")
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Stored entry for a key, fresh or not, or None
+        """
+        try:
+            with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry: dict) -> bool:
+        """
+        Whether an entry can be served without asking the server
+        """
+        return self.ttl is not None and time.time() - entry['stored_at'] <= self.ttl
+
+    def lookup(self, key: str, offline: bool = False, with_body: bool = False) -> Tuple[Optional[dict], bool]:
+        """
+        Stored entry for a key (or None) and whether it can be served as is
+
+        An entry is served as is when it is fresh, or in offline mode when
+        it exists at all; that counts as a hit. with_body ignores streamed
+        entries whose body file is gone.
+        """
+        entry = self.get(key)
+        if entry is not None and with_body and not os.path.exists(self.body_path(key)):
+            entry = None
+        if entry is not None and (offline or self.is_fresh(entry)):
+            self.record('hit')
+            return entry, True
+        return entry, False
+
+    @staticmethod
+    def conditional_headers(entry: dict) -> dict:
+        """
+        If-None-Match / If-Modified-Since headers revalidating a stale entry
+        """
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    @staticmethod
+    def storable(response_headers) -> bool:
+        """
+        Whether the server allows storing a response
+        """
+        return 'no-store' not in response_headers.get('Cache-Control', '')
+
+    def put_response(self, key: str, url: str, method: str, data, response_headers, previous: dict = None):
+        """
+        put() with the validators of an HTTP response
+
+        After a 304, previous is the revalidated entry: its validators are
+        kept where the server didn't resend them.
+        """
+        previous = previous or {}
+        self.put(key, url, method, data,
+                 etag=response_headers.get('ETag', previous.get('etag')),
+                 last_modified=response_headers.get('Last-Modified', previous.get('last_modified')))
+
+    def put(self, key: str, url: str, method: str, data, etag: str = None, last_modified: str = None):
+        """
+        Store a parsed response with its validators
+        """
+        entry = {
+            'url': url,
+            'method': method.upper(),
+            'stored_at': time.time(),
+            'etag': etag,
+            'last_modified': last_modified,
+            'data': data
+        }
+        # Write then rename, so concurrent readers never see a half-written entry
+        disk_path = self._disk_path(key)
+        tmp_path = f"{disk_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, disk_path)
+
+    def record(self, outcome: str):
+        """
+        Count one lookup: 'hit', 'revalidated' (304), 'miss' or 'stale'
+        """
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def clear(self):
+        """
+        Delete every stored response
+        """
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(('.json', '.body')):
+                os.remove(os.path.join(self.cache_dir, filename))
+
+    def stats(self) -> dict:
+        """
+        Lookup counts and the share answered without a full download
+        """
+        with self._lock:
+            counts = dict(self.counts)
+        lookups = sum(counts.values())
+        counts['from_cache_rate'] = (lookups - counts['miss']) / lookups if lookups else 0.0
+        return counts
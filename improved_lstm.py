@@ -11,7 +11,7 @@ import numpy as np
 import pandas as pd
 import tensorflow as tf
 from tensorflow.keras.models import Sequential, load_model
-from tensorflow.keras.layers import LSTM, Dense, Embedding, Dropout, Bidirectional, GlobalAveragePooling1D
+from tensorflow.keras.layers import LSTM, Dense, Embedding, Dropout, Bidirectional, GlobalAveragePooling1D, Input
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping
 from tensorflow.keras.preprocessing.text import Tokenizer
@@ -19,143 +19,624 @@ from tensorflow.keras.preprocessing.sequence import pad_sequences
 import pickle
 import os
 import json
-from typing import List, Tuple, Dict, Optional, Union
+from typing import List, Tuple, Dict, Optional, Union, Iterable, Iterator, Callable
 import re
 import requests
+import asyncio
+import functools
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import urlparse, urljoin
+import queue
 import hashlib
 import random
-from collections import defaultdict
-
-class APIDataFetcher:
+import sys
+from contextlib import contextmanager
+from collections import defaultdict, OrderedDict
+import itertools
+import string
+import zlib
+import sqlite3
+
+from token_sampler import TokenSampler
+from fast_tokenizer import FastTokenizer
+from api_fetch import CachedFetchMixin
+from model_bundle import ModelBundleMixin
+from json_stream import JSONEventStream
+from http_cache import HTTPResponseCache
+from async_fetch import TokenBucket, run_coroutine
+from training_checkpoint import CheckpointedTrainingMixin, TrainingCheckpoint
+from text_stream import stream_cleaned_texts, write_jsonl_texts
+from token_corpus import TokenCorpus
+from sampled_softmax import SampledSoftmaxLoss, sampled_softmax_passthrough_loss
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class APIDataFetcher(CachedFetchMixin):
     """
     Fetches and processes data from API URLs
     """
 
-    def __init__(self, max_workers: int = 5):
+    def __init__(self, max_workers: int = 5, per_host_limit: int = 4,
+                 requests_per_second: float = 5.0, burst: float = None,
+                 cache_dir: str = None, cache_ttl: float = 3600.0, offline: bool = False):
         self.max_workers = max_workers
+        # Optional on-disk HTTP cache; offline=True answers from it without any network access
+        self.http_cache = HTTPResponseCache(cache_dir, ttl=cache_ttl) if cache_dir else None
+        self.offline = offline
+        # Politeness limits, applied per host: concurrent requests and request rate
+        self.per_host_limit = per_host_limit
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        # Shared by the threaded pagination path: next free request slot per host
+        self._host_next_slot = {}
+        self._throttle_lock = threading.Lock()
         self.session = requests.Session()
+        # One pooled connection per worker thread
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(10, max_workers))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         self.session.headers.update({
             'User-Agent': 'LSTM-Model-Trainer/1.0',
             'Accept': 'application/json',
             'Content-Type': 'application/json'
         })
 
-    def fetch_from_api(self, api_url: str, params: dict = None,
-                       headers: dict = None, method: str = 'GET',
-                       data: dict = None, timeout: int = 30) -> Optional[dict]:
+    PROPERTY_FIELDS = ('id', 'price', 'location', 'property_type', 'bedrooms', 'area')
+
+    @classmethod
+    def _is_property_item(cls, obj: dict) -> bool:
+        # Looks like a property/item object: a property field among at least 3 fields
+        return len(obj) >= 3 and any(key in obj for key in cls.PROPERTY_FIELDS)
+
+    @classmethod
+    def _walk_structured(cls, obj) -> Iterator[dict]:
         """
-        Fetch data from a single API endpoint
+        Outermost property objects in document order, without recursion
         """
-        try:
-            # Update headers if provided
-            request_headers = self.session.headers.copy()
-            if headers:
-                request_headers.update(headers)
-
-            if method.upper() == 'GET':
-                response = self.session.get(
-                    api_url,
-                    params=params,
-                    headers=request_headers,
-                    timeout=timeout
-                )
-            elif method.upper() == 'POST':
-                response = self.session.post(
-                    api_url,
-                    json=data,
-                    params=params,
-                    headers=request_headers,
-                    timeout=timeout
-                )
+        stack = [iter([obj])]
+        while stack:
+            for value in stack[-1]:
+                if isinstance(value, dict):
+                    if cls._is_property_item(value):
+                        yield value
+                    else:
+                        stack.append(iter(value.values()))
+                        break
+                elif isinstance(value, list):
+                    stack.append(iter(value))
+                    break
             else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-
-            response.raise_for_status()
-
-            # Try to parse JSON
-            try:
-                return response.json()
-            except:
-                # If not JSON, return as text
-                return {"text": response.text}
-
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching {api_url}: {e}")
-            return None
-        except Exception as e:
-            print(f"Unexpected error with {api_url}: {e}")
-            return None
+                stack.pop()
 
     def extract_structured_data(self, response_data: Union[dict, list, str]) -> List[dict]:
         """
         Extract structured data from API responses for paragraph creation
         """
-        structured_items = []
+        return list(self._walk_structured(response_data))
 
-        def extract_items(obj, path=""):
-            if isinstance(obj, dict):
-                # Check if this looks like a property/item object
-                has_property_fields = any(key in obj for key in ['id', 'price', 'location', 'property_type', 'bedrooms', 'area'])
+    def extract_structured_data_stream(self, chunks: Iterable[bytes], captured: dict = None,
+                                       max_item_chars: int = 1 << 20) -> Iterator[dict]:
+        """
+        Yield property objects from a raw JSON byte stream without building the document
 
-                if has_property_fields and len(obj) >= 3:  # At least 3 relevant fields
-                    structured_items.append(obj)
-                else:
-                    for key, value in obj.items():
-                        extract_items(value, f"{path}.{key}")
+        Objects are judged as their keys arrive: one becomes an item as soon
+        as it has a property field among at least 3 fields, and is yielded
+        whole once it closes. An enclosing object that only qualifies after
+        items were already yielded from inside it is not yielded again, and
+        objects larger than max_item_chars are never kept whole. Otherwise
+        the result matches extract_structured_data.
+
+        captured maps dotted paths (e.g. 'links.next') to None and is filled
+        in with the values found there, e.g. for pagination.
+        """
+        stream = JSONEventStream(chunks, max_subtree_chars=max_item_chars)
+        # Paths are only tracked as deep as the deepest captured path
+        capture_depth = max((capture_path.count('.') + 1 for capture_path in captured), default=0) if captured else 0
+        # One dict per open container. state: 'open' (judging), 'match' (an item being built),
+        # 'building' (inside an item) or 'closed' (can no longer be kept whole)
+        frames = []
+
+        def child_path(frame: dict) -> str:
+            # Path of the value being completed in a container: its key or array index
+            return f"{frame['path']}.{frame['key']}" if frame['path'] else str(frame['key'])
+
+        def close_all():
+            for frame in frames:
+                frame['state'] = 'closed'
+                frame['container'] = None
+
+        def attach(frame: dict, value):
+            # frame is always the innermost open container
+            container = frame['container']
+            if container is None:
+                return
+            if frame['kind'] == 'map':
+                container[frame['key']] = value
+                if frame['state'] == 'open' and self._is_property_item(container):
+                    frame['state'] = 'match'
+            else:
+                container.append(value)
+            if stream.offset - frame['start'] > max_item_chars:
+                # Too big to keep whole; enclosing containers are bigger still
+                close_all()
+
+        for event, value in stream.events():
+            if event == 'key':
+                frames[-1]['key'] = value
+                continue
 
-            elif isinstance(obj, list):
-                for item in obj:
-                    extract_items(item, path)
+            if event in ('start_map', 'start_array'):
+                parent = frames[-1] if frames else None
+                frames.append({
+                    'kind': 'map' if event == 'start_map' else 'array',
+                    'container': {} if event == 'start_map' else [],
+                    'key': None if event == 'start_map' else 0,
+                    'start': stream.offset - 1,
+                    'state': 'building' if parent and parent['state'] in ('match', 'building') else 'open',
+                    'path': child_path(parent) if parent and len(frames) <= capture_depth else ''
+                })
+                continue
 
-        extract_items(response_data)
-        return structured_items
+            judged = event in ('end_map', 'end_array')
+            if judged:
+                frame = frames.pop()
+                value = frame['container']
+                if frame['state'] == 'match' and value is not None:
+                    yield value
+                    close_all()
+                    value = None
+                if value is None:
+                    if frames and frames[-1]['kind'] == 'array':
+                        frames[-1]['key'] += 1
+                    continue
+
+            parent = frames[-1] if frames else None
+
+            if captured and len(frames) <= capture_depth:
+                path = child_path(parent) if parent else ''
+                for capture_path in captured:
+                    if capture_path == path:
+                        captured[capture_path] = value
+                    elif isinstance(value, (dict, list)) and (not path or capture_path.startswith(f"{path}.")):
+                        captured[capture_path] = self._lookup_path(value, capture_path[len(path) + 1:] if path else capture_path)
+
+            if parent is not None and parent['state'] in ('match', 'building'):
+                attach(parent, value)
+            elif not judged and isinstance(value, (dict, list)):
+                # A complete subtree decoded in one go: walk it like extract_structured_data
+                emitted = False
+                for item in self._walk_structured(value):
+                    emitted = True
+                    yield item
+                if emitted:
+                    close_all()
+                elif parent is not None:
+                    attach(parent, value)
+            elif parent is not None:
+                attach(parent, value)
+
+            if parent is not None and parent['kind'] == 'array':
+                parent['key'] += 1
 
     def fetch_multiple_apis(self, api_configs: List[dict]) -> List[dict]:
         """
         Fetch data from multiple API URLs concurrently
         """
-        all_structured_data = []
+        return run_coroutine(self.fetch_multiple_apis_async(api_configs))
+
+    async def fetch_multiple_apis_async(self, api_configs: List[dict]) -> List[dict]:
+        """
+        Fetch data from multiple API URLs on an event loop
+
+        Requests run on a thread pool of max_workers; each host gets its own
+        semaphore (per_host_limit concurrent requests) and token bucket
+        (requests_per_second), and every response is extracted as soon as it
+        arrives rather than in submission order.
+        """
+        all_items = []
+        loop = asyncio.get_running_loop()
+        host_semaphores = {}
+        host_buckets = {}
 
         print(f"Fetching data from {len(api_configs)} API endpoints...")
 
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submit all API requests
-            future_to_api = {}
-            for config in api_configs:
-                future = executor.submit(
+        async def fetch_one(config: dict):
+            api_url = config.get('url')
+            host = urlparse(api_url or '').netloc
+            if host not in host_semaphores:
+                host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+                host_buckets[host] = TokenBucket(self.requests_per_second, self.burst)
+
+            async with host_semaphores[host]:
+                if config.get('pagination') or config.get('stream'):
+                    # Pages are throttled by the threaded pagination path itself
+                    items = await loop.run_in_executor(executor, lambda: list(self.iter_paginated(config)))
+                    return api_url, items or None
+
+                await host_buckets[host].acquire()
+                data = await loop.run_in_executor(executor, functools.partial(
                     self.fetch_from_api,
-                    api_url=config.get('url'),
+                    api_url=api_url,
                     params=config.get('params'),
                     headers=config.get('headers'),
                     method=config.get('method', 'GET'),
                     data=config.get('data'),
                     timeout=config.get('timeout', 30)
-                )
-                future_to_api[future] = config.get('url')
+                ))
+            # Extract structured data for paragraph creation as soon as the response arrives
+            return api_url, self.extract_structured_data(data) if data else None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            tasks = [asyncio.ensure_future(fetch_one(config)) for config in api_configs]
 
-            # Process completed requests
-            for future in as_completed(future_to_api):
-                api_url = future_to_api[future]
+            # Process requests as they complete
+            for next_done in asyncio.as_completed(tasks):
                 try:
-                    data = future.result()
-                    if data:
-                        # Extract structured data for paragraph creation
-                        structured_items = self.extract_structured_data(data)
-                        all_structured_data.extend(structured_items)
-                        print(f"✓ {api_url}: Extracted {len(structured_items)} structured items")
-                    else:
-                        print(f"✗ {api_url}: No data received")
+                    api_url, structured_items = await next_done
                 except Exception as e:
-                    print(f"✗ {api_url}: Error - {e}")
+                    print(f"✗ Error - {e}")
+                    continue
+
+                if structured_items is not None:
+                    all_items.extend(structured_items)
+                    print(f"✓ {api_url}: Extracted {len(structured_items)} structured items")
+                else:
+                    print(f"✗ {api_url}: No data received")
+
+        print(f"\nTotal structured items extracted: {len(all_items)}")
+        if self.http_cache is not None:
+            cache_stats = self.http_cache.stats()
+            print(f"HTTP cache: {cache_stats['hit']} fresh, {cache_stats['revalidated']} revalidated (304), "
+                  f"{cache_stats['miss']} downloaded, {cache_stats['stale']} stale")
+        return all_items
+
+    def _throttle(self, api_url: str):
+        """
+        Block until this host's next request slot under requests_per_second
+        """
+        if not self.requests_per_second:
+            return
+
+        host = urlparse(api_url or '').netloc
+        with self._throttle_lock:
+            now = time.monotonic()
+            slot = max(now, self._host_next_slot.get(host, 0.0))
+            self._host_next_slot[host] = slot + 1.0 / self.requests_per_second
+
+        if slot > now:
+            time.sleep(slot - now)
+
+    @staticmethod
+    def _lookup_path(obj, path: str):
+        """
+        Value at a dotted path such as 'meta.next_cursor', or None
+        """
+        for key in path.split('.'):
+            if isinstance(obj, dict):
+                obj = obj.get(key)
+            elif isinstance(obj, list) and key.isdigit() and int(key) < len(obj):
+                obj = obj[int(key)]
+            else:
+                return None
+        return obj
+
+    @staticmethod
+    def _link_field(pagination: dict) -> Optional[str]:
+        """
+        Dotted path of the next link or cursor in a page, for link-following pagination
+        """
+        if pagination.get('type') == 'next':
+            return pagination.get('next_field', 'next')
+        if pagination.get('type') == 'cursor':
+            return pagination.get('cursor_field', 'next_cursor')
+        return None
+
+    def _page_request(self, config: dict, page_number: int, previous: Tuple[str, dict] = None,
+                      link=None) -> Optional[Tuple[str, dict]]:
+        """
+        (url, params) of a page, or None when the previous page was the last one
+
+        link is the next URL or cursor found in the previous page.
+        """
+        pagination = config.get('pagination') or {}
+        style = pagination.get('type')
+        api_url = config.get('url')
+        params = dict(config.get('params') or {})
+
+        if page_number == 0 and style not in ('page', 'offset'):
+            return api_url, params
+
+        if style == 'page':
+            params[pagination.get('page_param', 'page')] = pagination.get('start_page', 1) + page_number
+            return api_url, params
+
+        if style == 'offset':
+            limit = pagination.get('limit', 100)
+            params[pagination.get('offset_param', 'offset')] = page_number * limit
+            params[pagination.get('limit_param', 'limit')] = limit
+            return api_url, params
+
+        if style == 'next':
+            if not isinstance(link, str) or not link:
+                return None
+            # Next links carry their own query string
+            return urljoin(previous[0], link), None
+
+        if style == 'cursor':
+            if link in (None, ''):
+                return None
+            params[pagination.get('cursor_param', 'cursor')] = link
+            return api_url, params
+
+        return None
+
+    def _report_page_limit(self, config: dict, max_pages: int, errors: list = None):
+        # The default limit would otherwise cut large endpoints short without a trace
+        message = f"stopped at max_pages={max_pages} with more pages left"
+        print(f"✗ {config.get('url')}: {message}")
+        if errors is not None:
+            errors.append((config.get('url'), message))
+
+    def iter_paginated(self, config: dict, errors: list = None) -> Iterator[dict]:
+        """
+        Yield the structured items of an endpoint, page by page
+
+        config['pagination'] selects how pages are addressed:
+            {'type': 'page', 'page_param': 'page', 'start_page': 1}
+            {'type': 'offset', 'offset_param': 'offset', 'limit_param': 'limit', 'limit': 100}
+            {'type': 'next', 'next_field': 'links.next'}
+            {'type': 'cursor', 'cursor_param': 'cursor', 'cursor_field': 'meta.next_cursor'}
+        plus an optional 'max_pages' (default 100). Without it the endpoint is
+        a single page. Page N+1 is requested on a background thread while
+        page N is extracted and consumed. Page and offset pagination stop at
+        the first empty (or, for offset, short) page, next and cursor
+        pagination when the response has no further link or cursor.
+
+        With config['stream'] set, pages are parsed incrementally while they
+        download (see extract_structured_data_stream) instead of prefetched.
+        A page that fails ends the endpoint early; when errors is given, the
+        failure is appended to it as a (url, message) pair. Stopping at
+        max_pages while the API still has pages is reported the same way,
+        so callers know the endpoint was not fetched completely.
+        """
+        if config.get('stream'):
+            yield from self._iter_paginated_stream(config, errors)
+            return
+
+        pagination = config.get('pagination') or {}
+        style = pagination.get('type')
+        max_pages = pagination.get('max_pages', 100) if style else 1
+        link_field = self._link_field(pagination)
+
+        def fetch_page(request: Tuple[str, dict]):
+            self._throttle(request[0])
+            return self.fetch_from_api(
+                api_url=request[0],
+                params=request[1],
+                headers=config.get('headers'),
+                method=config.get('method', 'GET'),
+                data=config.get('data'),
+                timeout=config.get('timeout', 30)
+            )
 
-                # Be polite to APIs
-                time.sleep(0.5)
+        total_items = 0
+        pages = 0
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            request = self._page_request(config, 0)
+            future = executor.submit(fetch_page, request)
+
+            while future is not None:
+                data = future.result()
+                if data is None and errors is not None:
+                    errors.append((request[0], "request failed"))
+                if not data:
+                    break
+                pages += 1
+
+                # Prefetch the next page before handing this one to the consumer
+                link = self._lookup_path(data, link_field) if link_field else None
+                next_request = self._page_request(config, pages, request, link)
+                if next_request == request:  # Repeated cursor or self-referencing link
+                    next_request = None
+                capped = next_request is not None and pages >= max_pages
+                if capped:
+                    next_request = None
+                future = executor.submit(fetch_page, next_request) if next_request else None
+
+                structured_items = self.extract_structured_data(data)
+                total_items += len(structured_items)
+                yield from structured_items
+
+                if style in ('page', 'offset') and not structured_items:
+                    break
+                if style == 'offset' and len(structured_items) < pagination.get('limit', 100):
+                    break
+                if capped:
+                    self._report_page_limit(config, max_pages, errors)
+                request = next_request
+
+        if pages:
+            print(f"✓ {config.get('url')}: {pages} pages, {total_items} structured items")
+        else:
+            print(f"✗ {config.get('url')}: No data received")
+
+    def _iter_paginated_stream(self, config: dict, errors: list = None) -> Iterator[dict]:
+        """
+        iter_paginated for streamed endpoints: items are yielded while each page downloads
+        """
+        pagination = config.get('pagination') or {}
+        style = pagination.get('type')
+        max_pages = pagination.get('max_pages', 100) if style else 1
+        link_field = self._link_field(pagination)
+
+        total_items = 0
+        pages = 0
+        request = self._page_request(config, 0)
+        while request is not None and pages < max_pages:
+            self._throttle(request[0])
+            chunks = self.open_api_stream(
+                api_url=request[0],
+                params=request[1],
+                headers=config.get('headers'),
+                method=config.get('method', 'GET'),
+                data=config.get('data'),
+                timeout=config.get('timeout', 30)
+            )
+            if chunks is None:
+                if errors is not None:
+                    errors.append((request[0], "request failed"))
+                break
+
+            captured = {link_field: None} if link_field else None
+            page_items = 0
+            try:
+                for item in self.extract_structured_data_stream(chunks, captured=captured):
+                    page_items += 1
+                    yield item
+            except (ValueError, requests.exceptions.RequestException) as e:
+                print(f"✗ {request[0]}: Stream error - {e}")
+                if errors is not None:
+                    errors.append((request[0], str(e)))
+                break
+            pages += 1
+            total_items += page_items
+
+            if style in ('page', 'offset') and not page_items:
+                break
+            if style == 'offset' and page_items < pagination.get('limit', 100):
+                break
+            next_request = self._page_request(config, pages, request, captured[link_field] if captured else None)
+            request = next_request if next_request != request else None
+            if request is not None and pages >= max_pages:
+                self._report_page_limit(config, max_pages, errors)
+
+        if pages:
+            print(f"✓ {config.get('url')}: {pages} pages, {total_items} structured items (streamed)")
+        else:
+            print(f"✗ {config.get('url')}: No data received")
+
+    def iter_structured_items(self, api_configs: List[dict], max_buffered: int = 10000,
+                              errors: list = None) -> Iterator[dict]:
+        """
+        Stream structured items from all endpoints as pages arrive
+
+        Endpoints are paginated concurrently on up to max_workers threads, each
+        prefetching its next page; at most max_buffered items wait for the
+        consumer, which keeps memory flat on large listing APIs. Pages or
+        endpoints that fail are reported and, when errors is given, appended
+        to it as (url, message) pairs.
+        """
+        print(f"Streaming data from {len(api_configs)} API endpoints...")
+        item_queue = queue.Queue(maxsize=max_buffered)
+        done = object()
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            # Blocks while the buffer is full, gives up once the consumer has stopped
+            while not stop.is_set():
+                try:
+                    item_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def drain(config: dict):
+            try:
+                for item in self.iter_paginated(config, errors):
+                    if not put(item):
+                        return
+            except Exception as e:
+                print(f"✗ {config.get('url')}: Error - {e}")
+                if errors is not None:
+                    errors.append((config.get('url'), str(e)))
+            finally:
+                put(done)
+
+        total_items = 0
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            for config in api_configs:
+                executor.submit(drain, config)
+
+            remaining = len(api_configs)
+            while remaining:
+                item = item_queue.get()
+                if item is done:
+                    remaining -= 1
+                    continue
+                total_items += 1
+                yield item
+        finally:
+            # Consumer stopped early or finished: unblock producers and wait for them
+            stop.set()
+            while True:
+                try:
+                    item_queue.get_nowait()
+                except queue.Empty:
+                    break
+            executor.shutdown(wait=True)
+
+        print(f"\nTotal structured items streamed: {total_items}")
+
+
+def render_template_columns(template: str, columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    str.format over whole columns: literal text and field columns are concatenated elementwise
+    """
+    size = len(next(iter(columns.values())))
+    rendered = np.full(size, '', dtype=object)
+    for literal, field, _, _ in string.Formatter().parse(template):
+        if literal:
+            rendered = rendered + literal
+        if field is not None:
+            rendered = rendered + columns[field]
+    return rendered
+
+
+def _word_stats(values) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Word count, starts/ends with a non-space character and emptiness, per value
+    """
+    codes, uniques = pd.factorize(np.atleast_1d(np.asarray(values, dtype=object)))
+    counts = np.array([len(value.split()) for value in uniques], dtype=np.int64)
+    starts = np.array([value[:1] != '' and not value[0].isspace() for value in uniques], dtype=bool)
+    ends = np.array([value[-1:] != '' and not value[-1].isspace() for value in uniques], dtype=bool)
+    empty = np.array([value == '' for value in uniques], dtype=bool)
+    return counts[codes], starts[codes], ends[codes], empty[codes]
+
+
+def count_template_words(template: str, columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    len(text.split()) for every row of render_template_columns, without rendering
+
+    Each literal and field column is reduced to per-value statistics; two
+    adjacent pieces lose one word between them when the first ends and the
+    second starts with a non-space character, since they join into one word.
+    """
+    size = len(next(iter(columns.values())))
+    total = np.zeros(size, dtype=np.int64)
+    tail_joins = np.zeros(size, dtype=bool)
+    for literal, field, _, _ in string.Formatter().parse(template):
+        pieces = []
+        if literal:
+            pieces.append(_word_stats([literal]))
+        if field is not None:
+            pieces.append(_word_stats(columns[field]))
+        for counts, starts, ends, empty in pieces:
+            total += counts - (tail_joins & starts)
+            tail_joins = np.where(empty, tail_joins, ends)
+    return total
 
-        print(f"\nTotal structured items extracted: {len(all_structured_data)}")
-        return all_structured_data
+
+# Text prices that count as numbers in location statistics: digits with at most one decimal point
+PRICE_TEXT_PATTERN = r'\d+\.?\d*|\.\d+'
 
 
 class ParagraphCreator:
@@ -234,6 +715,70 @@ class ParagraphCreator:
             "This is a prime property in a sought-after location."
         ]
 
+        # Sentences of the comprehensive paragraph, shared by the per-record and bulk paths
+        self.comprehensive_sentences = [
+            "{starter} a {property_type} property located in {location}.",
+            "The property features {bedrooms} bedrooms and covers {area} square yards of space.",
+            "Priced at {price}, this property offers competitive value in the current market."
+        ]
+        self.connector_sentences = [
+            "{connector} the {location} area is known for its excellent amenities and secure environment.",
+            "{connector} properties in this location tend to appreciate well over time."
+        ]
+
+    @staticmethod
+    def _format_price(price) -> str:
+        """
+        Display form of a price: 'PKR 1,234' for numbers and numeric strings
+        """
+        if isinstance(price, (int, float)):
+            return f"PKR {price:,.0f}"
+        if isinstance(price, str) and price.replace('.', '', 1).isdigit():
+            try:
+                return f"PKR {float(price):,.0f}"
+            except ValueError:
+                return str(price)  # Fallback if float conversion fails unexpectedly
+        return str(price)  # Ensure it's a string for non-numeric cases
+
+    @staticmethod
+    def _format_area(area) -> str:
+        """
+        Display form of an area: thousands separators for numbers and numeric strings
+        """
+        if isinstance(area, (int, float)) or (isinstance(area, str) and str(area).replace('.', '', 1).isdigit()):
+            try:
+                return f"{float(area):,.0f}"
+            except ValueError:
+                return f"{area}"
+        return f"{area}"
+
+    @staticmethod
+    def _capitalize_sentences(paragraph: str) -> str:
+        """
+        Capitalize every '. '-separated sentence and close the paragraph with a period
+        """
+        cleaned_sentences = []
+        for sent in paragraph.split('. '):
+            sent = sent.strip()
+            if sent:
+                cleaned_sentences.append(sent[0].upper() + sent[1:])
+        return '. '.join(cleaned_sentences) + '.'
+
+    @staticmethod
+    def _punctuate_sentences(paragraph: str) -> str:
+        """
+        Capitalize every '. '-separated sentence and make each one end with a period
+        """
+        cleaned_sentences = []
+        for sent in paragraph.split('. '):
+            sent = sent.strip()
+            if sent:
+                sent = sent[0].upper() + sent[1:]
+                if not sent.endswith('.'):
+                    sent = sent + '.'
+                cleaned_sentences.append(sent)
+        return ' '.join(cleaned_sentences)
+
     def create_property_paragraph(self, property_data: dict) -> str:
         """
         Create a coherent paragraph from property data
@@ -246,26 +791,10 @@ class ParagraphCreator:
         price = property_data.get('price', 'Not specified')
 
         # Clean price formatting
-        if isinstance(price, (int, float)):
-            price = f"PKR {price:,.0f}"
-        elif isinstance(price, str) and price.replace('.', '', 1).isdigit():
-            try:
-                price_numeric = float(price)
-                price = f"PKR {price_numeric:,.0f}"
-            except ValueError:
-                price = str(price) # Fallback if float conversion fails unexpectedly
-        else:
-            price = str(price) # Ensure it's a string for non-numeric cases
+        price = self._format_price(price)
 
         # Clean area formatting
-        if isinstance(area, (int, float)) or (isinstance(area, str) and str(area).replace('.', '', 1).isdigit()):
-            try:
-                area_numeric = float(area)
-                area = f"{area_numeric:,.0f}"
-            except ValueError:
-                area = f"{area}"
-        else:
-            area = f"{area}"
+        area = self._format_area(area)
 
         # Select a random template
         template = random.choice(self.property_templates)
@@ -280,19 +809,7 @@ class ParagraphCreator:
         )
 
         # Ensure proper sentence structure
-        sentences = paragraph.split('. ')
-        cleaned_sentences = []
-        for sent in sentences:
-            sent = sent.strip()
-            if sent:
-                # Capitalize first letter
-                sent = sent[0].upper() + sent[1:] if sent else sent
-                cleaned_sentences.append(sent)
-
-        # Join with proper punctuation
-        paragraph = '. '.join(cleaned_sentences) + '.'
-
-        return paragraph
+        return self._capitalize_sentences(paragraph)
 
     def create_qa_paragraph(self, property_data: dict) -> List[str]:
         """
@@ -308,16 +825,7 @@ class ParagraphCreator:
         price = property_data.get('price', 'Not specified')
 
         # Clean price formatting
-        if isinstance(price, (int, float)):
-            price = f"PKR {price:,.0f}"
-        elif isinstance(price, str) and price.replace('.', '', 1).isdigit():
-            try:
-                price_numeric = float(price)
-                price = f"PKR {price_numeric:,.0f}"
-            except ValueError:
-                price = str(price) # Fallback if float conversion fails unexpectedly
-        else:
-            price = str(price) # Ensure it's a string for non-numeric cases
+        price = self._format_price(price)
 
         # Create QA pairs
         for question_template, answer_template in self.qa_templates:
@@ -351,16 +859,7 @@ class ParagraphCreator:
         price = property_data.get('price', 'Not specified')
 
         # Clean formatting
-        if isinstance(price, (int, float)):
-            price = f"PKR {price:,.0f}"
-        elif isinstance(price, str) and price.replace('.', '', 1).isdigit():
-            try:
-                price_numeric = float(price)
-                price = f"PKR {price_numeric:,.0f}"
-            except ValueError:
-                price = str(price) # Fallback if float conversion fails unexpectedly
-        else:
-            price = str(price) # Ensure it's a string for non-numeric cases
+        price = self._format_price(price)
 
         # Build paragraph components
         starter = random.choice(self.paragraph_starters)
@@ -368,40 +867,19 @@ class ParagraphCreator:
         ending = random.choice(self.paragraph_endings)
 
         # Create paragraph
-        paragraph_parts = [
-            f"{starter} a {property_type} property located in {location}.",
-            f"The property features {bedrooms} bedrooms and covers {area} square yards of space.",
-            f"Priced at {price}, this property offers competitive value in the current market."
-        ]
+        paragraph_parts = [sentence.format(starter=starter, property_type=property_type, location=location,
+                                           bedrooms=bedrooms, area=area, price=price)
+                           for sentence in self.comprehensive_sentences]
 
         # Add connector sentences
-        for i, connector in enumerate(connectors):
-            if i == 0:
-                paragraph_parts.append(f"{connector} the {location} area is known for its excellent amenities and secure environment.")
-            else:
-                paragraph_parts.append(f"{connector} properties in this location tend to appreciate well over time.")
+        for connector, sentence in zip(connectors, self.connector_sentences):
+            paragraph_parts.append(sentence.format(connector=connector, location=location))
 
         # Add ending
         paragraph_parts.append(ending)
 
-        # Combine into coherent paragraph
-        paragraph = ' '.join(paragraph_parts)
-
-        # Ensure proper punctuation
-        sentences = paragraph.split('. ')
-        cleaned_sentences = []
-        for sent in sentences:
-            sent = sent.strip()
-            if sent:
-                # Capitalize first letter
-                sent = sent[0].upper() + sent[1:] if sent else sent
-                # Ensure it ends with period
-                if not sent.endswith('.'):
-                    sent = sent + '.'
-                cleaned_sentences.append(sent)
-
-        paragraph = ' '.join(cleaned_sentences)
-        return paragraph
+        # Combine into coherent paragraph, ensuring proper punctuation
+        return self._punctuate_sentences(' '.join(paragraph_parts))
 
     def group_properties_by_location(self, properties: List[dict]) -> Dict[str, List[dict]]:
         """
@@ -418,89 +896,206 @@ class ParagraphCreator:
 
         return grouped
 
-    def create_location_summary_paragraph(self, location: str, properties: List[dict]) -> str:
+    def location_statistics(self, properties: List[dict]) -> pd.DataFrame:
         """
-        Create summary paragraph for a location with multiple properties
+        Per-location aggregates of the properties, computed in one group-by pass
+
+        One row per location (stripped and title-cased, in order of first
+        appearance, as group_properties_by_location) with count,
+        mean_price, median_price and priced_count over the numeric prices,
+        bedroom_mode, top_property_type, property_types (sorted) and
+        type_mix (share of each property type). Ties in a mode go to the
+        value seen first, so the result does not depend on set ordering.
         """
-        if not properties:
-            return ""
+        locations = self._normalize_labels([prop.get('location', 'Unknown') for prop in properties],
+                                           lambda location: location.strip().title())
+        return self._aggregate_locations(locations, properties)
 
-        # Analyze properties in this location
-        property_types = set()
-        prices = []
-        bedrooms_list = []
-
-        for prop in properties:
-            if 'property_type' in prop:
-                property_types.add(prop['property_type'].lower())
-
-            if 'price' in prop and isinstance(prop['price'], (int, float, str)):
-                try:
-                    # Safely convert price to float if it's a numeric string
-                    price_val = float(prop['price']) if isinstance(prop['price'], str) and prop['price'].replace('.', '', 1).isdigit() else prop['price']
-                    if isinstance(price_val, (int, float)): # Ensure it's numeric after potential conversion
-                        prices.append(price_val)
-                except:
-                    pass
-
-            if 'bedrooms' in prop:
-                bedrooms_list.append(prop['bedrooms'])
+    @staticmethod
+    def _normalize_labels(values: List, normalize: Callable[[str], str]) -> np.ndarray:
+        """
+        normalize applied once per distinct string value; anything else becomes None
+        """
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+        labels = np.array([normalize(value) if isinstance(value, str) else None for value in uniques] + [None],
+                          dtype=object)
+        return labels[codes]
 
-        # Calculate averages
-        avg_price = sum(prices) / len(prices) if prices else 0
-        common_bedrooms = max(set(bedrooms_list), key=bedrooms_list.count) if bedrooms_list else '3-4'
+    def _aggregate_locations(self, locations: np.ndarray, properties: List[dict]) -> pd.DataFrame:
+        """
+        location_statistics for properties already labelled with their location
+        """
+        frame = pd.DataFrame(properties, columns=['property_type', 'bedrooms', 'price'], dtype=object)
+        frame.insert(0, 'location', locations)
+        frame['property_type'] = self._normalize_labels(frame['property_type'], str.lower)
+        frame = frame[frame['location'].notna()]
+
+        # Numbers count as prices, text only when it is plainly numeric ("2500000", "2.5")
+        price = frame['price']
+        is_text = price.map(type).eq(str)
+        plain_text = price[is_text].astype(str).str.fullmatch(PRICE_TEXT_PATTERN)
+        numeric = ~is_text | plain_text.reindex(price.index, fill_value=False).astype(bool)
+        frame['price'] = pd.to_numeric(price.where(numeric), errors='coerce')
+
+        by_location = frame.groupby('location', sort=False)
+        stats = pd.DataFrame({'count': by_location.size()})
+        stats['mean_price'] = by_location['price'].mean()
+        stats['median_price'] = by_location['price'].median()
+        stats['priced_count'] = by_location['price'].count()
+        stats['bedroom_mode'] = self._group_mode(frame, 'bedrooms').reindex(stats.index).astype(object)
+        stats['top_property_type'] = self._group_mode(frame, 'property_type').reindex(stats.index).astype(object)
+
+        type_counts = frame.groupby(['location', 'property_type'], sort=False).size()
+        type_shares = type_counts / type_counts.groupby(level=0, sort=False).transform('sum')
+        type_mix = {location: {} for location in stats.index}
+        for (location, property_type), share in type_shares.items():
+            type_mix[location][property_type] = share
+        stats['type_mix'] = pd.Series(type_mix, dtype=object)
+        stats['property_types'] = pd.Series({location: sorted(mix) for location, mix in type_mix.items()}, dtype=object)
+        return stats
+
+    @staticmethod
+    def _group_mode(frame: pd.DataFrame, column: str) -> pd.Series:
+        """
+        Most frequent non-missing value of column per location, the earliest one on ties
+        """
+        counts = frame.groupby(['location', column], sort=False).size()
+        if counts.empty:
+            return pd.Series(dtype=object)
+        modes = counts.groupby(level=0, sort=False).idxmax()
+        return pd.Series([key[1] for key in modes], index=modes.index, dtype=object)
 
-        # Create summary paragraph
-        property_types_str = ', '.join(sorted(property_types)) if property_types else 'various types of'
+    def create_location_summary_from_stats(self, location: str, stats: pd.Series) -> str:
+        """
+        Summary paragraph for a location from its location_statistics row
+        """
+        property_types = stats['property_types']
+        property_types_str = ', '.join(property_types) if property_types else 'various types of'
+        common_bedrooms = stats['bedroom_mode'] if not pd.isna(stats['bedroom_mode']) else '3-4'
 
         paragraph = f"The {location} real estate market offers {property_types_str} properties. "
 
-        if prices:
-            paragraph += f"Average prices in this area range around PKR {avg_price:,.0f}, "
+        if stats['priced_count']:
+            paragraph += f"Average prices in this area range around PKR {stats['mean_price']:,.0f}, "
 
         if property_types:
-            paragraph += f"with {list(property_types)[0]} properties being particularly popular. "
+            paragraph += f"with {stats['top_property_type']} properties being particularly popular. "
 
         paragraph += f"Most properties feature {common_bedrooms} bedrooms, catering to different family sizes. "
         paragraph += f"{location} continues to be a preferred choice for investors and homebuyers alike due to its planned infrastructure and quality of life."
 
         return paragraph
 
-    def transform_to_paragraphs(self, structured_data: List[dict]) -> List[str]:
+    def create_location_summary_paragraph(self, location: str, properties: List[dict]) -> str:
+        """
+        Create summary paragraph for a location with multiple properties
+        """
+        if not properties:
+            return ""
+
+        stats = self._aggregate_locations(np.full(len(properties), location, dtype=object), properties)
+        return self.create_location_summary_from_stats(location, stats.iloc[0])
+
+    def transform_to_paragraphs(self, structured_data: Iterable[dict],
+                                near_duplicate_threshold: float = None) -> List[str]:
         """
         Main method to transform all structured data into training paragraphs
+
+        structured_data is consumed in a single pass, so it may be a generator
+        such as APIDataFetcher.iter_structured_items: property paragraphs are
+        built while later pages are still being fetched.
+        near_duplicate_threshold additionally drops paragraphs whose word
+        shingles overlap an earlier one at or above that Jaccard similarity.
         """
         print("\nTransforming structured data into training paragraphs...")
 
         all_paragraphs = []
-
-        # Group by location first
-        grouped_properties = self.group_properties_by_location(structured_data)
+        properties = []
 
         # 1. Create individual property paragraphs
         print("Creating individual property paragraphs...")
         for prop in structured_data:
-            # Create detailed property paragraph
-            prop_paragraph = self.create_property_paragraph(prop)
-            if prop_paragraph and len(prop_paragraph.split()) >= 30:  # Ensure meaningful length
-                all_paragraphs.append(prop_paragraph)
+            properties.append(prop)
+            all_paragraphs.extend(self.create_record_paragraphs(prop))
 
-            # Create comprehensive paragraph
-            comp_paragraph = self.create_comprehensive_paragraph(prop)
-            if comp_paragraph and len(comp_paragraph.split()) >= 40:
-                all_paragraphs.append(comp_paragraph)
+        return self._finish_paragraphs(all_paragraphs, properties, near_duplicate_threshold)
 
-            # Create Q&A paragraphs
-            qa_paragraphs = self.create_qa_paragraph(prop)
-            all_paragraphs.extend([p for p in qa_paragraphs if len(p.split()) >= 25])
+    def create_record_paragraphs(self, prop: dict) -> List[str]:
+        """
+        Property, comprehensive and Q&A paragraphs of one record that are long enough to train on
+        """
+        paragraphs = []
+
+        # Create detailed property paragraph
+        prop_paragraph = self.create_property_paragraph(prop)
+        if prop_paragraph and len(prop_paragraph.split()) >= 30:  # Ensure meaningful length
+            paragraphs.append(prop_paragraph)
+
+        # Create comprehensive paragraph
+        comp_paragraph = self.create_comprehensive_paragraph(prop)
+        if comp_paragraph and len(comp_paragraph.split()) >= 40:
+            paragraphs.append(comp_paragraph)
+
+        # Create Q&A paragraphs
+        qa_paragraphs = self.create_qa_paragraph(prop)
+        paragraphs.extend([p for p in qa_paragraphs if len(p.split()) >= 25])
+
+        return paragraphs
 
+    def transform_to_paragraphs_incremental(self, structured_data: Iterable[dict], store: 'ParagraphStore',
+                                            near_duplicate_threshold: float = None,
+                                            retire_missing: bool = True, batch_size: int = 1000) -> List[str]:
+        """
+        transform_to_paragraphs backed by a ParagraphStore
+
+        Only records whose content hash the store doesn't hold yet get
+        paragraphs generated; the rest reuse their stored paragraphs. With
+        retire_missing, paragraphs of records absent from structured_data
+        (deleted or changed listings) are removed from the store. Location
+        summaries and general knowledge are rebuilt from all records.
+        """
+        print("\nTransforming structured data into training paragraphs (incremental)...")
+
+        store.begin_refresh()
+        properties = []
+        pending = []
+        generated = 0
+        for prop in structured_data:
+            properties.append(prop)
+            content_hash = store.content_hash(prop)
+            if store.mark_seen(content_hash):
+                pending.append((content_hash, self.create_record_paragraphs(prop)))
+                if len(pending) >= batch_size:
+                    store.add(pending)
+                    generated += len(pending)
+                    pending = []
+        store.add(pending)
+        generated += len(pending)
+
+        retired = store.retire_unseen() if retire_missing else 0
+        print(f"Paragraph store: {generated} new or changed properties, "
+              f"{len(store.seen) - generated} unchanged, {retired} retired")
+
+        all_paragraphs = store.paragraphs(store.seen)
+        return self._finish_paragraphs(all_paragraphs, properties, near_duplicate_threshold)
+
+    def _finish_paragraphs(self, all_paragraphs: List[str], properties: List[dict],
+                           near_duplicate_threshold: float = None,
+                           word_counts: List[int] = None) -> List[str]:
+        """
+        Add location summaries and general knowledge to the property paragraphs, then deduplicate
+
+        word_counts, when given, holds the known word counts of the leading
+        paragraphs so the length report does not split them again.
+        """
         # 2. Create location summary paragraphs
         print("Creating location summary paragraphs...")
-        for location, props in grouped_properties.items():
-            if len(props) >= 2:  # Only create summaries for locations with multiple properties
-                summary_paragraph = self.create_location_summary_paragraph(location, props)
-                if summary_paragraph and len(summary_paragraph.split()) >= 35:
-                    all_paragraphs.append(summary_paragraph)
+        location_stats = self.location_statistics(properties)
+        # Only create summaries for locations with multiple properties
+        for location, stats in location_stats[location_stats['count'] >= 2].iterrows():
+            summary_paragraph = self.create_location_summary_from_stats(location, stats)
+            if summary_paragraph and len(summary_paragraph.split()) >= 35:
+                all_paragraphs.append(summary_paragraph)
 
         # 3. Add general real estate knowledge paragraphs
         print("Adding general knowledge paragraphs...")
@@ -508,16 +1103,15 @@ class ParagraphCreator:
         all_paragraphs.extend(general_paragraphs)
 
         # Remove duplicates while preserving order
-        unique_paragraphs = []
-        seen = set()
-        for para in all_paragraphs:
-            para_hash = hashlib.md5(para.encode()).hexdigest()
-            if para_hash not in seen:
-                seen.add(para_hash)
-                unique_paragraphs.append(para)
+        unique_paragraphs = list(dict.fromkeys(all_paragraphs))
+
+        if near_duplicate_threshold is not None:
+            unique_paragraphs = NearDuplicateFilter(threshold=near_duplicate_threshold).filter(unique_paragraphs)
 
         print(f"Created {len(unique_paragraphs)} unique training paragraphs")
-        print(f"Average paragraph length: {np.mean([len(p.split()) for p in unique_paragraphs]):.1f} words")
+        known_counts = dict(zip(all_paragraphs, word_counts or []))
+        lengths = [known_counts[p] if p in known_counts else len(p.split()) for p in unique_paragraphs]
+        print(f"Average paragraph length: {np.mean(lengths):.1f} words")
 
         # Show samples
         print("\nSample training paragraphs:")
@@ -526,6 +1120,120 @@ class ParagraphCreator:
 
         return unique_paragraphs
 
+    def _normalize_columns(self, properties: List[dict]) -> Dict[str, np.ndarray]:
+        """
+        Columnar view of the template values, normalized once for all records
+        """
+        location = [str(prop.get('location', 'DHA')).title() for prop in properties]
+        property_type = [str(prop.get('property_type', 'residential')).lower() for prop in properties]
+        raw_area = [prop.get('area', '500') for prop in properties]
+
+        columns = {
+            'location': location,
+            'property_type': property_type,
+            'bedrooms': [str(prop.get('bedrooms', '3')) for prop in properties],
+            'area': [str(area) for area in raw_area],
+            'area_display': [self._format_area(area) for area in raw_area],
+            'price': [self._format_price(prop.get('price', 'Not specified')) for prop in properties],
+            'use_case': ["family living" if kind == "residential" else "commercial use" for kind in property_type]
+        }
+        return {name: np.array(values, dtype=object) for name, values in columns.items()}
+
+    def render_paragraph_columns(self, columns: Dict[str, np.ndarray], seed=None) -> Tuple[List[str], List[int]]:
+        """
+        Property, comprehensive and Q&A paragraphs for a batch of normalized records
+
+        Templates are rendered a whole column at a time and every random
+        choice comes from one numpy generator, so a batch and seed always
+        give the same paragraphs, in the per-record order of
+        transform_to_paragraphs. Returns the paragraphs and their word counts.
+        """
+        rng = np.random.default_rng(seed)
+        size = len(columns['location'])
+        if size == 0:
+            return [], []
+
+        # All random choices for the batch up front
+        template_ids = rng.integers(len(self.property_templates), size=size)
+        starter_ids = rng.integers(len(self.paragraph_starters), size=size)
+        num_connectors = rng.integers(1, 3, size=size)
+        first_connectors = rng.integers(len(self.paragraph_connectors), size=size)
+        # A different second connector, as random.sample would pick
+        second_connectors = (first_connectors + rng.integers(1, len(self.paragraph_connectors), size=size)) % len(self.paragraph_connectors)
+        ending_ids = rng.integers(len(self.paragraph_endings), size=size)
+
+        # 1. Property paragraphs: each template renders the rows that drew it
+        property_columns = dict(columns, area=columns['area_display'])
+        property_paragraphs = np.empty(size, dtype=object)
+        for template_id, template in enumerate(self.property_templates):
+            rows = template_ids == template_id
+            if rows.any():
+                property_paragraphs[rows] = render_template_columns(
+                    template, {name: values[rows] for name, values in property_columns.items()})
+        property_paragraphs = [self._capitalize_sentences(paragraph) for paragraph in property_paragraphs]
+
+        # 2. Comprehensive paragraphs
+        connectors = np.array(self.paragraph_connectors, dtype=object)
+        comprehensive_columns = dict(columns, starter=np.array(self.paragraph_starters, dtype=object)[starter_ids])
+        parts = [render_template_columns(sentence, comprehensive_columns) for sentence in self.comprehensive_sentences]
+        parts.append(render_template_columns(self.connector_sentences[0],
+                                             dict(columns, connector=connectors[first_connectors])))
+        second = render_template_columns(self.connector_sentences[1], dict(columns, connector=connectors[second_connectors]))
+        parts.append(np.where(num_connectors == 2, second, None))
+        parts.append(np.array(self.paragraph_endings, dtype=object)[ending_ids])
+        comprehensive_paragraphs = [self._punctuate_sentences(' '.join(part for part in row if part is not None))
+                                    for row in zip(*parts)]
+
+        # 3. Q&A paragraphs: no sentence cleanup, so word counts come straight from the templates
+        qa_templates = [f"{question} {answer}" for question, answer in self.qa_templates]
+
+        # Lay out row by row and apply the same minimum lengths as transform_to_paragraphs
+        table = np.empty((size, 2 + len(qa_templates)), dtype=object)
+        word_counts = np.empty(table.shape, dtype=np.int64)
+        min_words = np.array([30, 40] + [25] * len(qa_templates))
+        for i, paragraphs in enumerate([property_paragraphs, comprehensive_paragraphs]):
+            table[:, i] = paragraphs
+            word_counts[:, i] = [len(paragraph.split()) for paragraph in paragraphs]
+        for i, template in enumerate(qa_templates, start=2):
+            table[:, i] = render_template_columns(template, columns)
+            word_counts[:, i] = count_template_words(template, columns)
+
+        keep = word_counts >= min_words
+        return table[keep].tolist(), word_counts[keep].tolist()
+
+    def transform_to_paragraphs_bulk(self, structured_data: Iterable[dict], num_workers: int = None,
+                                     shard_size: int = 20000, seed: int = 42,
+                                     near_duplicate_threshold: float = None) -> List[str]:
+        """
+        Reproducible bulk variant of transform_to_paragraphs for large dumps
+
+        Records are normalized into columns once and cut into shards of
+        shard_size records; each shard is rendered by render_paragraph_columns
+        with a generator seeded from (seed, shard index), on a process pool
+        of num_workers (None: one per CPU, 1: in this process). The output
+        depends only on the records, seed and shard_size, never on
+        num_workers. Template choices differ from transform_to_paragraphs,
+        which draws from the global random module.
+        """
+        print("\nTransforming structured data into training paragraphs (bulk)...")
+
+        properties = list(structured_data)
+        columns = self._normalize_columns(properties)
+        shards = [({name: values[start:start + shard_size] for name, values in columns.items()},
+                   [seed, shard_index])
+                  for shard_index, start in enumerate(range(0, len(properties), shard_size))]
+
+        print(f"Rendering {len(properties)} properties in {len(shards)} shards...")
+        if num_workers == 1 or len(shards) <= 1:
+            rendered = [self.render_paragraph_columns(shard_columns, shard_seed) for shard_columns, shard_seed in shards]
+        else:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                rendered = list(executor.map(self.render_paragraph_columns, *zip(*shards)))
+
+        all_paragraphs = list(itertools.chain.from_iterable(paragraphs for paragraphs, _ in rendered))
+        word_counts = list(itertools.chain.from_iterable(counts for _, counts in rendered))
+        return self._finish_paragraphs(all_paragraphs, properties, near_duplicate_threshold, word_counts)
+
     def create_general_knowledge_paragraphs(self) -> List[str]:
         """
         Create general real estate knowledge paragraphs
@@ -545,68 +1253,692 @@ class ParagraphCreator:
         return general_paragraphs
 
 
-class LSTMModelTrainer:
+class ParagraphStore:
     """
-    Train and use LSTM model on paragraph data
+    SQLite store of generated paragraphs, keyed by a content hash of each property record
+
+    A refresh marks every record it sees: only hashes the store doesn't
+    know need paragraphs generated, and known hashes that no record
+    matched (deleted or changed listings) can be retired afterwards. A
+    nightly refresh therefore writes in proportion to the changed
+    listings rather than the catalogue.
     """
 
-    def __init__(self, model_name: str = "paragraph_lstm_model"):
-        self.model_name = model_name
-        self.tokenizer = Tokenizer(oov_token="<OOV>", filters='')
-        self.model = None
-        self.max_sequence_len = None
-        self.vocab_size = None
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS records (content_hash TEXT PRIMARY KEY, created_at REAL NOT NULL)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS paragraphs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, content_hash TEXT NOT NULL, text TEXT NOT NULL)")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS paragraphs_by_record ON paragraphs (content_hash)")
+
+        self.known = set()
+        self.seen = set()
+
+    @staticmethod
+    def content_hash(record: dict) -> str:
+        """
+        Hash of a record's content, independent of key order
+        """
+        normalized = json.dumps(record, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
 
-    def preprocess_paragraphs(self, paragraphs: List[str]) -> List[str]:
+    def begin_refresh(self):
         """
-        Clean and prepare paragraph data for training
+        Start marking the records of a new refresh
+        """
+        self.known = {row[0] for row in self.connection.execute("SELECT content_hash FROM records")}
+        self.seen = set()
+
+    def mark_seen(self, content_hash: str) -> bool:
+        """
+        Mark a record as present in this refresh; True when it still needs paragraphs
+        """
+        if content_hash in self.seen:
+            return False
+        self.seen.add(content_hash)
+        return content_hash not in self.known
+
+    def add(self, entries: List[Tuple[str, List[str]]]):
+        """
+        Store (content hash, paragraphs) pairs; a record may have no paragraphs
+        """
+        if not entries:
+            return
+        now = time.time()
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO records VALUES (?, ?)",
+                                        [(content_hash, now) for content_hash, _ in entries])
+            self.connection.executemany("INSERT INTO paragraphs (content_hash, text) VALUES (?, ?)",
+                                        [(content_hash, paragraph)
+                                         for content_hash, paragraphs in entries for paragraph in paragraphs])
+        self.known.update(content_hash for content_hash, _ in entries)
+
+    def retire_unseen(self) -> int:
+        """
+        Delete the records (and paragraphs) that this refresh did not see
+        """
+        stale = [(content_hash,) for content_hash in self.known - self.seen]
+        with self.connection:
+            self.connection.executemany("DELETE FROM paragraphs WHERE content_hash = ?", stale)
+            self.connection.executemany("DELETE FROM records WHERE content_hash = ?", stale)
+        self.known &= self.seen
+        return len(stale)
+
+    def paragraphs(self, content_hashes: set = None) -> List[str]:
+        """
+        Stored paragraphs in insertion order, optionally only those of the given records
+        """
+        rows = self.connection.execute("SELECT content_hash, text FROM paragraphs ORDER BY id")
+        if content_hashes is None:
+            return [text for _, text in rows]
+        return [text for content_hash, text in rows if content_hash in content_hashes]
+
+    def stats(self) -> dict:
+        records = self.connection.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+        paragraphs = self.connection.execute("SELECT COUNT(*) FROM paragraphs").fetchone()[0]
+        return {'records': records, 'paragraphs': paragraphs}
+
+    def close(self):
+        self.connection.close()
+
+
+class NearDuplicateFilter:
+    """
+    Drop paragraphs that nearly repeat an earlier one, via MinHash + LSH banding
+
+    Each paragraph becomes a set of word shingles, summarized by a MinHash
+    signature whose agreement with another signature estimates their
+    Jaccard similarity. Signatures are split into bands; only paragraphs
+    sharing a band bucket are compared, so the pass is roughly linear in
+    the number of paragraphs.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128,
+                 shingle_size: int = 5, seed: int = 42):
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.num_bands, self.rows_per_band = self._choose_bands(threshold, num_perm)
+
+        # Multiply-shift hash family: ((a * x + b) mod 2^64) >> 32, a odd
+        rng = np.random.default_rng(seed)
+        self.hash_a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.hash_b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+        self.stats = {}
+
+    @staticmethod
+    def _choose_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+        # Bands x rows whose S-curve midpoint (1/b)^(1/r) is closest to the
+        # threshold from below: extra candidates are only re-checked, but
+        # pairs that never share a bucket are missed for good
+        best = None
+        for rows in range(1, num_perm + 1):
+            if num_perm % rows:
+                continue
+            bands = num_perm // rows
+            midpoint = (1 / bands) ** (1 / rows)
+            rank = (midpoint > threshold, abs(midpoint - threshold))
+            if best is None or rank < best[0]:
+                best = (rank, bands, rows)
+        return best[1], best[2]
+
+    def _shingles(self, text: str) -> np.ndarray:
+        words = text.lower().split()
+        if len(words) <= self.shingle_size:
+            grams = [' '.join(words)]
+        else:
+            grams = [' '.join(words[i:i + self.shingle_size])
+                     for i in range(len(words) - self.shingle_size + 1)]
+        return np.fromiter((zlib.crc32(gram.encode('utf-8')) for gram in set(grams)),
+                           dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        MinHash signature of a paragraph's word shingles
         """
-        processed_paragraphs = []
+        shingles = self._shingles(text)
+        hashes = (shingles[:, None] * self.hash_a + self.hash_b) >> np.uint64(32)
+        return hashes.min(axis=0).astype(np.uint32)
+
+    def filter(self, paragraphs: List[str], seq_length: int = None,
+               tokenizer: FastTokenizer = None) -> List[str]:
+        """
+        Keep the first of each group of near-duplicate paragraphs, in order
+
+        With seq_length and the tokenizer training encodes with, the report
+        also counts the training windows the removed paragraphs would have
+        produced.
+        """
+        buckets = [{} for _ in range(self.num_bands)]
+        kept_signatures = []
+        kept_paragraphs = []
+        removed_paragraphs = []
 
         for para in paragraphs:
-            if not isinstance(para, str):
+            signature = self.signature(para)
+            band_keys = [signature[band * self.rows_per_band:(band + 1) * self.rows_per_band].tobytes()
+                         for band in range(self.num_bands)]
+
+            # Candidates share at least one band; confirm on the estimated similarity
+            candidates = set()
+            for band, key in enumerate(band_keys):
+                candidates.update(buckets[band].get(key, ()))
+            is_duplicate = any(np.mean(kept_signatures[idx] == signature) >= self.threshold
+                               for idx in candidates)
+
+            if is_duplicate:
+                removed_paragraphs.append(para)
                 continue
 
-            # Ensure paragraph has proper structure
-            para = para.strip()
+            idx = len(kept_paragraphs)
+            kept_paragraphs.append(para)
+            kept_signatures.append(signature)
+            for band, key in enumerate(band_keys):
+                buckets[band].setdefault(key, []).append(idx)
 
-            # Ensure it ends with proper punctuation
-            if not para.endswith(('.', '!', '?')):
-                para = para + '.'
+        self.stats = {
+            'input_paragraphs': len(kept_paragraphs) + len(removed_paragraphs),
+            'kept_paragraphs': len(kept_paragraphs),
+            'removed_paragraphs': len(removed_paragraphs)
+        }
+        count_windows = seq_length and tokenizer is not None
+        if count_windows:
+            # Same count as the overlapping windows cut from each token list
+            self.stats['removed_windows'] = sum(max(0, len(token_list) - seq_length)
+                                                for token_list in tokenizer.texts_to_sequences(removed_paragraphs))
 
-            # Basic cleaning
-            para = para.lower()
+        print(f"Near-duplicate filter (Jaccard >= {self.threshold}, "
+              f"{self.num_bands} bands x {self.rows_per_band} rows): "
+              f"removed {len(removed_paragraphs)} of {self.stats['input_paragraphs']} paragraphs")
+        if count_windows:
+            print(f"Training windows removed (length {seq_length}): {self.stats['removed_windows']}")
 
-            # Remove URLs
-            para = re.sub(r'https?://\S+|www\.\S+', '', para)
+        return kept_paragraphs
 
-            # Keep only alphanumeric and basic punctuation
-            para = re.sub(r'[^\w\s.,!?;:\'\"-]', '', para)
 
-            # Remove extra whitespace
-            para = re.sub(r'\s+', ' ', para).strip()
+# Precompiled cleaning patterns, shared by the serial and process-pool paths
+URL_PATTERN = re.compile(r'https?://\S+|www\.\S+')
+DISALLOWED_CHARS_PATTERN = re.compile(r'[^\w\s.,!?;:\'\"-]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+SENTENCE_END_PATTERN = re.compile(r'[.!?]+')
+REPEATED_PERIOD_PATTERN = re.compile(r'\.\s*\.')
 
-            # Check paragraph quality - must have multiple sentences
-            sentences = re.split(r'[.!?]+', para)
-            valid_sentences = [s.strip() for s in sentences if s.strip() and len(s.strip().split()) >= 4]
 
-            if len(valid_sentences) >= 2:  # At least 2 meaningful sentences
-                # Reconstruct paragraph with proper spacing
-                reconstructed = '. '.join(valid_sentences) + '.'
-                reconstructed = re.sub(r'\.\s*\.', '.', reconstructed)  # Remove duplicate periods
+def clean_paragraph(para) -> Optional[str]:
+    """
+    Clean one paragraph for training, or None if it doesn't qualify
+    """
+    if not isinstance(para, str):
+        return None
 
-                # Ensure minimum word count
-                if len(reconstructed.split()) >= 25:
-                    processed_paragraphs.append(reconstructed)
+    # Ensure paragraph has proper structure
+    para = para.strip()
 
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_paragraphs = []
-        for para in processed_paragraphs:
-            para_hash = hashlib.md5(para.encode()).hexdigest()
-            if para_hash not in seen:
-                seen.add(para_hash)
-                unique_paragraphs.append(para)
+    # Ensure it ends with proper punctuation
+    if not para.endswith(('.', '!', '?')):
+        para = para + '.'
+
+    # Basic cleaning
+    para = para.lower()
+
+    # Remove URLs
+    para = URL_PATTERN.sub('', para)
+
+    # Keep only alphanumeric and basic punctuation
+    para = DISALLOWED_CHARS_PATTERN.sub('', para)
+
+    # Remove extra whitespace
+    para = WHITESPACE_PATTERN.sub(' ', para).strip()
+
+    # Check paragraph quality - must have multiple sentences
+    sentences = SENTENCE_END_PATTERN.split(para)
+    valid_sentences = [s.strip() for s in sentences if s.strip() and len(s.strip().split()) >= 4]
+
+    if len(valid_sentences) < 2:  # At least 2 meaningful sentences
+        return None
+
+    # Reconstruct paragraph with proper spacing
+    reconstructed = '. '.join(valid_sentences) + '.'
+    reconstructed = REPEATED_PERIOD_PATTERN.sub('.', reconstructed)  # Remove duplicate periods
+
+    # Ensure minimum word count
+    if len(reconstructed.split()) < 25:
+        return None
+
+    return reconstructed
+
+
+def _clean_paragraph_chunk(chunk: List[str]) -> List[Optional[str]]:
+    return [clean_paragraph(para) for para in chunk]
+
+
+class ParagraphDataPipeline:
+    """
+    tf.data pipeline over paragraphs with sentence-reorder augmentation done per epoch
+
+    Paragraphs are tokenized once, sentence by sentence. Each epoch every
+    training paragraph is emitted as its original or as one of the
+    sentence orders augment_paragraphs would have materialized (picked at
+    random), so epochs see varied orders without the corpus ever being
+    multiplied in memory.
+    """
+
+    def __init__(self, paragraphs: List[str], tokenizer: Tokenizer, seq_length: int):
+        self.seq_length = seq_length
+
+        # Flat sentence tokens; sentence_offsets delimit sentences,
+        # paragraph_offsets delimit each paragraph's run of sentences
+        fast_tokenizer = FastTokenizer.from_keras(tokenizer)
+        tokens, sentence_offsets, paragraph_offsets = [], [0], [0]
+        for para in paragraphs:
+            sentences = [s.strip() for s in re.split(r'[.!?]+', para) if s.strip()]
+            for sentence_tokens in fast_tokenizer.texts_to_sequences([s + '.' for s in sentences]):
+                tokens.extend(sentence_tokens)
+                sentence_offsets.append(len(tokens))
+            paragraph_offsets.append(len(sentence_offsets) - 1)
+
+        self.tokens = np.asarray(tokens, dtype=np.int32)
+        self.sentence_offsets = np.asarray(sentence_offsets, dtype=np.int64)
+        self.paragraph_offsets = np.asarray(paragraph_offsets, dtype=np.int64)
+
+    @property
+    def num_paragraphs(self) -> int:
+        return len(self.paragraph_offsets) - 1
+
+    @staticmethod
+    def num_variations(num_sentences: int) -> int:
+        """
+        Number of reordered variants augment_paragraphs makes for a paragraph
+        """
+        if num_sentences < 3:
+            return 0
+        return 1 + (num_sentences >= 4) + (num_sentences >= 5)
+
+    def _sentence_order(self, num_sentences: int, variant: int, rng: np.random.Generator) -> np.ndarray:
+        # Same orders as augment_paragraphs; variant 0 is the original paragraph
+        order = np.arange(num_sentences)
+        if variant == 1:
+            return np.roll(order, -1)  # Move first sentence to end
+        if variant == 2:
+            return order[::-1]  # Reverse sentence order
+        if variant == 3:
+            middle = order[1:-1].copy()
+            rng.shuffle(middle)  # Shuffle middle sentences
+            return np.concatenate([order[:1], middle, order[-1:]])
+        return order
+
+    def paragraph_tokens(self, paragraph_id: int, rng: np.random.Generator = None) -> np.ndarray:
+        """
+        Token ids of a paragraph, in a random augmented order when rng is given
+        """
+        first, last = self.paragraph_offsets[paragraph_id], self.paragraph_offsets[paragraph_id + 1]
+        num_sentences = last - first
+
+        variant = 0
+        if rng is not None:
+            variant = rng.integers(0, 1 + self.num_variations(num_sentences))
+        order = self._sentence_order(num_sentences, variant, rng) + first
+
+        return np.concatenate([self.tokens[self.sentence_offsets[i]:self.sentence_offsets[i + 1]]
+                               for i in order] or [self.tokens[:0]])
+
+    def num_windows(self, paragraph_ids: np.ndarray = None) -> int:
+        """
+        Training windows per epoch; reordering never changes a paragraph's length
+        """
+        if paragraph_ids is None:
+            paragraph_ids = np.arange(self.num_paragraphs)
+        lengths = (self.sentence_offsets[self.paragraph_offsets[paragraph_ids + 1]] -
+                   self.sentence_offsets[self.paragraph_offsets[paragraph_ids]])
+        return int(np.maximum(lengths - self.seq_length, 0).sum())
+
+    def to_dataset(self, paragraph_ids: np.ndarray, batch_size: int = 128,
+                   augment: bool = True, shuffle: bool = True,
+                   shuffle_buffer: int = 20000, seed: int = None,
+                   first_epoch: int = 0) -> tf.data.Dataset:
+        """
+        Stream (X, y) batches of windows, re-augmenting and reshuffling every epoch
+
+        Each pass over the dataset counts as one epoch, starting at
+        first_epoch. Sentence orders and shuffles depend only on seed and
+        the epoch number, so a run resumed at epoch N (with first_epoch=N)
+        sees exactly the data an uninterrupted run would.
+        """
+        seq_length = self.seq_length
+        paragraph_ids = np.asarray(paragraph_ids, dtype=np.int64)
+        if seed is None:
+            seed = random.randrange(2 ** 31)
+
+        epoch_numbers = itertools.count(first_epoch)
+
+        def next_epoch():
+            return np.int64(next(epoch_numbers))
+
+        def paragraph_windows(paragraph_id, epoch):
+            rng = np.random.default_rng([seed, int(epoch), int(paragraph_id)]) if augment else None
+            token_list = self.paragraph_tokens(int(paragraph_id), rng)
+            if len(token_list) <= seq_length:
+                return np.zeros((0, seq_length), np.int32), np.zeros((0,), np.int32)
+            windows = np.lib.stride_tricks.sliding_window_view(token_list, seq_length + 1)
+            return windows[:, :-1].copy(), windows[:, -1].copy()
+
+        def fetch_windows(paragraph_id, epoch):
+            X, y = tf.numpy_function(paragraph_windows, [paragraph_id, epoch], (tf.int32, tf.int32))
+            X.set_shape([None, seq_length])
+            y.set_shape([None])
+            return X, y
+
+        def paragraph_order(epoch):
+            return np.random.default_rng([seed, int(epoch)]).permutation(paragraph_ids)
+
+        def epoch_dataset(epoch):
+            if shuffle:
+                dataset = tf.data.Dataset.from_tensor_slices(
+                    tf.numpy_function(paragraph_order, [epoch], tf.int64))
+            else:
+                dataset = tf.data.Dataset.from_tensor_slices(paragraph_ids)
+
+            dataset = dataset.map(lambda paragraph_id: fetch_windows(paragraph_id, epoch),
+                                  num_parallel_calls=tf.data.AUTOTUNE)
+            dataset = dataset.unbatch()
+
+            if shuffle:
+                # Windows of one paragraph arrive together; mix them across paragraphs.
+                # The paragraph order already differs per epoch, so a fixed seed is enough here
+                dataset = dataset.shuffle(shuffle_buffer, seed=seed)
+            return dataset
+
+        # Every new iterator (one per Keras epoch) draws the next epoch number
+        dataset = tf.data.Dataset.from_tensors(np.int64(0))
+        dataset = dataset.map(lambda _: tf.numpy_function(next_epoch, [], tf.int64))
+        dataset = dataset.flat_map(epoch_dataset)
+
+        num_batches = -(-self.num_windows(paragraph_ids) // batch_size)
+        dataset = dataset.batch(batch_size)
+        dataset = dataset.apply(tf.data.experimental.assert_cardinality(num_batches))
+        return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident set size of this process so far, in MB (None if unknown)
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+class StageProfiler:
+    """
+    Per-stage wall time, CPU time, peak RSS and item counts for a pipeline run
+
+    Wrap each stage in `with profiler.stage(name) as stage:` and set
+    stage['items'] (or other counts) inside; the record is kept even if
+    the stage returns early. Peak RSS is the process high-water mark at
+    the end of the stage, so a stage that raised it shows a jump.
+    """
+
+    def __init__(self, run_name: str):
+        self.run_name = run_name
+        self.started_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.stages = []
+        self.epochs = []
+        self.metadata = {}
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    @contextmanager
+    def stage(self, name: str):
+        record = {'stage': name}
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_seconds'] = time.perf_counter() - wall_start
+            record['cpu_seconds'] = time.process_time() - cpu_start
+            record['peak_rss_mb'] = peak_rss_mb()
+            self.stages.append(record)
+
+    def report(self) -> dict:
+        return {
+            'run': self.run_name,
+            'started_at': self.started_at,
+            'total_wall_seconds': time.perf_counter() - self._wall_start,
+            'total_cpu_seconds': time.process_time() - self._cpu_start,
+            'peak_rss_mb': peak_rss_mb(),
+            'metadata': self.metadata,
+            'stages': self.stages,
+            'epochs': self.epochs
+        }
+
+    def save(self, report_path: str) -> dict:
+        """
+        Write the JSON run report and print a per-stage summary
+        """
+        report = self.report()
+        os.makedirs(os.path.dirname(report_path) or '.', exist_ok=True)
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        print(f"\nStage profile ({self.run_name}):")
+        for record in self.stages:
+            rss = f"{record['peak_rss_mb']:.0f} MB" if record['peak_rss_mb'] is not None else "n/a"
+            counts = ', '.join(f"{key}={value}" for key, value in record.items()
+                               if key not in ('stage', 'wall_seconds', 'cpu_seconds', 'peak_rss_mb'))
+            print(f"  {record['stage']:<20} wall {record['wall_seconds']:8.2f}s  "
+                  f"cpu {record['cpu_seconds']:8.2f}s  peak RSS {rss:>8}  {counts}")
+        if self.epochs:
+            rates = [epoch['samples_per_sec'] for epoch in self.epochs]
+            print(f"  Throughput: {np.mean(rates):.0f} samples/sec on average over {len(rates)} epochs")
+        print(f"Run report saved to {report_path}")
+        return report
+
+
+class ThroughputCallback(tf.keras.callbacks.Callback):
+    """
+    Per-epoch training throughput, recorded into a StageProfiler
+
+    With samples_per_epoch unknown, samples are estimated as steps x
+    batch_size (and marked approximate).
+    """
+
+    def __init__(self, profiler: StageProfiler, batch_size: int, samples_per_epoch: int = None):
+        super().__init__()
+        self.profiler = profiler
+        self.batch_size = batch_size
+        self.samples_per_epoch = samples_per_epoch
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch_start = time.perf_counter()
+        self._steps = 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._steps += 1
+
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = time.perf_counter() - self._epoch_start
+        samples = self.samples_per_epoch or self._steps * self.batch_size
+
+        record = {
+            'epoch': epoch + 1,
+            'seconds': seconds,
+            'steps': self._steps,
+            'samples': samples,
+            'samples_approximate': self.samples_per_epoch is None,
+            'samples_per_sec': samples / seconds if seconds > 0 else 0.0
+        }
+        record.update({name: float(value) for name, value in (logs or {}).items()})
+        self.profiler.epochs.append(record)
+
+
+class ResponseCache:
+    """
+    LRU response cache with a time-to-live and an optional on-disk tier
+
+    Only deterministic responses are cached unless cache_sampled is set;
+    otherwise a repeated prompt would keep getting the same "random" paragraph.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0, cache_dir: str = None,
+                 cache_sampled: bool = False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.cache_sampled = cache_sampled
+        self.entries = OrderedDict()  # key -> (created timestamp, response)
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """
+        Stable key for a tuple of request parameters
+        """
+        return hashlib.sha1(json.dumps(parts).encode('utf-8')).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Cached response for a key, or None when missing or expired
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            if not self._expired(entry[0]):
+                self.entries.move_to_end(key)
+                return entry[1]
+            del self.entries[key]
+
+        if self.cache_dir:
+            disk_path = self._disk_path(key)
+            if os.path.exists(disk_path):
+                try:
+                    with open(disk_path, 'r', encoding='utf-8') as f:
+                        entry = json.load(f)
+                except (OSError, ValueError):
+                    return None
+
+                if self._expired(entry['created']):
+                    os.remove(disk_path)
+                    return None
+
+                # Promote to the memory tier
+                self._remember(key, entry['created'], entry['response'])
+                self.disk_hits += 1
+                return entry['response']
+
+        return None
+
+    def _remember(self, key: str, created: float, response: str):
+        self.entries[key] = (created, response)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def put(self, key: str, response: str):
+        """
+        Store a response in memory and, if configured, on disk
+        """
+        created = time.time()
+        self._remember(key, created, response)
+
+        if self.cache_dir:
+            # Write then rename, so readers never see a half-written entry
+            disk_path = self._disk_path(key)
+            with open(disk_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump({'created': created, 'response': response}, f)
+            os.replace(disk_path + '.tmp', disk_path)
+
+    def record(self, hit: bool, seconds: float):
+        """
+        Count one lookup and the time it took to answer
+        """
+        if hit:
+            self.hits += 1
+            self.hit_seconds += seconds
+        else:
+            self.misses += 1
+            self.miss_seconds += seconds
+
+    def clear(self, disk: bool = False):
+        """
+        Drop the memory tier and, with disk=True, the on-disk tier too
+        """
+        self.entries.clear()
+        if disk and self.cache_dir:
+            for filename in os.listdir(self.cache_dir):
+                if filename.endswith('.json'):
+                    os.remove(os.path.join(self.cache_dir, filename))
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counts and average latencies in milliseconds
+        """
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'avg_hit_ms': 1000 * self.hit_seconds / self.hits if self.hits else 0.0,
+            'avg_miss_ms': 1000 * self.miss_seconds / self.misses if self.misses else 0.0
+        }
+
+
+class LSTMModelTrainer(ModelBundleMixin, CheckpointedTrainingMixin):
+    """
+    Train and use LSTM model on paragraph data
+    """
+
+    def __init__(self, model_name: str = "paragraph_lstm_model"):
+        self.model_name = model_name
+        self.tokenizer = Tokenizer(oov_token="<OOV>", filters='')
+        self.model = None
+        self.max_sequence_len = None
+        self.vocab_size = None
+        self.stateful_model = None
+        self.training_model = None
+        self.sampler = None
+        self.fast_tokenizer = None
+        self.tflite_interpreter = None
+        self.response_cache = None
+        self._model_version = None
+
+    def preprocess_paragraphs(self, paragraphs: Iterable[str], num_workers: int = 1) -> List[str]:
+        """
+        Clean and prepare paragraph data for training
+
+        num_workers > 1 (or None for one per CPU) cleans in a process pool.
+        """
+        # Cleaned in order, duplicates removed
+        unique_paragraphs = list(stream_cleaned_texts(paragraphs, _clean_paragraph_chunk, num_workers))
 
         print(f"After preprocessing: {len(unique_paragraphs)} unique paragraphs")
         print(f"Average words per paragraph: {np.mean([len(p.split()) for p in unique_paragraphs]):.1f}")
@@ -618,6 +1950,29 @@ class LSTMModelTrainer:
 
         return unique_paragraphs
 
+    def preprocess_paragraphs_to_jsonl(self, paragraphs: Iterable[str],
+                                       output_path: str = "./api_data/paragraphs_clean.jsonl",
+                                       num_workers: int = None,
+                                       chunk_size: int = 512) -> int:
+        """
+        Clean a paragraph stream of any size straight into a JSONL file
+
+        Same cleaning and deduplication as preprocess_paragraphs, but results
+        are written as they are produced instead of collected in memory.
+        Read them back with text_stream.read_jsonl_texts.
+        """
+        print(f"Preprocessing paragraphs into {output_path}...")
+        start_time = time.perf_counter()
+
+        count = write_jsonl_texts(
+            stream_cleaned_texts(paragraphs, _clean_paragraph_chunk, num_workers, chunk_size),
+            output_path
+        )
+
+        elapsed = time.perf_counter() - start_time
+        print(f"After preprocessing: {count} unique paragraphs ({elapsed:.1f}s)")
+        return count
+
     def augment_paragraphs(self, paragraphs: List[str]) -> List[str]:
         """
         Create variations of paragraphs for better training
@@ -657,9 +2012,38 @@ class LSTMModelTrainer:
         print(f"Augmented from {len(paragraphs)} to {len(augmented_paragraphs)} paragraphs")
         return augmented_paragraphs
 
-    def prepare_sequences_from_paragraphs(self, paragraphs: List[str], seq_length: int = 100) -> Tuple[np.ndarray, np.ndarray]:
+    @staticmethod
+    def new_paragraph_tokenizer() -> Tokenizer:
+        """
+        Unfitted tokenizer with the settings every paragraph training path uses
+        """
+        return Tokenizer(num_words=15000, oov_token="<OOV>", filters='')
+
+    def remove_near_duplicates(self, paragraphs: List[str], threshold: float = 0.8,
+                               seq_length: int = 100) -> Tuple[List[str], dict]:
+        """
+        Drop near-duplicate paragraphs (e.g. close augmentation variants)
+
+        Returns the kept paragraphs and a report of what was removed.
+        """
+        # The training tokenizer is fit after filtering, but it maps every word
+        # to an id (unknown ones to <OOV>), so an unfitted one with the same
+        # settings already gives the token counts windows are cut from
+        counting_tokenizer = self.new_paragraph_tokenizer()
+        counting_tokenizer.fit_on_texts([])
+
+        near_duplicate_filter = NearDuplicateFilter(threshold=threshold)
+        kept_paragraphs = near_duplicate_filter.filter(paragraphs, seq_length=seq_length,
+                                                       tokenizer=FastTokenizer.from_keras(counting_tokenizer))
+        return kept_paragraphs, near_duplicate_filter.stats
+
+    def prepare_sequences_from_paragraphs(self, paragraphs: List[str], seq_length: int = 100,
+                                          sparse_labels: bool = True) -> Tuple[np.ndarray, np.ndarray]:
         """
         Convert paragraphs to training sequences
+
+        With sparse_labels (the default) y holds integer word ids; set it to
+        False for the old one-hot matrix of shape (samples, vocab_size).
         """
         if not paragraphs:
             raise ValueError("No paragraph data available for training")
@@ -667,10 +2051,11 @@ class LSTMModelTrainer:
         print(f"\nPreparing sequences from paragraphs with target length: {seq_length}")
 
         # Initialize tokenizer with vocabulary limit
-        self.tokenizer = Tokenizer(num_words=15000, oov_token="<OOV>", filters='')
+        self.tokenizer = self.new_paragraph_tokenizer()
 
         # Fit tokenizer on all paragraphs
         self.tokenizer.fit_on_texts(paragraphs)
+        self.sampler = None
         self.vocab_size = min(len(self.tokenizer.word_index) + 1, 15000)
         print(f"Vocabulary size: {self.vocab_size}")
 
@@ -680,9 +2065,9 @@ class LSTMModelTrainer:
         print(f"Top 10 words: {[word for word, count in word_counts[:10]]}")
 
         # Create sequences from paragraphs
+        token_lists = self.get_fast_tokenizer().texts_to_sequences(paragraphs)
         sequences = []
-        for para in paragraphs:
-            token_list = self.tokenizer.texts_to_sequences([para])[0]
+        for token_list in token_lists:
 
             # Skip very short token lists
             if len(token_list) < seq_length:
@@ -697,8 +2082,7 @@ class LSTMModelTrainer:
             # Fallback: create shorter sequences for shorter paragraphs
             print("Creating shorter sequences for paragraph training...")
             min_seq_length = 50
-            for para in paragraphs:
-                token_list = self.tokenizer.texts_to_sequences([para])[0]
+            for token_list in token_lists:
                 if len(token_list) >= min_seq_length:
                     for i in range(min_seq_length, len(token_list)):
                         n_gram_sequence = token_list[i-min_seq_length:i+1]
@@ -723,21 +2107,155 @@ class LSTMModelTrainer:
         X = sequences[:, :-1]
         y = sequences[:, -1]
 
-        # Convert y to one-hot encoding
-        y = tf.keras.utils.to_categorical(y, num_classes=self.vocab_size)
+        # Keep integer targets unless one-hot encoding was asked for
+        if not sparse_labels:
+            y = tf.keras.utils.to_categorical(y, num_classes=self.vocab_size)
 
         print(f"Created {len(X)} training sequences")
         print(f"X shape: {X.shape}, y shape: {y.shape}")
         return X, y
 
+    def build_token_corpus(self, paragraphs: List[str], corpus_dir: str = "./api_data/token_corpus",
+                           seq_length: int = 100) -> TokenCorpus:
+        """
+        Fit the tokenizer and write paragraphs as a memory-mapped token corpus
+
+        Memory-light alternative to prepare_sequences_from_paragraphs: the
+        windows are never materialized, see create_training_datasets.
+        """
+        if not paragraphs:
+            raise ValueError("No paragraph data available for training")
+
+        print(f"\nBuilding token corpus with target length: {seq_length}")
+
+        self.tokenizer = self.new_paragraph_tokenizer()
+        self.tokenizer.fit_on_texts(paragraphs)
+        self.sampler = None
+        self.vocab_size = min(len(self.tokenizer.word_index) + 1, 15000)
+        print(f"Vocabulary size: {self.vocab_size}")
+
+        corpus = TokenCorpus.build(paragraphs, self.tokenizer, corpus_dir)
+
+        num_windows = len(corpus.window_starts(seq_length))
+        if not num_windows:
+            # Fallback: shorter windows for shorter paragraphs
+            print("Creating shorter sequences for paragraph training...")
+            seq_length = 50
+            num_windows = len(corpus.window_starts(seq_length))
+
+        if not num_windows:
+            raise ValueError("Could not create sequences. Paragraphs might be too short.")
+
+        self.max_sequence_len = seq_length + 1
+        print(f"Actual sequence length: {self.max_sequence_len}")
+        print(f"Number of sequences available: {num_windows}")
+        return corpus
+
+    def create_training_datasets(self, corpus: TokenCorpus, batch_size: int = 128,
+                                 validation_split: float = 0.15,
+                                 seed: int = 42,
+                                 first_epoch: int = 0) -> Tuple[tf.data.Dataset, tf.data.Dataset]:
+        """
+        Split a token corpus by paragraph into streaming train/validation datasets
+
+        Pass the epoch a resumed run starts from as first_epoch.
+        """
+        return self._split_corpus_datasets(corpus, batch_size, validation_split, seed, first_epoch)
+
+    def build_paragraph_pipeline(self, paragraphs: List[str],
+                                 seq_length: int = 100) -> ParagraphDataPipeline:
+        """
+        Fit the tokenizer and set up on-the-fly augmented training data
+
+        Takes un-augmented paragraphs. The tokenizer sees each paragraph as
+        often as augment_paragraphs would have emitted it, so the vocabulary
+        matches the materialized flow.
+        """
+        if not paragraphs:
+            raise ValueError("No paragraph data available for training")
+
+        print(f"\nBuilding paragraph data pipeline with target length: {seq_length}")
+
+        def augmented_texts():
+            for para in paragraphs:
+                num_sentences = len([s for s in re.split(r'[.!?]+', para) if s.strip()])
+                for _ in range(1 + ParagraphDataPipeline.num_variations(num_sentences)):
+                    yield para
+
+        self.tokenizer = self.new_paragraph_tokenizer()
+        self.tokenizer.fit_on_texts(augmented_texts())
+        self.sampler = None
+        self.vocab_size = min(len(self.tokenizer.word_index) + 1, 15000)
+        print(f"Vocabulary size: {self.vocab_size}")
+
+        pipeline = ParagraphDataPipeline(paragraphs, self.tokenizer, seq_length)
+        if not pipeline.num_windows():
+            # Fallback: shorter windows for shorter paragraphs
+            print("Creating shorter sequences for paragraph training...")
+            pipeline.seq_length = 50
+
+        if not pipeline.num_windows():
+            raise ValueError("Could not create sequences. Paragraphs might be too short.")
+
+        self.max_sequence_len = pipeline.seq_length + 1
+        print(f"Actual sequence length: {self.max_sequence_len}")
+        print(f"Windows per epoch: {pipeline.num_windows()}")
+        return pipeline
+
+    def create_augmented_datasets(self, pipeline: ParagraphDataPipeline, batch_size: int = 128,
+                                  validation_split: float = 0.15,
+                                  seed: int = 42,
+                                  first_epoch: int = 0) -> Tuple[tf.data.Dataset, tf.data.Dataset]:
+        """
+        Split paragraphs by ID into an augmented training and a plain validation dataset
+
+        Pass the epoch a resumed run starts from as first_epoch.
+        """
+        # Held-out paragraphs never appear in training, not even reordered
+        paragraph_ids = np.random.default_rng(seed).permutation(pipeline.num_paragraphs)
+        num_val = int(round(pipeline.num_paragraphs * validation_split))
+        val_ids, train_ids = np.sort(paragraph_ids[:num_val]), np.sort(paragraph_ids[num_val:])
+
+        train_dataset = pipeline.to_dataset(train_ids, batch_size, augment=True, shuffle=True,
+                                            seed=seed, first_epoch=first_epoch)
+        val_dataset = pipeline.to_dataset(val_ids, batch_size, augment=False, shuffle=False)
+
+        print(f"Training paragraphs: {len(train_ids)} ({pipeline.num_windows(train_ids)} windows per epoch), "
+              f"validation paragraphs: {len(val_ids)} ({pipeline.num_windows(val_ids)} windows)")
+        return train_dataset, val_dataset
+
     def build_paragraph_model(self, embedding_dim: int = 300,
                             lstm_units: int = 512,
-                            dropout_rate: float = 0.4) -> tf.keras.Model:
+                            dropout_rate: float = 0.4,
+                            bidirectional: bool = True,
+                            sampled_softmax: bool = False,
+                            num_sampled: int = 512,
+                            sparse_labels: bool = True) -> tf.keras.Model:
         """
         Build LSTM model optimized for paragraph generation
+
+        Set bidirectional=False to get a causal stack that supports
+        stateful (one token per step) generation.
+
+        With sampled_softmax=True training goes through a separate training
+        model whose output head scores only num_sampled candidate words per
+        step. It shares every layer with the returned full-softmax model,
+        which is what generation and save_model use. sparse_labels must
+        match the targets the model is trained on: False for one-hot y from
+        prepare_sequences_from_paragraphs(sparse_labels=False).
         """
+        if sampled_softmax and not sparse_labels:
+            raise ValueError("Sampled softmax needs integer targets. "
+                             "Prepare sequences and build the model with sparse_labels=True.")
+
         print("\nBuilding paragraph-optimized LSTM model...")
 
+        # First LSTM layer - a plain LSTM with the same output width keeps the stack causal
+        if bidirectional:
+            first_lstm = Bidirectional(LSTM(lstm_units, return_sequences=True))
+        else:
+            first_lstm = LSTM(lstm_units * 2, return_sequences=True)
+
         model = Sequential([
             # Enhanced embedding layer for better word representation
             Embedding(
@@ -747,8 +2265,8 @@ class LSTMModelTrainer:
                 mask_zero=True
             ),
 
-            # First bidirectional LSTM layer
-            Bidirectional(LSTM(lstm_units, return_sequences=True)),
+            # First LSTM layer (bidirectional by default)
+            first_lstm,
             Dropout(dropout_rate),
 
             # Second LSTM layer for deeper context
@@ -772,37 +2290,150 @@ class LSTMModelTrainer:
 
         # Compile model with optimized settings
         model.compile(
-            loss='categorical_crossentropy',
+            loss='sparse_categorical_crossentropy' if sparse_labels else 'categorical_crossentropy',
             optimizer=Adam(learning_rate=0.0003),  # Lower learning rate for paragraphs
             metrics=['accuracy']
         )
 
+        self.training_model = None
+        if sampled_softmax:
+            # Same layers, but labels come in as an input and the head emits the loss
+            tokens = Input(shape=(self.max_sequence_len - 1,), dtype='int32')
+            labels = Input(shape=(1,), dtype='int32')
+
+            hidden = tokens
+            for layer in model.layers[:-1]:
+                hidden = layer(hidden)
+            loss = SampledSoftmaxLoss(model.layers[-1], num_sampled=num_sampled)([hidden, labels])
+
+            self.training_model = tf.keras.Model([tokens, labels], loss)
+            self.training_model.compile(
+                loss=sampled_softmax_passthrough_loss,
+                optimizer=Adam(learning_rate=0.0003)
+            )
+            print(f"Training with sampled softmax over {num_sampled} candidate words")
+
         print("\nParagraph Model Architecture:")
         model.summary()
         self.model = model
+        self._model_updated()
         return model
 
-    def train_on_paragraphs(self, X: np.ndarray, y: np.ndarray,
-                          epochs: int = 150,  # More epochs for paragraph learning
-                          batch_size: int = 128,  # Smaller batch size for paragraphs
-                          validation_split: float = 0.15) -> dict:  # More validation data
+    def _model_updated(self):
+        """
+        Forget everything derived from the previous weights
+        """
+        self.stateful_model = None
+        self._model_version = None
+        if self.response_cache is not None:
+            self.response_cache.clear()
+
+    @property
+    def model_version(self) -> str:
+        """
+        Content hash of the weights and vocabulary, used in response cache keys
+        """
+        if self._model_version is None:
+            digest = hashlib.sha1()
+            digest.update(json.dumps([self.vocab_size, self.max_sequence_len,
+                                      len(self.tokenizer.word_index)]).encode('utf-8'))
+            for weight in self.model.get_weights():
+                digest.update(np.ascontiguousarray(weight).data)
+            self._model_version = digest.hexdigest()[:16]
+        return self._model_version
+
+    def enable_response_cache(self, max_entries: int = 256, ttl: float = 3600.0,
+                              cache_dir: str = None, cache_sampled: bool = False) -> ResponseCache:
+        """
+        Cache paragraph responses in memory (LRU + TTL) and optionally on disk
+
+        Entries on disk are keyed by model_version, so responses from an
+        older model are never served after a new one is loaded. Only
+        deterministic requests (a seed, or top_k=1) are cached; set
+        cache_sampled=True to also reuse unseeded sampled responses.
+        """
+        self.response_cache = ResponseCache(max_entries=max_entries, ttl=ttl, cache_dir=cache_dir,
+                                            cache_sampled=cache_sampled)
+        return self.response_cache
+
+    def _uses_response_cache(self, seed: Optional[int], top_k: int) -> bool:
+        # Sampling without a seed gives a new paragraph every time, unless caching it was asked for
+        if self.response_cache is None:
+            return False
+        return seed is not None or top_k == 1 or self.response_cache.cache_sampled
+
+    def _response_cache_key(self, prompt: str, max_length: int, temperature: float,
+                            stateful: bool, top_k: int, top_p: float,
+                            seed: Optional[int], backend: str) -> str:
+        return ResponseCache.make_key(self.model_version, prompt, max_length, float(temperature),
+                                      stateful, top_k, float(top_p), seed, backend)
+
+    def build_stateful_model(self) -> tf.keras.Model:
+        """
+        Build a stateful copy of the trained stack for single-step generation
+        """
+        if self.model is None:
+            raise ValueError("Model not loaded. Train or load a model first.")
+
+        # Feed one sequence at a time, of any length (prompt first, then single tokens)
+        stateful_layers = [Input(batch_shape=(1, None), dtype='int32')]
+
+        for layer in self.model.layers:
+            if isinstance(layer, Bidirectional):
+                raise ValueError("Stateful generation needs a unidirectional model. "
+                                 "Build it with build_paragraph_model(bidirectional=False).")
+
+            config = layer.get_config()
+            if isinstance(layer, Embedding):
+                config.pop('input_length', None)
+            elif isinstance(layer, LSTM):
+                config['stateful'] = True
+
+            stateful_layers.append(layer.__class__.from_config(config))
+
+        stateful_model = Sequential(stateful_layers)
+
+        # Same layer order, so the trained weights map over one-to-one
+        stateful_model.set_weights(self.model.get_weights())
+
+        self.stateful_model = stateful_model
+        return stateful_model
+
+    def _reset_stateful_model(self):
         """
-        Train the model on paragraph data
+        Clear the carried h/c states before a new generation
         """
-        print(f"\nStarting paragraph training...")
-        print(f"Training samples: {len(X)}")
-        print(f"Batch size: {batch_size}")
-        print(f"Epochs: {epochs}")
+        for layer in self.stateful_model.layers:
+            if isinstance(layer, LSTM):
+                layer.reset_states()
 
-        # Create callbacks with paragraph-specific settings
-        callbacks = [
-            ModelCheckpoint(
+    def _paragraph_callbacks(self) -> list:
+        """
+        Checkpoint, early-stopping and LR schedule callbacks for paragraph training
+        """
+        # The sampled-softmax training model reports loss only, and holds a
+        # custom head, so checkpoint its weights on val_loss instead
+        if self.training_model is not None:
+            checkpoint = ModelCheckpoint(
+                f'{self.model_name}_paragraph_best.weights.h5',
+                monitor='val_loss',
+                save_best_only=True,
+                save_weights_only=True,
+                mode='min',
+                verbose=1
+            )
+        else:
+            checkpoint = ModelCheckpoint(
                 f'{self.model_name}_paragraph_best.h5',
                 monitor='val_accuracy',
                 save_best_only=True,
                 mode='max',
                 verbose=1
-            ),
+            )
+
+        # Create callbacks with paragraph-specific settings
+        callbacks = [
+            checkpoint,
             EarlyStopping(
                 monitor='val_loss',
                 patience=20,  # More patience for paragraph learning
@@ -818,18 +2449,75 @@ class LSTMModelTrainer:
             )
         ]
 
+        return callbacks
+
+    def train_on_paragraphs(self, X: np.ndarray, y: np.ndarray,
+                          epochs: int = 150,  # More epochs for paragraph learning
+                          batch_size: int = 128,  # Smaller batch size for paragraphs
+                          validation_split: float = 0.15,  # More validation data
+                          checkpoint_dir: str = None,
+                          resume: bool = False,
+                          extra_callbacks: list = None) -> dict:
+        """
+        Train the model on paragraph data
+
+        checkpoint_dir turns on periodic full checkpoints (see
+        TrainingCheckpoint); resume=True continues from the one found there.
+        extra_callbacks are added to the fit, e.g. a ThroughputCallback.
+        """
+        print(f"\nStarting paragraph training...")
+        print(f"Training samples: {len(X)}")
+        print(f"Batch size: {batch_size}")
+        print(f"Epochs: {epochs}")
+
+        callbacks = self._paragraph_callbacks()
+
+        if self.training_model is not None:
+            fit_model, fit_inputs = self.training_model, [X, y.reshape(-1, 1)]
+        else:
+            fit_model, fit_inputs = self.model, X
+
         # Train with class weight consideration if needed
-        history = self.model.fit(
-            X, y,
+        history = self._fit(
+            fit_model, callbacks, checkpoint_dir, resume, extra_callbacks,
+            x=fit_inputs,
+            y=y,
             epochs=epochs,
             batch_size=batch_size,
             validation_split=validation_split,
-            callbacks=callbacks,
             verbose=1
         )
 
         print("\nParagraph training completed!")
-        return history.history
+
+        # Weights changed, so any stateful copy or cached response is stale
+        self._model_updated()
+        return history
+
+    def train_on_dataset(self, train_dataset: tf.data.Dataset,
+                         val_dataset: tf.data.Dataset,
+                         epochs: int = 150,
+                         checkpoint_dir: str = None,
+                         resume: bool = False,
+                         extra_callbacks: list = None) -> dict:
+        """
+        Train the model on streaming (X, y) datasets, e.g. from create_training_datasets
+
+        checkpoint_dir turns on periodic full checkpoints (see
+        TrainingCheckpoint); resume=True continues from the one found there.
+        extra_callbacks are added to the fit, e.g. a ThroughputCallback.
+        """
+        print(f"\nStarting paragraph training from streaming dataset...")
+        print(f"Epochs: {epochs}")
+
+        history = self._fit_datasets(train_dataset, val_dataset, self._paragraph_callbacks(),
+                                     epochs, checkpoint_dir, resume, extra_callbacks)
+
+        print("\nParagraph training completed!")
+
+        # Weights changed, so any stateful copy or cached response is stale
+        self._model_updated()
+        return history
 
     def save_model(self, save_dir: str = "./trained_models"):
         """
@@ -882,6 +2570,7 @@ class LSTMModelTrainer:
         # Load tokenizer
         with open(tokenizer_path, 'rb') as f:
             self.tokenizer = pickle.load(f)
+        self.sampler = None
 
         # Load metadata
         with open(metadata_path, 'r') as f:
@@ -889,18 +2578,239 @@ class LSTMModelTrainer:
             self.vocab_size = metadata['vocab_size']
             self.max_sequence_len = metadata['max_sequence_len']
 
+        self._model_updated()
         print(f"Model loaded from {model_path}")
         print(f"Vocabulary size: {self.vocab_size}")
 
+    def _heldout_windows(self, paragraphs: List[str], max_windows: int = 200,
+                         seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Next-token windows (left-padded context, target id) from paragraphs
+        """
+        window = self.max_sequence_len - 1
+        contexts, targets = [], []
+
+        for sequence in self.get_fast_tokenizer().texts_to_sequences(self.preprocess_paragraphs(paragraphs)):
+            for i in range(1, len(sequence)):
+                contexts.append(sequence[max(0, i - window):i])
+                targets.append(sequence[i])
+
+        if not contexts:
+            raise ValueError("No held-out windows could be built from the given paragraphs")
+
+        chosen = np.random.default_rng(seed).permutation(len(contexts))[:max_windows]
+        X = pad_sequences([contexts[i] for i in chosen], maxlen=window, padding='pre').astype(np.int32)
+        y = np.array([targets[i] for i in chosen])
+        return X, y
+
+    def export_tflite(self, save_dir: str = "./trained_models",
+                      quantization: str = 'dynamic',
+                      heldout_paragraphs: List[str] = None,
+                      num_windows: int = 200) -> dict:
+        """
+        Export a quantized TFLite copy of the model for CPU inference
+
+        quantization='dynamic' stores weights as int8 and keeps float
+        activations. Full int8 (calibrated activations) is not offered: the
+        converter crashes while calibrating the LSTM layers. When
+        heldout_paragraphs is given the float and TFLite models are compared
+        on them and the report is saved next to the .tflite file.
+        """
+        # Only needed here, so scripts that never export don't depend on TF internals
+        from tensorflow.python.framework.convert_to_constants import convert_variables_to_constants_v2
+
+        if self.model is None:
+            raise ValueError("Model not loaded. Train or load a model first.")
+        if quantization != 'dynamic':
+            raise ValueError(f"Unknown quantization: {quantization} (supported: 'dynamic')")
+
+        window = self.max_sequence_len - 1
+        serving_fn = tf.function(lambda tokens: self.model(tokens, training=False),
+                                 input_signature=[tf.TensorSpec([1, window], tf.int32)])
+
+        # Fold the weights into constants; the converter can't read the variables inside the LSTM loops
+        frozen_fn = convert_variables_to_constants_v2(serving_fn.get_concrete_function())
+
+        # Unquantized conversion of the same graph, the baseline for the size report
+        float_size_bytes = len(tf.lite.TFLiteConverter.from_concrete_functions([frozen_fn]).convert())
+
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([frozen_fn])
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+        print(f"Converting model to TFLite ({quantization} quantization)...")
+        tflite_model = converter.convert()
+
+        os.makedirs(save_dir, exist_ok=True)
+        tflite_path = os.path.join(save_dir, f"{self.model_name}_{quantization}.tflite")
+        with open(tflite_path, 'wb') as f:
+            f.write(tflite_model)
+        print(f"TFLite model saved to {tflite_path}")
+
+        self.load_tflite(tflite_path)
+
+        report = {
+            'quantization': quantization,
+            'tflite_path': tflite_path,
+            'float_size_bytes': float_size_bytes,
+            'tflite_size_bytes': os.path.getsize(tflite_path)
+        }
+        report['size_ratio'] = report['tflite_size_bytes'] / report['float_size_bytes']
+
+        if heldout_paragraphs:
+            report.update(self.compare_tflite(heldout_paragraphs, num_windows))
+
+        report_path = os.path.join(save_dir, f"{self.model_name}_{quantization}_tflite_report.json")
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        print("\nTFLite export report:")
+        print(f"  File size: {report['float_size_bytes'] / 1e6:.1f} MB float -> "
+              f"{report['tflite_size_bytes'] / 1e6:.1f} MB quantized ({report['size_ratio']:.2f}x)")
+        if 'top1_agreement' in report:
+            print(f"  Per-token latency: {report['float_ms_per_token']:.2f} ms float, "
+                  f"{report['tflite_ms_per_token']:.2f} ms TFLite")
+            print(f"  Top-1 agreement: {report['top1_agreement']:.1%} over {report['num_windows']} windows")
+            print(f"  Next-token accuracy: {report['float_accuracy']:.1%} float, "
+                  f"{report['tflite_accuracy']:.1%} TFLite")
+        print(f"Report saved to {report_path}")
+
+        return report
+
+    def load_tflite(self, tflite_path: str):
+        """
+        Load an exported .tflite model as the 'tflite' generation backend
+        """
+        if not os.path.exists(tflite_path):
+            raise FileNotFoundError(f"File not found: {tflite_path}")
+
+        self.tflite_interpreter = tf.lite.Interpreter(model_path=tflite_path)
+        self.tflite_interpreter.allocate_tensors()
+        print(f"TFLite model loaded from {tflite_path}")
+
+    def _predict_tflite(self, token_list: np.ndarray) -> np.ndarray:
+        """
+        Next-word probabilities for a single [1, window] token array
+        """
+        if self.tflite_interpreter is None:
+            raise ValueError("TFLite model not loaded. Export or load one first.")
+
+        input_details = self.tflite_interpreter.get_input_details()[0]
+        output_details = self.tflite_interpreter.get_output_details()[0]
+        self.tflite_interpreter.set_tensor(input_details['index'], token_list.astype(np.int32))
+        self.tflite_interpreter.invoke()
+        return self.tflite_interpreter.get_tensor(output_details['index'])[0].copy()
+
+    def compare_tflite(self, heldout_paragraphs: List[str], num_windows: int = 200) -> dict:
+        """
+        Compare the float and TFLite models on next-token windows from held-out paragraphs
+        """
+        X, y = self._heldout_windows(heldout_paragraphs, max_windows=num_windows)
+        float_ids, tflite_ids = np.empty(len(X), dtype=np.int64), np.empty(len(X), dtype=np.int64)
+        float_time = tflite_time = 0.0
+
+        # Warm up both backends so one-off tracing isn't counted as latency
+        self.model.predict(X[:1], verbose=0)
+        self._predict_tflite(X[:1])
+
+        # One window at a time, through the same calls generate_paragraph makes
+        for i, tokens in enumerate(X):
+            tokens = tokens.reshape(1, -1)
+
+            start_time = time.perf_counter()
+            float_ids[i] = np.argmax(self.model.predict(tokens, verbose=0)[0])
+            float_time += time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            tflite_ids[i] = np.argmax(self._predict_tflite(tokens))
+            tflite_time += time.perf_counter() - start_time
+
+        return {
+            'num_windows': len(X),
+            'float_ms_per_token': 1000 * float_time / len(X),
+            'tflite_ms_per_token': 1000 * tflite_time / len(X),
+            'top1_agreement': float(np.mean(float_ids == tflite_ids)),
+            'float_accuracy': float(np.mean(float_ids == y)),
+            'tflite_accuracy': float(np.mean(tflite_ids == y))
+        }
+
+    def get_sampler(self) -> TokenSampler:
+        """
+        Shared sampler with the id -> word table for the current tokenizer
+        """
+        if self.sampler is None:
+            self.sampler = TokenSampler.from_tokenizer(self.tokenizer, vocab_size=self.vocab_size)
+        return self.sampler
+
+    def get_fast_tokenizer(self) -> FastTokenizer:
+        """
+        Compiled encoder for the current tokenizer, rebuilt after fitting or loading
+        """
+        if self.fast_tokenizer is None or not self.fast_tokenizer.matches(self.tokenizer):
+            self.fast_tokenizer = FastTokenizer.from_keras(self.tokenizer)
+        return self.fast_tokenizer
+
+    def _sample_next_words(self, predictions: np.ndarray,
+                           temperature: Union[float, np.ndarray],
+                           top_k: int = 0,
+                           top_p: float = 1.0,
+                           rng=None) -> Tuple[np.ndarray, List[str]]:
+        """
+        Sample one word id per probability row and map the ids to words
+
+        rng is a per-call Generator (or one per row) replacing the shared sampler's stream.
+        """
+        sampler = self.get_sampler()
+
+        # Very low probability words are filtered out, as before
+        predicted_ids = sampler.sample(predictions, temperature=temperature,
+                                       top_k=top_k, top_p=top_p, min_prob=0.001, rng=rng)
+        return predicted_ids, sampler.words(predicted_ids)
+
     def generate_paragraph(self, seed_text: str,
                          num_words: int = 150,  # Generate longer text for paragraphs
                          temperature: float = 0.7,
-                         max_attempts: int = 3) -> str:
+                         max_attempts: int = 3,
+                         stateful: bool = False,
+                         top_k: int = 0,
+                         top_p: float = 1.0,
+                         backend: str = 'keras',
+                         post_process: bool = True,
+                         seed: Optional[int] = None) -> str:
         """
         Generate paragraph from seed text
+
+        top_k / top_p restrict sampling to the k most likely words or to the
+        smallest set of words holding top_p of the probability mass.
+
+        With stateful=True the prompt is run once through a stateful copy of
+        the model and each new word costs a single step of every layer. The
+        output matches the window-based path while prompt plus generated
+        text fits in the training window (max_sequence_len - 1 tokens);
+        past that point the carried state keeps the full history instead of
+        dropping the oldest tokens.
+
+        backend='tflite' runs the window-based path on the interpreter loaded
+        by export_tflite / load_tflite.
+
+        post_process=False returns the seed text followed by the sampled
+        words as they came out, without _post_process_paragraph.
+
+        With a seed, sampling draws from its own Generator, so the same
+        prompt and settings always give the same paragraph; the shared
+        sampler's stream is left alone.
         """
-        if self.model is None:
+        if self.model is None and backend == 'keras':
             raise ValueError("Model not loaded. Train or load a model first.")
+        if backend not in ('keras', 'tflite'):
+            raise ValueError(f"Unknown backend: {backend}")
+        if backend == 'tflite' and self.tflite_interpreter is None:
+            raise ValueError("TFLite model not loaded. Export or load one first.")
+
+        if stateful:
+            if backend != 'keras':
+                raise ValueError("Stateful generation is only available on the keras backend")
+            return self._generate_paragraph_stateful(seed_text, num_words, temperature,
+                                                     max_attempts, top_k, top_p, post_process, seed)
 
         generated_text = seed_text
         seed_text_original = seed_text
@@ -910,11 +2820,16 @@ class LSTMModelTrainer:
         if not seed_text.endswith(('.', '!', '?')):
             seed_text = seed_text + '.'
 
+        # Tokenize the seed once; each generated word only appends its own ids
+        fast_tokenizer = self.get_fast_tokenizer()
+        token_ids = fast_tokenizer.encode(seed_text)
+        rng = np.random.default_rng(seed) if seed is not None else None
+
         for word_num in range(num_words):
             for attempt in range(max_attempts):
                 try:
-                    # Tokenize and pad
-                    token_list = self.tokenizer.texts_to_sequences([seed_text])[0]
+                    # Pad
+                    token_list = token_ids[-(self.max_sequence_len - 1):]
                     if len(token_list) < self.max_sequence_len - 1:
                         padding_needed = self.max_sequence_len - 1 - len(token_list)
                         token_list = [0] * padding_needed + token_list
@@ -923,31 +2838,18 @@ class LSTMModelTrainer:
                     token_list = np.array(token_list).reshape(1, -1)
 
                     # Predict
-                    predictions = self.model.predict(token_list, verbose=0)[0]
-
-                    # Apply temperature with smoothing
-                    if temperature > 0:
-                        predictions = np.log(predictions + 1e-10) / temperature
-                        exp_predictions = np.exp(predictions)
-                        predictions = exp_predictions / np.sum(exp_predictions)
-
-                    # Filter very low probability predictions
-                    predictions = np.where(predictions < 0.001, 0, predictions)
-                    predictions = predictions / np.sum(predictions)  # Renormalize
+                    if backend == 'tflite':
+                        predictions = self._predict_tflite(token_list)
+                    else:
+                        predictions = self.model.predict(token_list, verbose=0)[0]
 
                     # Sample next word
-                    predicted_id = np.random.choice(len(predictions), p=predictions)
-
-                    # Convert to word
-                    output_word = ""
-                    for word, idx in self.tokenizer.word_index.items():
-                        if idx == predicted_id:
-                            output_word = word
-                            break
+                    _, output_words = self._sample_next_words(predictions, temperature, top_k, top_p, rng)
+                    output_word = output_words[0]
 
                     # Update texts
                     if output_word:
-                        seed_text += " " + output_word
+                        fast_tokenizer.append(token_ids, output_word)
                         generated_text += " " + output_word
 
                     # Check for natural paragraph breaks
@@ -963,10 +2865,133 @@ class LSTMModelTrainer:
                         return generated_text
 
         # Post-process for paragraph coherence
-        generated_text = self._post_process_paragraph(generated_text, seed_text_original)
+        if post_process:
+            generated_text = self._post_process_paragraph(generated_text, seed_text_original)
+
+        return generated_text
+
+    def _generate_paragraph_stateful(self, seed_text: str, num_words: int,
+                                     temperature: float, max_attempts: int,
+                                     top_k: int = 0, top_p: float = 1.0,
+                                     post_process: bool = True, seed: Optional[int] = None) -> str:
+        """
+        Generate paragraph one token per step, carrying LSTM states forward
+        """
+        if self.stateful_model is None:
+            self.build_stateful_model()
+
+        generated_text = seed_text
+        seed_text_original = seed_text
+
+        # Ensure seed text is properly formatted
+        seed_text = seed_text.lower().strip()
+        if not seed_text.endswith(('.', '!', '?')):
+            seed_text = seed_text + '.'
+
+        # Run the prompt once; a lone padding token reproduces an all-padding window
+        token_list = self.get_fast_tokenizer().encode(seed_text)
+        token_list = token_list[-(self.max_sequence_len - 1):] or [0]
+
+        self._reset_stateful_model()
+        predictions = np.asarray(self.stateful_model(np.array([token_list]), training=False))[0]
+        rng = np.random.default_rng(seed) if seed is not None else None
+
+        for word_num in range(num_words):
+            for attempt in range(max_attempts):
+                try:
+                    predicted_ids, output_words = self._sample_next_words(predictions, temperature, top_k, top_p, rng)
+                    predicted_id, output_word = predicted_ids[0], output_words[0]
+
+                    # Advance the states by the new token only
+                    if output_word:
+                        generated_text += " " + output_word
+                        step_input = np.array([[predicted_id]])
+                        predictions = np.asarray(self.stateful_model(step_input, training=False))[0]
+
+                    break
+
+                except Exception as e:
+                    if attempt == max_attempts - 1:
+                        print(f"Failed to generate word {word_num + 1}: {e}")
+                        return generated_text
+
+        # Post-process for paragraph coherence
+        if post_process:
+            generated_text = self._post_process_paragraph(generated_text, seed_text_original)
 
         return generated_text
 
+    def generate_paragraphs_batch(self, prompts: List[str],
+                                  num_words: Union[int, List[int]] = 150,
+                                  temperature: Union[float, List[float]] = 0.7,
+                                  top_k: int = 0,
+                                  top_p: float = 1.0,
+                                  post_process: bool = True,
+                                  seed: Optional[int] = None) -> List[str]:
+        """
+        Generate paragraphs for many prompts at once
+
+        Every unfinished prompt advances together as one [B, T] window batch,
+        so each forward pass serves all active rows. num_words and
+        temperature can be given per prompt; a row drops out of the batch
+        once it has produced its words. post_process=False returns each
+        prompt followed by its sampled words, as generate_paragraph does.
+
+        With a seed, every row samples from its own Generator seeded with
+        it, so a prompt's paragraph doesn't depend on the rest of the batch.
+        """
+        if self.model is None:
+            raise ValueError("Model not loaded. Train or load a model first.")
+
+        if not prompts:
+            return []
+
+        batch_size = len(prompts)
+        window = self.max_sequence_len - 1
+        temperatures = np.broadcast_to(np.asarray(temperature, dtype=np.float64), (batch_size,))
+        word_limits = np.broadcast_to(np.asarray(num_words, dtype=np.int64), (batch_size,))
+
+        # Left-padded token windows, one row per prompt
+        fast_tokenizer = self.get_fast_tokenizer()
+        tokens = np.zeros((batch_size, window), dtype=np.int32)
+        for row, prompt in enumerate(prompts):
+            seed_text = prompt.lower().strip()
+            if not seed_text.endswith(('.', '!', '?')):
+                seed_text = seed_text + '.'
+
+            token_list = fast_tokenizer.encode(seed_text)[-window:]
+            if token_list:
+                tokens[row, -len(token_list):] = token_list
+
+        generated_texts = list(prompts)
+        row_rngs = [np.random.default_rng(seed) for _ in prompts] if seed is not None else None
+        words_done = np.zeros(batch_size, dtype=np.int64)
+        active = words_done < word_limits
+
+        while active.any():
+            rows = np.flatnonzero(active)
+
+            predictions = np.asarray(self.model(tokens[rows], training=False))
+            rng = [row_rngs[row] for row in rows] if row_rngs is not None else None
+            predicted_ids, output_words = self._sample_next_words(predictions, temperatures[rows], top_k, top_p, rng)
+
+            # Slide each row's window by the word it produced
+            for row, predicted_id, output_word in zip(rows, predicted_ids, output_words):
+                if output_word:
+                    tokens[row, :-1] = tokens[row, 1:]
+                    tokens[row, -1] = predicted_id
+                    generated_texts[row] += " " + output_word
+
+            words_done[rows] += 1
+            active = words_done < word_limits
+
+        if not post_process:
+            return generated_texts
+
+        # Post-process for paragraph coherence
+        return [self._post_process_paragraph(text, prompt)
+                for text, prompt in zip(generated_texts, prompts)]
+
     def _post_process_paragraph(self, text: str, original_prompt: str) -> str:
         """
         Clean and format generated paragraph for better readability
@@ -1012,11 +3037,9 @@ class LSTMModelTrainer:
 
         return response
 
-    def get_paragraph_response(self, prompt: str,
-                             max_length: int = 120,
-                             temperature: float = 0.65) -> str:
+    def _clean_prompt(self, prompt: str) -> str:
         """
-        Get AI paragraph response for a prompt
+        Normalize a user prompt before generation
         """
         # Clean and format prompt
         prompt = prompt.lower().strip()
@@ -1026,15 +3049,12 @@ class LSTMModelTrainer:
         if not prompt.endswith(('.', '!', '?')):
             prompt = prompt + '?'
 
-        print(f"Generating paragraph response for: '{prompt}'...")
-
-        # Generate paragraph response
-        full_response = self.generate_paragraph(
-            seed_text=prompt,
-            num_words=max_length,
-            temperature=temperature
-        )
+        return prompt
 
+    def _format_paragraph_response(self, full_response: str, prompt: str, max_length: int) -> str:
+        """
+        Turn a generated paragraph into a response of at most max_length words
+        """
         # Extract and clean the response
         response = full_response[len(prompt):].strip()
 
@@ -1065,24 +3085,170 @@ class LSTMModelTrainer:
 
         return response
 
+    def get_paragraph_response(self, prompt: str,
+                             max_length: int = 120,
+                             temperature: float = 0.65,
+                             stateful: bool = False,
+                             top_k: int = 0,
+                             top_p: float = 1.0,
+                             backend: str = 'keras',
+                             seed: Optional[int] = None) -> str:
+        """
+        Get AI paragraph response for a prompt
+
+        With a seed, sampling uses a Generator of its own, so the same
+        prompt and settings always give the same paragraph. When a response
+        cache is enabled, repeated deterministic requests are answered from it.
+        """
+        start_time = time.perf_counter()
+        prompt = self._clean_prompt(prompt)
+
+        cache_key = None
+        if self._uses_response_cache(seed, top_k):
+            cache_key = self._response_cache_key(prompt, max_length, temperature, stateful,
+                                                 top_k, top_p, seed, backend)
+            response = self.response_cache.get(cache_key)
+            if response is not None:
+                self.response_cache.record(True, time.perf_counter() - start_time)
+                return response
+
+        print(f"Generating paragraph response for: '{prompt}'...")
+
+        # Generate paragraph response
+        full_response = self.generate_paragraph(
+            seed_text=prompt,
+            num_words=max_length,
+            temperature=temperature,
+            stateful=stateful,
+            top_k=top_k,
+            top_p=top_p,
+            backend=backend,
+            seed=seed
+        )
+
+        response = self._format_paragraph_response(full_response, prompt, max_length)
+
+        if cache_key is not None:
+            self.response_cache.put(cache_key, response)
+            self.response_cache.record(False, time.perf_counter() - start_time)
+
+        return response
+
+    def get_paragraph_responses_batch(self, prompts: List[str],
+                                      max_length: int = 120,
+                                      temperature: Union[float, List[float]] = 0.65,
+                                      top_k: int = 0,
+                                      top_p: float = 1.0,
+                                      seed: Optional[int] = None) -> List[str]:
+        """
+        Get AI paragraph responses for several prompts in one batched generation
+
+        A seed makes each prompt's paragraph reproducible, as in
+        get_paragraph_response. With a response cache enabled and
+        deterministic settings (a seed or top_k=1) or cache_sampled, only
+        the prompts it can't answer are generated.
+        """
+        start_time = time.perf_counter()
+        prompts = [self._clean_prompt(prompt) for prompt in prompts]
+        temperatures = np.broadcast_to(np.asarray(temperature, dtype=np.float64), (len(prompts),))
+        responses = [None] * len(prompts)
+        use_cache = self._uses_response_cache(seed, top_k)
+
+        cache_keys = [None] * len(prompts)
+        if use_cache:
+            for i, prompt in enumerate(prompts):
+                cache_keys[i] = self._response_cache_key(prompt, max_length, temperatures[i], False,
+                                                         top_k, top_p, seed, 'keras')
+                responses[i] = self.response_cache.get(cache_keys[i])
+        pending = [i for i, response in enumerate(responses) if response is None]
+
+        # A prompt repeated within the batch is generated once
+        duplicates = {}
+        if use_cache:
+            first_index = {}
+            for i in pending:
+                if cache_keys[i] in first_index:
+                    duplicates[i] = first_index[cache_keys[i]]
+                else:
+                    first_index[cache_keys[i]] = i
+            pending = [i for i in pending if i not in duplicates]
+
+            lookup_seconds = time.perf_counter() - start_time
+            for i in range(len(prompts)):
+                if responses[i] is not None:
+                    self.response_cache.record(True, lookup_seconds / len(prompts))
+
+        if pending:
+            print(f"Generating paragraph responses for {len(pending)} prompts...")
+            generation_start = time.perf_counter()
+
+            full_responses = self.generate_paragraphs_batch(
+                [prompts[i] for i in pending],
+                num_words=max_length,
+                temperature=temperatures[pending],
+                top_k=top_k,
+                top_p=top_p,
+                seed=seed
+            )
+
+            for i, full_response in zip(pending, full_responses):
+                responses[i] = self._format_paragraph_response(full_response, prompts[i], max_length)
+
+            if use_cache:
+                # The batch is shared, so each prompt is charged an equal slice of it
+                generation_seconds = (time.perf_counter() - generation_start) / len(pending)
+                for i in pending:
+                    self.response_cache.put(cache_keys[i], responses[i])
+                    self.response_cache.record(False, generation_seconds)
+
+        for i, source in duplicates.items():
+            responses[i] = responses[source]
+            self.response_cache.record(True, 0.0)
+
+        return responses
+
 
 class APIAIModel:
     """
     Main class to manage API data fetching, paragraph creation, and model training
     """
 
-    def __init__(self):
-        self.data_fetcher = APIDataFetcher(max_workers=5)
+    def __init__(self, paragraph_store_path: Optional[str] = "./api_data/paragraph_store.sqlite"):
+        self.data_fetcher = APIDataFetcher(max_workers=5, cache_dir="./api_data/http_cache")
         self.paragraph_creator = ParagraphCreator()
         self.model_trainer = None
         self.api_configs = []
         self.training_paragraphs = []
+        self.response_cache_dir = "./api_data/response_cache"
+        # None regenerates every paragraph on each fetch and saves them as JSON
+        self.paragraph_store_path = paragraph_store_path
+        self.paragraph_store = None
+
+    def _ensure_paragraph_store(self) -> 'ParagraphStore':
+        """
+        Open the paragraph store on first use
+        """
+        if self.paragraph_store is None:
+            self.paragraph_store = ParagraphStore(self.paragraph_store_path)
+        return self.paragraph_store
+
+    def _ensure_response_cache(self):
+        """
+        Turn on the trainer's response cache (memory + disk) if it isn't on yet
+        """
+        if self.model_trainer.response_cache is None:
+            self.model_trainer.enable_response_cache(cache_dir=self.response_cache_dir)
 
     def add_api_endpoint(self, url: str, method: str = 'GET',
                          params: dict = None, headers: dict = None,
-                         data: dict = None, name: str = None):
+                         data: dict = None, name: str = None, pagination: dict = None,
+                         stream: bool = False):
         """
         Add an API endpoint to fetch data from
+
+        pagination follows its pages, see APIDataFetcher.iter_paginated,
+        e.g. {'type': 'page', 'page_param': 'page'} or {'type': 'next', 'next_field': 'next'}.
+        stream=True parses responses incrementally, for very large payloads.
         """
         if not name:
             # Generate name from URL
@@ -1096,7 +3262,9 @@ class APIAIModel:
             'params': params or {},
             'headers': headers or {},
             'data': data,
-            'timeout': 30
+            'timeout': 30,
+            'pagination': pagination,
+            'stream': stream
         }
 
         self.api_configs.append(api_config)
@@ -1112,50 +3280,86 @@ class APIAIModel:
     def fetch_and_create_paragraphs(self) -> List[str]:
         """
         Fetch data from APIs and transform into training paragraphs
+
+        A stage profile is saved to ./api_data/fetch_run_report.json.
         """
         if not self.api_configs:
             print("No APIs added. Please add API endpoints first.")
             return []
 
+        profiler = StageProfiler("fetch_and_create_paragraphs")
+        profiler.metadata['num_apis'] = len(self.api_configs)
+        try:
+            return self._fetch_and_create_paragraphs(profiler)
+        finally:
+            profiler.save("./api_data/fetch_run_report.json")
+
+    def _fetch_and_create_paragraphs(self, profiler: StageProfiler) -> List[str]:
         print(f"\nFetching data from {len(self.api_configs)} APIs...")
+        fetched = {'items': 0}
+
+        def counted(items: Iterator[dict]) -> Iterator[dict]:
+            for item in items:
+                fetched['items'] += 1
+                yield item
 
-        # Fetch structured data from APIs
-        structured_data = self.data_fetcher.fetch_multiple_apis(self.api_configs)
+        # Stream structured items page by page straight into paragraph creation
+        print("\nCreating training paragraphs from API data...")
+        errors = []
+        with profiler.stage("fetch_and_transform") as stage:
+            items = counted(self.data_fetcher.iter_structured_items(self.api_configs, errors=errors))
+            if self.paragraph_store_path:
+                paragraphs = self.paragraph_creator.transform_to_paragraphs_incremental(
+                    items, self._ensure_paragraph_store(), retire_missing=False)
+            else:
+                paragraphs = self.paragraph_creator.transform_to_paragraphs(items)
+            stage['items_in'] = fetched['items']
+            stage['items'] = len(paragraphs)
 
-        if not structured_data:
+        if not fetched['items']:
             print("No structured data fetched from APIs.")
             return []
 
-        print(f"\nFetched {len(structured_data)} structured data items")
+        # Listings missing from a partial fetch may still exist: only retire after a complete one
+        if self.paragraph_store_path:
+            if errors:
+                print(f"Keeping stored paragraphs of unseen properties: fetch incomplete ({len(errors)} errors)")
+            else:
+                retired = self.paragraph_store.retire_unseen()
+                print(f"Retired paragraphs of {retired} deleted or changed properties")
 
-        # Transform structured data into paragraphs
-        print("\nCreating training paragraphs from API data...")
-        paragraphs = self.paragraph_creator.transform_to_paragraphs(structured_data)
+        print(f"\nFetched {fetched['items']} structured data items")
 
         # Store for later use
         self.training_paragraphs = paragraphs
 
         # Save paragraphs for reference
         if paragraphs:
-            os.makedirs("./api_data", exist_ok=True)
-
-            # Save raw paragraphs
-            with open("./api_data/training_paragraphs.json", 'w', encoding='utf-8') as f:
-                json.dump(paragraphs, f, indent=2, ensure_ascii=False)
-
-            # Save paragraph statistics
-            stats = {
-                'total_paragraphs': len(paragraphs),
-                'avg_words_per_paragraph': np.mean([len(p.split()) for p in paragraphs]),
-                'total_words': sum([len(p.split()) for p in paragraphs]),
-                'sample_paragraphs': paragraphs[:3]
-            }
-
-            with open("./api_data/paragraph_stats.json", 'w', encoding='utf-8') as f:
-                json.dump(stats, f, indent=2, ensure_ascii=False)
+            with profiler.stage("save_paragraphs") as stage:
+                os.makedirs("./api_data", exist_ok=True)
+
+                # Save raw paragraphs, unless the paragraph store already holds them
+                if not self.paragraph_store_path:
+                    with open("./api_data/training_paragraphs.json", 'w', encoding='utf-8') as f:
+                        json.dump(paragraphs, f, indent=2, ensure_ascii=False)
+
+                # Save paragraph statistics
+                stats = {
+                    'total_paragraphs': len(paragraphs),
+                    'avg_words_per_paragraph': np.mean([len(p.split()) for p in paragraphs]),
+                    'total_words': sum([len(p.split()) for p in paragraphs]),
+                    'sample_paragraphs': paragraphs[:3]
+                }
+
+                with open("./api_data/paragraph_stats.json", 'w', encoding='utf-8') as f:
+                    json.dump(stats, f, indent=2, ensure_ascii=False)
+                stage['items'] = len(paragraphs)
 
             print(f"\nParagraph data saved:")
-            print(f"  - Training paragraphs: ./api_data/training_paragraphs.json")
+            if self.paragraph_store_path:
+                print(f"  - Paragraph store: {self.paragraph_store_path} ({self.paragraph_store.stats()})")
+            else:
+                print(f"  - Training paragraphs: ./api_data/training_paragraphs.json")
             print(f"  - Statistics: ./api_data/paragraph_stats.json")
             print(f"\nCreated {len(paragraphs)} training paragraphs")
 
@@ -1163,14 +3367,56 @@ class APIAIModel:
 
     def train_model_on_paragraphs(self, model_name: str = "paragraph_trained_model",
                                 seq_length: int = 80, epochs: int = 150,
-                                batch_size: int = 128, test_size: float = 0.15):
+                                batch_size: int = 128, test_size: float = 0.15,
+                                use_token_corpus: bool = False,
+                                near_duplicate_threshold: float = None,
+                                use_data_pipeline: bool = False,
+                                resume: bool = False):
         """
         Train LSTM model on paragraph data
+
+        With use_token_corpus=True the paragraphs are tokenized once into a
+        memory-mapped corpus under ./api_data/token_corpus and training
+        windows are streamed from it instead of held as in-memory arrays.
+
+        near_duplicate_threshold (e.g. 0.8) removes near-identical paragraphs
+        after augmentation, before any training windows are built.
+
+        With use_data_pipeline=True augmentation is not materialized: a
+        tf.data pipeline reorders sentences on the fly each epoch and the
+        validation set is split off by paragraph.
+
+        Full checkpoints are written every epoch under
+        ./trained_models/<model_name>_checkpoint; resume=True continues an
+        interrupted run from there.
+
+        A stage profile with per-epoch throughput is saved to
+        ./trained_models/<model_name>_run_report.json.
         """
         if not self.training_paragraphs:
             print("No training paragraphs available. Please fetch data and create paragraphs first.")
             return False
 
+        profiler = StageProfiler("train_model_on_paragraphs")
+        profiler.metadata.update({
+            'model_name': model_name, 'seq_length': seq_length, 'epochs': epochs,
+            'batch_size': batch_size, 'test_size': test_size,
+            'use_token_corpus': use_token_corpus, 'use_data_pipeline': use_data_pipeline,
+            'near_duplicate_threshold': near_duplicate_threshold, 'resume': resume
+        })
+        try:
+            return self._train_model_on_paragraphs(
+                profiler, model_name, seq_length, epochs, batch_size, test_size,
+                use_token_corpus, near_duplicate_threshold, use_data_pipeline, resume)
+        finally:
+            profiler.save(os.path.join("./trained_models", f"{model_name}_run_report.json"))
+
+    def _train_model_on_paragraphs(self, profiler: StageProfiler, model_name: str,
+                                   seq_length: int, epochs: int, batch_size: int,
+                                   test_size: float, use_token_corpus: bool,
+                                   near_duplicate_threshold: Optional[float],
+                                   use_data_pipeline: bool, resume: bool) -> bool:
+
         print("\n" + "="*70)
         print("TRAINING LSTM MODEL ON PARAGRAPH DATA")
         print("="*70)
@@ -1181,45 +3427,110 @@ class APIAIModel:
 
         # Preprocess paragraphs
         print("\n1. Preprocessing paragraph data...")
-        processed_paragraphs = self.model_trainer.preprocess_paragraphs(self.training_paragraphs)
+        with profiler.stage("preprocess") as stage:
+            processed_paragraphs = self.model_trainer.preprocess_paragraphs(self.training_paragraphs)
+            stage['items_in'] = len(self.training_paragraphs)
+            stage['items'] = len(processed_paragraphs)
 
         if not processed_paragraphs:
             print("No valid paragraph data after preprocessing.")
             return False
 
-        # Augment paragraph data
+        checkpoint_dir = os.path.join("./trained_models", f"{model_name}_checkpoint")
+        first_epoch = TrainingCheckpoint(checkpoint_dir, []).saved_epoch() if resume else 0
+
+        # Augment paragraph data (seeded, so a resumed run rebuilds the same data)
         print("\n2. Augmenting paragraph data...")
-        augmented_paragraphs = self.model_trainer.augment_paragraphs(processed_paragraphs)
-        print(f"Paragraphs augmented from {len(processed_paragraphs)} to {len(augmented_paragraphs)}")
+        random.seed(42)
+        with profiler.stage("augment") as stage:
+            if use_data_pipeline:
+                # Reordered per epoch inside the input pipeline instead
+                augmented_paragraphs = processed_paragraphs
+                print("Sentence reordering will be applied on the fly each epoch")
+            else:
+                augmented_paragraphs = self.model_trainer.augment_paragraphs(processed_paragraphs)
+                print(f"Paragraphs augmented from {len(processed_paragraphs)} to {len(augmented_paragraphs)}")
+            stage['items_in'] = len(processed_paragraphs)
+            stage['items'] = len(augmented_paragraphs)
+
+        if near_duplicate_threshold is not None:
+            with profiler.stage("near_duplicates") as stage:
+                augmented_paragraphs, dedup_stats = self.model_trainer.remove_near_duplicates(
+                    augmented_paragraphs, threshold=near_duplicate_threshold, seq_length=seq_length)
+                stage.update(dedup_stats)
+                stage['items'] = len(augmented_paragraphs)
 
         # Prepare sequences from paragraphs
         print("\n3. Preparing training sequences from paragraphs...")
+        samples_per_epoch = None
         try:
-            X, y = self.model_trainer.prepare_sequences_from_paragraphs(augmented_paragraphs, seq_length)
+            with profiler.stage("prepare_sequences") as stage:
+                if use_data_pipeline:
+                    pipeline = self.model_trainer.build_paragraph_pipeline(augmented_paragraphs, seq_length=seq_length)
+                    train_dataset, val_dataset = self.model_trainer.create_augmented_datasets(
+                        pipeline, batch_size=batch_size, validation_split=test_size,
+                        first_epoch=first_epoch)
+                    stage['windows'] = pipeline.num_windows()
+                elif use_token_corpus:
+                    corpus = self.model_trainer.build_token_corpus(augmented_paragraphs, seq_length=seq_length)
+                    train_dataset, val_dataset = self.model_trainer.create_training_datasets(
+                        corpus, batch_size=batch_size, validation_split=test_size,
+                        first_epoch=first_epoch)
+                    stage['windows'] = len(corpus.window_starts(self.model_trainer.max_sequence_len - 1))
+                else:
+                    X, y = self.model_trainer.prepare_sequences_from_paragraphs(augmented_paragraphs, seq_length)
+                    stage['windows'] = len(X)
+                    # Same split point Keras uses for validation_split
+                    samples_per_epoch = int(len(X) * (1 - test_size))
+                stage['vocab_size'] = self.model_trainer.vocab_size
         except ValueError as e:
             print(f"Error preparing sequences: {e}")
             return False
 
         # Build paragraph-optimized model
         print("\n4. Building paragraph-optimized LSTM model...")
-        self.model_trainer.build_paragraph_model(
-            embedding_dim=300,
-            lstm_units=512,
-            dropout_rate=0.4
-        )
+        with profiler.stage("build_model") as stage:
+            self.model_trainer.build_paragraph_model(
+                embedding_dim=300,
+                lstm_units=512,
+                dropout_rate=0.4
+            )
+            model = self.model_trainer.model
+            if not model.built:
+                # Keras 3 builds Sequential models lazily; fit would build the same shapes
+                model.build((None, self.model_trainer.max_sequence_len - 1))
+            stage['parameters'] = model.count_params()
 
         # Train model on paragraphs
         print("\n5. Training model on paragraph data...")
-        history = self.model_trainer.train_on_paragraphs(
-            X, y,
-            epochs=epochs,
-            batch_size=batch_size,
-            validation_split=test_size
-        )
+        throughput = ThroughputCallback(profiler, batch_size, samples_per_epoch)
+        with profiler.stage("fit") as stage:
+            if use_data_pipeline or use_token_corpus:
+                history = self.model_trainer.train_on_dataset(
+                    train_dataset, val_dataset,
+                    epochs=epochs,
+                    checkpoint_dir=checkpoint_dir,
+                    resume=resume,
+                    extra_callbacks=[throughput]
+                )
+            else:
+                history = self.model_trainer.train_on_paragraphs(
+                    X, y,
+                    epochs=epochs,
+                    batch_size=batch_size,
+                    validation_split=test_size,
+                    checkpoint_dir=checkpoint_dir,
+                    resume=resume,
+                    extra_callbacks=[throughput]
+                )
+            stage['epochs'] = len(profiler.epochs)
+            stage['samples'] = sum(epoch['samples'] for epoch in profiler.epochs)
 
         # Save model
         print("\n6. Saving trained paragraph model...")
-        self.model_trainer.save_model()
+        with profiler.stage("save"):
+            self.model_trainer.save_model()
+            self.model_trainer.save_bundle()
 
         # Display results
         print("\n" + "="*70)
@@ -1245,7 +3556,12 @@ class APIAIModel:
         """
         try:
             self.model_trainer = LSTMModelTrainer(model_name=model_name)
-            self.model_trainer.load_model()
+
+            # Prefer the fast-loading bundle, fall back to .h5 + pickle artifacts
+            if os.path.exists(self.model_trainer.bundle_path()):
+                self.model_trainer.load_bundle()
+            else:
+                self.model_trainer.load_model()
             print(f"Model '{model_name}' loaded successfully!")
             return True
         except Exception as e:
@@ -1278,18 +3594,25 @@ class APIAIModel:
         print("="*70)
         print("Testing model's ability to generate coherent paragraphs...")
 
-        for i, prompt in enumerate(test_prompts, 1):
+        self._ensure_response_cache()
+
+        # Generate all test responses together in one batch; the fixed seed
+        # makes reruns reproducible and lets the response cache answer them
+        try:
+            responses = self.model_trainer.get_paragraph_responses_batch(
+                test_prompts, max_length=120, temperature=0.65, seed=42)
+        except Exception as e:
+            print(f"   Error: {e}")
+            return
+
+        for i, (prompt, response) in enumerate(zip(test_prompts, responses), 1):
             print(f"\n{i}. Prompt: {prompt}")
-            try:
-                response = self.model_trainer.get_paragraph_response(prompt, max_length=120, temperature=0.65)
-                print(f"\n   Response: {response}")
+            print(f"\n   Response: {response}")
 
-                # Show response metrics
-                words = response.split()
-                sentences = len(re.split(r'[.!?]+', response)) - 1
-                print(f"   [Words: {len(words)}, Sentences: {sentences}]")
-            except Exception as e:
-                print(f"   Error: {e}")
+            # Show response metrics
+            words = response.split()
+            sentences = len(re.split(r'[.!?]+', response)) - 1
+            print(f"   [Words: {len(words)}, Sentences: {sentences}]")
             print("-"*70)
 
     def interactive_paragraph_chat(self):
@@ -1308,10 +3631,14 @@ class APIAIModel:
         print("  'quit' or 'exit' - End chat")
         print("  'temp X' - Set temperature (0.1-1.0, default: 0.65)")
         print("  'len X' - Set response length (default: 100 words)")
+        print("  'seed X' / 'seed off' - Deterministic responses from seed X / random again")
+        print("  'stats' - Show response cache statistics")
         print("="*70)
 
         temperature = 0.65
         response_length = 100
+        seed = None
+        self._ensure_response_cache()
 
         while True:
             try:
@@ -1349,12 +3676,35 @@ class APIAIModel:
                         print("Invalid format. Use: len 100")
                     continue
 
+                elif user_input.lower().startswith('seed '):
+                    value = user_input.split()[1]
+                    if value.lower() == 'off':
+                        seed = None
+                        print("Deterministic mode off")
+                    else:
+                        try:
+                            seed = int(value)
+                            print(f"Deterministic mode on (seed {seed})")
+                        except ValueError:
+                            print("Invalid format. Use: seed 42 or seed off")
+                    continue
+
+                elif user_input.lower() == 'stats':
+                    stats = self.model_trainer.response_cache.stats()
+                    print(f"Cache: {stats['entries']} entries, {stats['hits']} hits "
+                          f"({stats['disk_hits']} from disk), {stats['misses']} misses, "
+                          f"hit rate {stats['hit_rate']:.1%}")
+                    print(f"Average latency: {stats['avg_hit_ms']:.2f} ms on hits, "
+                          f"{stats['avg_miss_ms']:.0f} ms on misses")
+                    continue
+
                 # Get AI paragraph response
                 start_time = time.time()
                 response = self.model_trainer.get_paragraph_response(
                     prompt=user_input,
                     max_length=response_length,
-                    temperature=temperature
+                    temperature=temperature,
+                    seed=seed
                 )
                 response_time = time.time() - start_time
 
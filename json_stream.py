@@ -0,0 +1,160 @@
+"""
+Incremental JSON event parser shared by the streaming API readers
+
+JSONEventStream turns a response body arriving as raw byte chunks into
+parse events, so large listing responses are processed while they
+download without ever holding the whole document in memory.
+"""
+
+import codecs
+import json
+import re
+from typing import Iterable, Iterator, Tuple
+
+
+# Scalar tokens for the incremental JSON parser
+JSON_SCALAR_PATTERN = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null')
+JSON_SCALAR_RUN_PATTERN = re.compile(r'[-+.\w]*')
+JSON_WHITESPACE_PATTERN = re.compile(r'[ \t\n\r]*')
+JSON_LITERALS = {'true': True, 'false': False, 'null': None}
+
+
+class JSONEventStream:
+    """
+    Incremental JSON parser over raw byte chunks
+
+    events() yields ('start_map', None), ('key', name), ('end_map', None),
+    ('start_array', None), ('end_array', None) and ('value', v) pairs.
+    A container that fits in max_subtree_chars is decoded by a single
+    C-speed json call and reported as one 'value'; larger (or too deeply
+    nested) containers are walked token by token. Memory therefore stays
+    bounded by the chunk and subtree size, not by the document.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], max_subtree_chars: int = 1 << 20):
+        self.chunks = iter(chunks)
+        self.max_subtree_chars = max_subtree_chars
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.json_decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.base = 0  # Absolute offset of buffer[0]
+        self.final = False
+
+    @property
+    def offset(self) -> int:
+        """
+        Characters consumed so far
+        """
+        return self.base + self.pos
+
+    def _read_more(self):
+        # Drop the consumed prefix, then append the next non-empty chunk (or flush at end of input)
+        if self.pos:
+            self.base += self.pos
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+
+        for chunk in self.chunks:
+            text = chunk if isinstance(chunk, str) else self.text_decoder.decode(chunk)
+            if text:
+                self.buffer += text
+                return
+
+        self.buffer += self.text_decoder.decode(b'', final=True)
+        self.final = True
+
+    def _error(self, message: str) -> ValueError:
+        return ValueError(f"Invalid JSON at offset {self.offset}: {message}")
+
+    def events(self) -> Iterator[Tuple[str, object]]:
+        contexts = []  # One [is_map, expecting_key] per open container
+        # Depth at which a whole-container decode hit the recursion limit; deeper levels
+        # are walked for a while instead of retrying, which would be quadratic
+        recursion_depth = None
+
+        while True:
+            self.pos = JSON_WHITESPACE_PATTERN.match(self.buffer, self.pos).end()
+            if self.pos >= len(self.buffer):
+                if self.final:
+                    break
+                self._read_more()
+                continue
+
+            pos = self.pos
+            char = self.buffer[pos]
+            expecting_key = bool(contexts) and contexts[-1][0] and contexts[-1][1]
+
+            if char in '{[':
+                if expecting_key:
+                    raise self._error("expected an object key")
+                try:
+                    if recursion_depth is not None and len(contexts) < recursion_depth + 256:
+                        raise RecursionError
+                    value, end = self.json_decoder.raw_decode(self.buffer, pos)
+                except (ValueError, RecursionError) as e:
+                    if isinstance(e, RecursionError):
+                        if recursion_depth is None or len(contexts) >= recursion_depth + 256:
+                            recursion_depth = len(contexts)
+                    elif not self.final and len(self.buffer) - pos < self.max_subtree_chars:
+                        self._read_more()
+                        continue
+                    # Too large or too deep to decode at once: walk into it
+                    self.pos = pos + 1
+                    contexts.append([char == '{', True])
+                    yield ('start_map' if char == '{' else 'start_array'), None
+                    continue
+                self.pos = end
+                yield 'value', value
+
+            elif char == '"':
+                try:
+                    text, end = json.decoder.scanstring(self.buffer, pos + 1)
+                except ValueError:
+                    if self.final:
+                        raise self._error("unterminated string")
+                    self._read_more()
+                    continue
+                self.pos = end
+                if expecting_key:
+                    contexts[-1][1] = False
+                    yield 'key', text
+                else:
+                    yield 'value', text
+
+            elif char in '}]':
+                if not contexts or contexts[-1][0] != (char == '}'):
+                    raise self._error(f"unexpected '{char}'")
+                self.pos = pos + 1
+                is_map = contexts.pop()[0]
+                if recursion_depth is not None and len(contexts) <= recursion_depth:
+                    recursion_depth = None
+                yield ('end_map' if is_map else 'end_array'), None
+
+            elif char == ',':
+                self.pos = pos + 1
+                if contexts and contexts[-1][0]:
+                    contexts[-1][1] = True
+
+            elif char == ':':
+                self.pos = pos + 1
+
+            else:
+                end = JSON_SCALAR_RUN_PATTERN.match(self.buffer, pos).end()
+                # A token touching the end of the buffer may continue in the next chunk
+                if end == len(self.buffer) and not self.final:
+                    self._read_more()
+                    continue
+                token = self.buffer[pos:end]
+                if not JSON_SCALAR_PATTERN.fullmatch(token):
+                    raise self._error(f"unexpected '{token or char}'")
+                self.pos = end
+                if token in JSON_LITERALS:
+                    yield 'value', JSON_LITERALS[token]
+                elif any(c in token for c in '.eE'):
+                    yield 'value', float(token)
+                else:
+                    yield 'value', int(token)
+
+        if contexts:
+            raise self._error("truncated document")
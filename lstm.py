@@ -16,7 +16,7 @@ import numpy as np
 import pandas as pd
 import tensorflow as tf
 from tensorflow.keras.models import Sequential, load_model
-from tensorflow.keras.layers import LSTM, Dense, Embedding, Dropout
+from tensorflow.keras.layers import LSTM, Dense, Embedding, Dropout, Input
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping
 from tensorflow.keras.preprocessing.text import Tokenizer
@@ -24,151 +24,401 @@ from tensorflow.keras.preprocessing.sequence import pad_sequences
 import pickle
 import os
 import json
-from typing import List, Tuple, Dict, Optional, Union
+from typing import List, Tuple, Dict, Optional, Union, Iterable, Iterator
 import re
 import requests
+import asyncio
+import functools
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, Future
 from urllib.parse import urlparse
-import hashlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import queue
+from collections import deque, defaultdict
+
+from token_sampler import TokenSampler
+from fast_tokenizer import FastTokenizer
+from api_fetch import CachedFetchMixin
+from model_bundle import ModelBundleMixin
+from json_stream import JSONEventStream
+from http_cache import HTTPResponseCache
+from async_fetch import TokenBucket, run_coroutine
+from training_checkpoint import CheckpointedTrainingMixin, TrainingCheckpoint
+from text_stream import stream_cleaned_texts, write_jsonl_texts
+from token_corpus import TokenCorpus
+from sampled_softmax import SampledSoftmaxLoss, sampled_softmax_passthrough_loss
+
+
+# Field names that mark a string as text content
+TEXT_FIELDS = ('text', 'content', 'message', 'description',
+               'body', 'title', 'name', 'summary', 'response',
+               'answer', 'comment', 'review', 'feedback',
+               'prompt', 'query', 'question')
+
+
+class TextExtractor:
+    """
+    Compiled rules that pick training texts out of parsed API responses
+
+    A string qualifies when, stripped, it has at least min_chars characters
+    and either its field name matches one of key_patterns (regular
+    expressions searched in the lower-cased key), its path matches one of
+    selectors, or it has at least min_words words. Selectors are a small
+    JSONPath dialect: "$.data[*].attributes.body", "results.*.review",
+    "$..comment", where "*" is any one key or index and ".." (or "**") any
+    number of levels. Bare strings in lists only qualify through a
+    selector. The defaults are the original field-name heuristics.
+
+    Key decisions are cached per field name and selector matching is a
+    small automaton whose transitions are cached per path step, so the
+    per-string cost doesn't grow with the number of rules.
+    """
 
-class APIDataFetcher:
+    def __init__(self, key_patterns: Optional[Iterable[str]] = TEXT_FIELDS,
+                 selectors: Iterable[str] = (), min_chars: int = 11, min_words: Optional[int] = 4):
+        self.key_pattern = re.compile('|'.join(f'(?:{pattern})' for pattern in key_patterns)) if key_patterns else None
+        self.selectors = [self.parse_selector(selector) for selector in selectors]
+        self.min_chars = min_chars
+        self.min_words = min_words
+
+        self._key_matches = {}
+        self._transitions = {}
+        self._accepting = {}
+        # Without numeric selector segments, list positions never need to be told apart
+        self._indexed = any(segment.isdigit() for selector in self.selectors for segment in selector)
+        self.root = self._closure({(i, 0) for i in range(len(self.selectors))}) if self.selectors else None
+
+    @staticmethod
+    def parse_selector(selector: str) -> Tuple[str, ...]:
+        """
+        Path segments of a selector, '**' standing for any number of levels
+        """
+        path = selector.strip()
+        if path.startswith('$'):
+            path = path[1:]
+        path = re.sub(r"\[(\*|\d+)\]", r".\1", path)
+        path = re.sub(r"\[['\"]([^'\"]*)['\"]\]", r".\1", path)
+        path = path.replace('..', '.**.')
+        return tuple(segment for segment in path.split('.') if segment)
+
+    def _closure(self, states: set) -> frozenset:
+        # A '**' segment may also match zero levels
+        pending = list(states)
+        while pending:
+            selector, position = pending.pop()
+            path = self.selectors[selector]
+            if position < len(path) and path[position] == '**' and (selector, position + 1) not in states:
+                states.add((selector, position + 1))
+                pending.append((selector, position + 1))
+        return frozenset(states)
+
+    def child_states(self, states: Optional[frozenset], step) -> Optional[frozenset]:
+        """
+        Selector states one step (a key, or a list index) below a container
+        """
+        if not states:
+            return states
+        if isinstance(step, int) and not self._indexed:
+            step = None
+        cache_key = (states, step)
+        child = self._transitions.get(cache_key)
+        if child is None:
+            advanced = set()
+            for selector, position in states:
+                path = self.selectors[selector]
+                if position == len(path):
+                    continue
+                segment = path[position]
+                if segment == '**':
+                    advanced.add((selector, position))
+                elif segment == '*' or (step is not None and segment == str(step)):
+                    advanced.add((selector, position + 1))
+            child = self._transitions[cache_key] = self._closure(advanced)
+        return child
+
+    def _selected(self, states: Optional[frozenset]) -> bool:
+        if not states:
+            return False
+        selected = self._accepting.get(states)
+        if selected is None:
+            selected = self._accepting[states] = any(position == len(self.selectors[selector])
+                                                     for selector, position in states)
+        return selected
+
+    def _key_matches_pattern(self, key: str) -> bool:
+        matched = self._key_matches.get(key)
+        if matched is None:
+            matched = self._key_matches[key] = bool(self.key_pattern.search(key.lower()))
+        return matched
+
+    def text_of(self, key: Optional[str], value: str, states: Optional[frozenset] = None) -> Optional[str]:
+        """
+        Stripped value if it qualifies as text; key is None inside lists
+        """
+        text = value.strip()
+        if len(text) < self.min_chars:
+            return None
+        if self._selected(states):
+            return text
+        if key is None:
+            return None
+        if self.key_pattern is not None and self._key_matches_pattern(key):
+            return text
+        if self.min_words is not None and len(text.split()) >= self.min_words:
+            return text
+        return None
+
+    def iter_texts(self, obj, states: Optional[frozenset] = None) -> Iterator[str]:
+        """
+        Qualifying texts of a parsed response in document order, walked with an explicit stack
+
+        states are the selector states of obj itself, for subtrees of a
+        larger document; the default is the document root.
+        """
+        if not isinstance(obj, (dict, list)):
+            return
+        if states is None:
+            states = self.root
+        stack = [(iter(obj.items()) if isinstance(obj, dict) else enumerate(obj), states)]
+        while stack:
+            entries, states = stack[-1]
+            for step, value in entries:
+                if isinstance(value, str):
+                    text = self.text_of(step if isinstance(step, str) else None, value,
+                                        self.child_states(states, step))
+                    if text:
+                        yield text
+                elif isinstance(value, dict):
+                    stack.append((iter(value.items()), self.child_states(states, step)))
+                    break
+                elif isinstance(value, list):
+                    stack.append((enumerate(value), self.child_states(states, step)))
+                    break
+            else:
+                stack.pop()
+
+    def extract(self, response_data) -> List[str]:
+        return list(self.iter_texts(response_data))
+
+    def extract_batch(self, responses: Iterable) -> List[List[str]]:
+        """
+        Texts of each response in a batch, one list per response
+        """
+        iter_texts = self.iter_texts
+        return [list(iter_texts(response)) for response in responses]
+
+    def iter_event_texts(self, events: Iterable[Tuple[str, object]]) -> Iterator[str]:
+        """
+        Qualifying texts from JSONEventStream events, in the same order as iter_texts
+        """
+        frames = []  # [selector states, current key or next index, is array] per open container
+        for event, value in events:
+            if event == 'key':
+                frames[-1][1] = value
+                continue
+            if event in ('end_map', 'end_array'):
+                frames.pop()
+                continue
+
+            # A value at the current position: scalar, decoded subtree or container start
+            if frames:
+                frame = frames[-1]
+                step = frame[1]
+                if frame[2]:
+                    frame[1] += 1
+                states = self.child_states(frame[0], step)
+            else:
+                step, states = None, self.root
+
+            if event in ('start_map', 'start_array'):
+                frames.append([states, 0 if event == 'start_array' else None, event == 'start_array'])
+            elif isinstance(value, str):
+                if frames:
+                    text = self.text_of(step if isinstance(step, str) else None, value, states)
+                    if text:
+                        yield text
+            elif isinstance(value, (dict, list)):
+                yield from self.iter_texts(value, states)
+
+
+class APIDataFetcher(CachedFetchMixin):
     """
     Fetches and processes data from API URLs
     """
 
-    def __init__(self, max_workers: int = 5):
+    def __init__(self, max_workers: int = 5, per_host_limit: int = 4,
+                 requests_per_second: float = 5.0, burst: float = None,
+                 cache_dir: str = None, cache_ttl: float = 3600.0, offline: bool = False,
+                 text_extractor: 'TextExtractor' = None):
         self.max_workers = max_workers
+        # Rules deciding which response strings become training texts
+        self.text_extractor = text_extractor or TextExtractor()
+        # Optional on-disk HTTP cache; offline=True answers from it without any network access
+        self.http_cache = HTTPResponseCache(cache_dir, ttl=cache_ttl) if cache_dir else None
+        self.offline = offline
+        # Politeness limits, applied per host: concurrent requests and request rate
+        self.per_host_limit = per_host_limit
+        self.requests_per_second = requests_per_second
+        self.burst = burst
         self.session = requests.Session()
+        # One pooled connection per worker thread
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(10, max_workers))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         self.session.headers.update({
             'User-Agent': 'LSTM-Model-Trainer/1.0',
             'Accept': 'application/json',
             'Content-Type': 'application/json'
         })
 
-    def fetch_from_api(self, api_url: str, params: dict = None,
-                       headers: dict = None, method: str = 'GET',
-                       data: dict = None, timeout: int = 30) -> Optional[dict]:
+    def extract_text_from_response(self, response_data: Union[dict, list, str]) -> List[str]:
         """
-        Fetch data from a single API endpoint
+        Extract text from various API response formats
         """
-        try:
-            # Update headers if provided
-            request_headers = self.session.headers.copy()
-            if headers:
-                request_headers.update(headers)
-
-            if method.upper() == 'GET':
-                response = self.session.get(
-                    api_url,
-                    params=params,
-                    headers=request_headers,
-                    timeout=timeout
-                )
-            elif method.upper() == 'POST':
-                response = self.session.post(
-                    api_url,
-                    json=data,
-                    params=params,
-                    headers=request_headers,
-                    timeout=timeout
-                )
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
+        return self.text_extractor.extract(response_data)
 
-            response.raise_for_status()
-
-            # Try to parse JSON
-            try:
-                return response.json()
-            except:
-                # If not JSON, return as text
-                return {"text": response.text}
+    def extract_text_stream(self, chunks: Iterable[bytes], max_subtree_chars: int = 1 << 20) -> Iterator[str]:
+        """
+        Yield text fields from a raw JSON byte stream without building the document
 
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching {api_url}: {e}")
-            return None
-        except Exception as e:
-            print(f"Unexpected error with {api_url}: {e}")
-            return None
+        Gives the same texts, in the same order, as extract_text_from_response
+        on the parsed response, with memory bounded by max_subtree_chars.
+        """
+        events = JSONEventStream(chunks, max_subtree_chars=max_subtree_chars).events()
+        yield from self.text_extractor.iter_event_texts(events)
 
-    def extract_text_from_response(self, response_data: Union[dict, list, str]) -> List[str]:
+    def fetch_texts_stream(self, config: dict) -> Optional[List[str]]:
         """
-        Extract text from various API response formats
+        Texts of one endpoint, parsed while the response downloads; None if nothing was received
         """
-        texts = []
+        chunks = self.open_api_stream(
+            api_url=config.get('url'),
+            params=config.get('params'),
+            headers=config.get('headers'),
+            method=config.get('method', 'GET'),
+            data=config.get('data'),
+            timeout=config.get('timeout', 30)
+        )
+        if chunks is None:
+            return None
 
-        def extract(obj, current_path=""):
-            if isinstance(obj, dict):
-                for key, value in obj.items():
-                    # Look for text-like fields
-                    if isinstance(value, str) and len(value.strip()) > 10:
-                        # Check if field name suggests text content
-                        text_fields = ['text', 'content', 'message', 'description',
-                                      'body', 'title', 'name', 'summary', 'response',
-                                      'answer', 'comment', 'review', 'feedback',
-                                      'prompt', 'query', 'question']
-
-                        if any(text_field in key.lower() for text_field in text_fields):
-                            texts.append(value.strip())
-                        elif len(value.split()) > 3:  # Heuristic: has multiple words
-                            texts.append(value.strip())
-
-                    elif isinstance(value, (dict, list)):
-                        extract(value, f"{current_path}.{key}")
-
-            elif isinstance(obj, list):
-                for item in obj:
-                    extract(item, current_path)
-
-        extract(response_data)
+        texts = []
+        try:
+            texts.extend(self.extract_text_stream(chunks))
+        except (ValueError, requests.exceptions.RequestException) as e:
+            print(f"✗ {config.get('url')}: Stream error - {e}")
         return texts
 
     def fetch_multiple_apis(self, api_configs: List[dict]) -> List[str]:
         """
         Fetch data from multiple API URLs concurrently
         """
-        all_texts = []
+        return run_coroutine(self.fetch_multiple_apis_async(api_configs))
+
+    async def fetch_multiple_apis_async(self, api_configs: List[dict]) -> List[str]:
+        """
+        Fetch data from multiple API URLs on an event loop
+
+        Requests run on a thread pool of max_workers; each host gets its own
+        semaphore (per_host_limit concurrent requests) and token bucket
+        (requests_per_second), and every response is extracted as soon as it
+        arrives rather than in submission order.
+        """
+        all_items = []
+        loop = asyncio.get_running_loop()
+        host_semaphores = {}
+        host_buckets = {}
 
         print(f"Fetching data from {len(api_configs)} API endpoints...")
 
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submit all API requests
-            future_to_api = {}
-            for config in api_configs:
-                future = executor.submit(
+        async def fetch_one(config: dict):
+            api_url = config.get('url')
+            host = urlparse(api_url or '').netloc
+            if host not in host_semaphores:
+                host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+                host_buckets[host] = TokenBucket(self.requests_per_second, self.burst)
+
+            async with host_semaphores[host]:
+                await host_buckets[host].acquire()
+                if config.get('stream'):
+                    # Large payloads: texts are extracted while the body downloads
+                    texts = await loop.run_in_executor(executor, self.fetch_texts_stream, config)
+                    return api_url, texts
+
+                data = await loop.run_in_executor(executor, functools.partial(
                     self.fetch_from_api,
-                    api_url=config.get('url'),
+                    api_url=api_url,
                     params=config.get('params'),
                     headers=config.get('headers'),
                     method=config.get('method', 'GET'),
                     data=config.get('data'),
                     timeout=config.get('timeout', 30)
-                )
-                future_to_api[future] = config.get('url')
+                ))
+            # Extract text as soon as the response arrives
+            return api_url, self.extract_text_from_response(data) if data else None
 
-            # Process completed requests
-            for future in as_completed(future_to_api):
-                api_url = future_to_api[future]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            tasks = [asyncio.ensure_future(fetch_one(config)) for config in api_configs]
+
+            # Process requests as they complete
+            for next_done in asyncio.as_completed(tasks):
                 try:
-                    data = future.result()
-                    if data:
-                        extracted_texts = self.extract_text_from_response(data)
-                        all_texts.extend(extracted_texts)
-                        print(f"✓ {api_url}: Extracted {len(extracted_texts)} text samples")
-                    else:
-                        print(f"✗ {api_url}: No data received")
+                    api_url, extracted_texts = await next_done
                 except Exception as e:
-                    print(f"✗ {api_url}: Error - {e}")
+                    print(f"✗ Error - {e}")
+                    continue
+
+                if extracted_texts is not None:
+                    all_items.extend(extracted_texts)
+                    print(f"✓ {api_url}: Extracted {len(extracted_texts)} text samples")
+                else:
+                    print(f"✗ {api_url}: No data received")
 
-                # Be polite to APIs
-                time.sleep(0.5)
+        print(f"\nTotal text samples extracted: {len(all_items)}")
+        if self.http_cache is not None:
+            cache_stats = self.http_cache.stats()
+            print(f"HTTP cache: {cache_stats['hit']} fresh, {cache_stats['revalidated']} revalidated (304), "
+                  f"{cache_stats['miss']} downloaded, {cache_stats['stale']} stale")
+        return all_items
 
-        print(f"\nTotal text samples extracted: {len(all_texts)}")
-        return all_texts
+
+# Precompiled cleaning patterns, shared by the serial and process-pool paths
+URL_PATTERN = re.compile(r'https?://\S+|www\.\S+')
+DISALLOWED_CHARS_PATTERN = re.compile(r'[^\w\s.,!?;:\'\"-]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
 
 
-class LSTMModelTrainer:
+def clean_text(text) -> Optional[str]:
+    """
+    Clean one text for training, or None if it is too short
+    """
+    if not isinstance(text, str):
+        return None
+
+    # Basic cleaning
+    text = text.lower()
+
+    # Remove URLs
+    text = URL_PATTERN.sub('', text)
+
+    # Remove special characters but keep basic punctuation
+    text = DISALLOWED_CHARS_PATTERN.sub('', text)
+
+    # Remove extra whitespace
+    text = WHITESPACE_PATTERN.sub(' ', text).strip()
+
+    # Remove very short texts
+    if len(text) > 20 and len(text.split()) > 3:
+        return text
+    return None
+
+
+def _clean_text_chunk(chunk: List[str]) -> List[Optional[str]]:
+    return [clean_text(text) for text in chunk]
+
+
+class LSTMModelTrainer(ModelBundleMixin, CheckpointedTrainingMixin):
     """
     Train and use LSTM model on API data
     """
@@ -179,48 +429,52 @@ class LSTMModelTrainer:
         self.model = None
         self.max_sequence_len = None
         self.vocab_size = None
+        self.training_model = None
+        self.sampler = None
+        self.fast_tokenizer = None
 
-    def preprocess_text(self, texts: List[str]) -> List[str]:
+    def preprocess_text(self, texts: Iterable[str], num_workers: int = 1) -> List[str]:
         """
         Clean and prepare text data
-        """
-        processed_texts = []
-
-        for text in texts:
-            if not isinstance(text, str):
-                continue
-
-            # Basic cleaning
-            text = text.lower()
 
-            # Remove URLs
-            text = re.sub(r'https?://\S+|www\.\S+', '', text)
+        num_workers > 1 (or None for one per CPU) cleans in a process pool.
+        """
+        # Cleaned in order, duplicates removed
+        unique_texts = list(stream_cleaned_texts(texts, _clean_text_chunk, num_workers))
 
-            # Remove special characters but keep basic punctuation
-            text = re.sub(r'[^\w\s.,!?;:\'\"-]', '', text)
+        print(f"After preprocessing: {len(unique_texts)} unique texts")
+        return unique_texts
 
-            # Remove extra whitespace
-            text = re.sub(r'\s+', ' ', text).strip()
+    def preprocess_text_to_jsonl(self, texts: Iterable[str],
+                                 output_path: str = "./api_data/texts_clean.jsonl",
+                                 num_workers: int = None,
+                                 chunk_size: int = 512) -> int:
+        """
+        Clean a text stream of any size straight into a JSONL file
 
-            # Remove very short texts
-            if len(text) > 20 and len(text.split()) > 3:
-                processed_texts.append(text)
+        Same cleaning and deduplication as preprocess_text, but results are
+        written as they are produced instead of collected in memory. Read
+        them back with text_stream.read_jsonl_texts.
+        """
+        print(f"Preprocessing texts into {output_path}...")
+        start_time = time.perf_counter()
 
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_texts = []
-        for text in processed_texts:
-            text_hash = hashlib.md5(text.encode()).hexdigest()
-            if text_hash not in seen:
-                seen.add(text_hash)
-                unique_texts.append(text)
+        count = write_jsonl_texts(
+            stream_cleaned_texts(texts, _clean_text_chunk, num_workers, chunk_size),
+            output_path
+        )
 
-        print(f"After preprocessing: {len(unique_texts)} unique texts")
-        return unique_texts
+        elapsed = time.perf_counter() - start_time
+        print(f"After preprocessing: {count} unique texts ({elapsed:.1f}s)")
+        return count
 
-    def prepare_sequences(self, texts: List[str], seq_length: int = 50) -> Tuple[np.ndarray, np.ndarray]:
+    def prepare_sequences(self, texts: List[str], seq_length: int = 50,
+                          sparse_labels: bool = True) -> Tuple[np.ndarray, np.ndarray]:
         """
         Convert text to training sequences
+
+        With sparse_labels (the default) y holds integer word ids; set it to
+        False for the old one-hot matrix of shape (samples, vocab_size).
         """
         if not texts:
             raise ValueError("No text data available for training")
@@ -230,12 +484,13 @@ class LSTMModelTrainer:
         # Fit tokenizer on all texts
         self.tokenizer.fit_on_texts(texts)
         self.vocab_size = len(self.tokenizer.word_index) + 1
+        self.sampler = None
         print(f"Vocabulary size: {self.vocab_size}")
 
         # Create sequences
+        token_lists = self.get_fast_tokenizer().texts_to_sequences(texts)
         sequences = []
-        for text in texts:
-            token_list = self.tokenizer.texts_to_sequences([text])[0]
+        for token_list in token_lists:
 
             # Generate sequences
             for i in range(seq_length, len(token_list)):
@@ -244,8 +499,7 @@ class LSTMModelTrainer:
 
         if not sequences:
             # Fallback: create shorter sequences if needed
-            for text in texts:
-                token_list = self.tokenizer.texts_to_sequences([text])[0]
+            for token_list in token_lists:
                 if len(token_list) >= 10:
                     for i in range(10, len(token_list)):
                         n_gram_sequence = token_list[i-10:i+1]
@@ -269,18 +523,78 @@ class LSTMModelTrainer:
         X = sequences[:, :-1]
         y = sequences[:, -1]
 
-        # Convert y to one-hot encoding
-        y = tf.keras.utils.to_categorical(y, num_classes=self.vocab_size)
+        # Keep integer targets unless one-hot encoding was asked for
+        if not sparse_labels:
+            y = tf.keras.utils.to_categorical(y, num_classes=self.vocab_size)
 
         print(f"Created {len(X)} training sequences")
         return X, y
 
+    def build_token_corpus(self, texts: List[str], corpus_dir: str = "./api_data/token_corpus",
+                           seq_length: int = 50) -> TokenCorpus:
+        """
+        Fit the tokenizer and write texts as a memory-mapped token corpus
+
+        Memory-light alternative to prepare_sequences: the windows are never
+        materialized, see create_training_datasets.
+        """
+        if not texts:
+            raise ValueError("No text data available for training")
+
+        print(f"\nBuilding token corpus with max length: {seq_length}")
+
+        # Fit tokenizer on all texts
+        self.tokenizer.fit_on_texts(texts)
+        self.vocab_size = len(self.tokenizer.word_index) + 1
+        self.sampler = None
+        print(f"Vocabulary size: {self.vocab_size}")
+
+        corpus = TokenCorpus.build(texts, self.tokenizer, corpus_dir)
+
+        num_windows = len(corpus.window_starts(seq_length))
+        if not num_windows:
+            # Fallback: shorter windows if needed
+            seq_length = 10
+            num_windows = len(corpus.window_starts(seq_length))
+
+        if not num_windows:
+            raise ValueError("Could not create sequences. Texts might be too short.")
+
+        self.max_sequence_len = seq_length + 1
+        print(f"Actual sequence length: {self.max_sequence_len}")
+        print(f"Number of sequences available: {num_windows}")
+        return corpus
+
+    def create_training_datasets(self, corpus: TokenCorpus, batch_size: int = 128,
+                                 validation_split: float = 0.1,
+                                 seed: int = 42,
+                                 first_epoch: int = 0) -> Tuple[tf.data.Dataset, tf.data.Dataset]:
+        """
+        Split a token corpus by text into streaming train/validation datasets
+
+        Pass the epoch a resumed run starts from as first_epoch.
+        """
+        return self._split_corpus_datasets(corpus, batch_size, validation_split, seed, first_epoch)
+
     def build_lstm_model(self, embedding_dim: int = 128,
                          lstm_units: int = 256,
-                         dropout_rate: float = 0.3) -> tf.keras.Model:
+                         dropout_rate: float = 0.3,
+                         sampled_softmax: bool = False,
+                         num_sampled: int = 512,
+                         sparse_labels: bool = True) -> tf.keras.Model:
         """
         Build the LSTM model architecture
+
+        With sampled_softmax=True training goes through a separate training
+        model whose output head scores only num_sampled candidate words per
+        step. It shares every layer with the returned full-softmax model.
+        sparse_labels must match the targets the model is trained on: False
+        for one-hot y from prepare_sequences(sparse_labels=False).
         """
+        if sampled_softmax and not sparse_labels:
+            raise ValueError("Sampled softmax needs integer targets. "
+                             "Prepare sequences and build the model with sparse_labels=True.")
+
         model = Sequential([
             # Embedding layer
             Embedding(
@@ -307,37 +621,61 @@ class LSTMModelTrainer:
 
         # Compile model
         model.compile(
-            loss='categorical_crossentropy',
+            loss='sparse_categorical_crossentropy' if sparse_labels else 'categorical_crossentropy',
             optimizer=Adam(learning_rate=0.001),
             metrics=['accuracy']
         )
 
+        self.training_model = None
+        if sampled_softmax:
+            # Same layers, but labels come in as an input and the head emits the loss
+            tokens = Input(shape=(self.max_sequence_len - 1,), dtype='int32')
+            labels = Input(shape=(1,), dtype='int32')
+
+            hidden = tokens
+            for layer in model.layers[:-1]:
+                hidden = layer(hidden)
+            loss = SampledSoftmaxLoss(model.layers[-1], num_sampled=num_sampled)([hidden, labels])
+
+            self.training_model = tf.keras.Model([tokens, labels], loss)
+            self.training_model.compile(
+                loss=sampled_softmax_passthrough_loss,
+                optimizer=Adam(learning_rate=0.001)
+            )
+            print(f"Training with sampled softmax over {num_sampled} candidate words")
+
         print("\nModel Architecture:")
         model.summary()
         self.model = model
         return model
 
-    def train(self, X: np.ndarray, y: np.ndarray,
-              epochs: int = 50,
-              batch_size: int = 128,
-              validation_split: float = 0.1) -> dict:
+    def _training_callbacks(self) -> list:
         """
-        Train the model
+        Checkpoint and early-stopping callbacks for training
         """
-        print(f"\nStarting training...")
-        print(f"Training samples: {len(X)}")
-        print(f"Batch size: {batch_size}")
-        print(f"Epochs: {epochs}")
-
-        # Create callbacks
-        callbacks = [
-            ModelCheckpoint(
+        # The sampled-softmax training model reports loss only, and holds a
+        # custom head, so checkpoint its weights on val_loss instead
+        if self.training_model is not None:
+            checkpoint = ModelCheckpoint(
+                f'{self.model_name}_best.weights.h5',
+                monitor='val_loss',
+                save_best_only=True,
+                save_weights_only=True,
+                mode='min',
+                verbose=1
+            )
+        else:
+            checkpoint = ModelCheckpoint(
                 f'{self.model_name}_best.h5',
                 monitor='val_accuracy',
                 save_best_only=True,
                 mode='max',
                 verbose=1
-            ),
+            )
+
+        # Create callbacks
+        callbacks = [
+            checkpoint,
             EarlyStopping(
                 monitor='val_loss',
                 patience=10,
@@ -346,18 +684,65 @@ class LSTMModelTrainer:
             )
         ]
 
+        return callbacks
+
+    def train(self, X: np.ndarray, y: np.ndarray,
+              epochs: int = 50,
+              batch_size: int = 128,
+              validation_split: float = 0.1,
+              checkpoint_dir: str = None,
+              resume: bool = False) -> dict:
+        """
+        Train the model
+
+        checkpoint_dir turns on periodic full checkpoints (see
+        TrainingCheckpoint); resume=True continues from the one found there.
+        """
+        print(f"\nStarting training...")
+        print(f"Training samples: {len(X)}")
+        print(f"Batch size: {batch_size}")
+        print(f"Epochs: {epochs}")
+
+        callbacks = self._training_callbacks()
+
+        if self.training_model is not None:
+            fit_model, fit_inputs = self.training_model, [X, y.reshape(-1, 1)]
+        else:
+            fit_model, fit_inputs = self.model, X
+
         # Train
-        history = self.model.fit(
-            X, y,
+        history = self._fit(
+            fit_model, callbacks, checkpoint_dir, resume,
+            x=fit_inputs,
+            y=y,
             epochs=epochs,
             batch_size=batch_size,
             validation_split=validation_split,
-            callbacks=callbacks,
             verbose=1
         )
 
         print("\nTraining completed!")
-        return history.history
+        return history
+
+    def train_on_dataset(self, train_dataset: tf.data.Dataset,
+                         val_dataset: tf.data.Dataset,
+                         epochs: int = 50,
+                         checkpoint_dir: str = None,
+                         resume: bool = False) -> dict:
+        """
+        Train the model on streaming (X, y) datasets, e.g. from create_training_datasets
+
+        checkpoint_dir turns on periodic full checkpoints (see
+        TrainingCheckpoint); resume=True continues from the one found there.
+        """
+        print(f"\nStarting training from streaming dataset...")
+        print(f"Epochs: {epochs}")
+
+        history = self._fit_datasets(train_dataset, val_dataset, self._training_callbacks(),
+                                     epochs, checkpoint_dir, resume)
+
+        print("\nTraining completed!")
+        return history
 
     def save_model(self, save_dir: str = "./trained_models"):
         """
@@ -410,6 +795,7 @@ class LSTMModelTrainer:
         # Load tokenizer
         with open(tokenizer_path, 'rb') as f:
             self.tokenizer = pickle.load(f)
+        self.sampler = None
 
         # Load metadata
         with open(metadata_path, 'r') as f:
@@ -420,25 +806,50 @@ class LSTMModelTrainer:
         print(f"Model loaded from {model_path}")
         print(f"Vocabulary size: {self.vocab_size}")
 
+    def get_sampler(self) -> TokenSampler:
+        """
+        Shared sampler with the id -> word table for the current tokenizer
+        """
+        if self.sampler is None:
+            self.sampler = TokenSampler.from_tokenizer(self.tokenizer, vocab_size=self.vocab_size)
+        return self.sampler
+
+    def get_fast_tokenizer(self) -> FastTokenizer:
+        """
+        Compiled encoder for the current tokenizer, rebuilt after fitting or loading
+        """
+        if self.fast_tokenizer is None or not self.fast_tokenizer.matches(self.tokenizer):
+            self.fast_tokenizer = FastTokenizer.from_keras(self.tokenizer)
+        return self.fast_tokenizer
+
     def generate_text(self, seed_text: str,
                       num_words: int = 100,
                       temperature: float = 0.7,
-                      max_attempts: int = 3) -> str:
+                      max_attempts: int = 3,
+                      top_k: int = 0,
+                      top_p: float = 1.0) -> str:
         """
         Generate text from seed text
+
+        top_k / top_p restrict sampling to the k most likely words or to the
+        smallest set of words holding top_p of the probability mass.
         """
         if self.model is None:
             raise ValueError("Model not loaded. Train or load a model first.")
 
         generated_text = seed_text
+        sampler = self.get_sampler()
+
+        # Tokenize the seed once; each generated word only appends its own ids
+        fast_tokenizer = self.get_fast_tokenizer()
+        token_ids = fast_tokenizer.encode(seed_text)
 
         for word_num in range(num_words):
             for attempt in range(max_attempts):
                 try:
-                    # Tokenize and pad
-                    token_list = self.tokenizer.texts_to_sequences([seed_text])[0]
+                    # Pad
                     token_list = pad_sequences(
-                        [token_list],
+                        [token_ids[-(self.max_sequence_len - 1):]],
                         maxlen=self.max_sequence_len - 1,
                         padding='pre'
                     )
@@ -446,24 +857,13 @@ class LSTMModelTrainer:
                     # Predict
                     predictions = self.model.predict(token_list, verbose=0)[0]
 
-                    # Apply temperature
-                    if temperature > 0:
-                        predictions = np.log(predictions + 1e-10) / temperature
-                        exp_predictions = np.exp(predictions)
-                        predictions = exp_predictions / np.sum(exp_predictions)
-
-                    # Sample next word
-                    predicted_id = np.random.choice(len(predictions), p=predictions)
-
-                    # Convert to word
-                    output_word = ""
-                    for word, idx in self.tokenizer.word_index.items():
-                        if idx == predicted_id:
-                            output_word = word
-                            break
+                    # Sample next word and convert it through the id -> word table
+                    predicted_id = sampler.sample(predictions, temperature=temperature,
+                                                  top_k=top_k, top_p=top_p)[0]
+                    output_word = sampler.word(predicted_id)
 
                     # Update texts
-                    seed_text += " " + output_word
+                    fast_tokenizer.append(token_ids, output_word)
                     generated_text += " " + output_word
                     break
 
@@ -474,23 +874,106 @@ class LSTMModelTrainer:
 
         return generated_text
 
+    def generate_texts_batch(self, seed_texts: List[str],
+                             num_words: Union[int, List[int]] = 100,
+                             temperature: Union[float, List[float]] = 0.7,
+                             top_k: int = 0,
+                             top_p: float = 1.0) -> List[str]:
+        """
+        generate_text for many seed texts at once
+
+        Every unfinished row advances together as one [B, T] window batch,
+        so each forward pass serves all active rows. num_words and
+        temperature can be given per row; a row drops out of the batch once
+        it has produced its words.
+        """
+        if self.model is None:
+            raise ValueError("Model not loaded. Train or load a model first.")
+
+        if not seed_texts:
+            return []
+
+        batch_size = len(seed_texts)
+        temperatures = np.broadcast_to(np.asarray(temperature, dtype=np.float64), (batch_size,))
+        word_limits = np.broadcast_to(np.asarray(num_words, dtype=np.int64), (batch_size,))
+        sampler = self.get_sampler()
+
+        # Left-padded token windows, one row per seed text
+        tokens = pad_sequences(self.get_fast_tokenizer().texts_to_sequences(seed_texts),
+                               maxlen=self.max_sequence_len - 1, padding='pre').astype(np.int32)
+
+        generated_texts = list(seed_texts)
+        words_done = np.zeros(batch_size, dtype=np.int64)
+        active = words_done < word_limits
+
+        while active.any():
+            rows = np.flatnonzero(active)
+
+            predictions = np.asarray(self.model(tokens[rows], training=False))
+            predicted_ids = sampler.sample(predictions, temperature=temperatures[rows], top_k=top_k, top_p=top_p)
+
+            # Slide each row's window by the word it produced
+            for row, predicted_id in zip(rows, predicted_ids):
+                output_word = sampler.word(predicted_id)
+                generated_texts[row] += " " + output_word
+                if output_word:
+                    tokens[row, :-1] = tokens[row, 1:]
+                    tokens[row, -1] = predicted_id
+
+            words_done[rows] += 1
+            active = words_done < word_limits
+
+        return generated_texts
+
     def get_response(self, prompt: str,
                      max_length: int = 150,
-                     temperature: float = 0.7) -> str:
+                     temperature: float = 0.7,
+                     top_k: int = 0,
+                     top_p: float = 1.0) -> str:
         """
         Get AI response for a prompt
         """
-        # Clean prompt
-        prompt = prompt.lower().strip()
-        prompt = re.sub(r'[^\w\s.,!?]', '', prompt)
+        prompt = self._clean_prompt(prompt)
 
         # Generate response
         full_response = self.generate_text(
             seed_text=prompt,
             num_words=max_length,
-            temperature=temperature
+            temperature=temperature,
+            top_k=top_k,
+            top_p=top_p
         )
 
+        return self._format_response(full_response, prompt, max_length)
+
+    def get_responses_batch(self, prompts: List[str],
+                            max_length: Union[int, List[int]] = 150,
+                            temperature: Union[float, List[float]] = 0.7,
+                            top_k: int = 0,
+                            top_p: float = 1.0) -> List[str]:
+        """
+        get_response for many prompts in one batched generation
+
+        max_length and temperature may be given per prompt.
+        """
+        prompts = [self._clean_prompt(prompt) for prompt in prompts]
+        max_lengths = np.broadcast_to(np.asarray(max_length, dtype=np.int64), (len(prompts),))
+
+        full_responses = self.generate_texts_batch(prompts, num_words=max_lengths, temperature=temperature,
+                                                   top_k=top_k, top_p=top_p)
+        return [self._format_response(full_response, prompt, int(length))
+                for full_response, prompt, length in zip(full_responses, prompts, max_lengths)]
+
+    @staticmethod
+    def _clean_prompt(prompt: str) -> str:
+        prompt = prompt.lower().strip()
+        return re.sub(r'[^\w\s.,!?]', '', prompt)
+
+    @staticmethod
+    def _format_response(full_response: str, prompt: str, max_length: int) -> str:
+        """
+        The generated continuation of a prompt, capitalized and punctuated
+        """
         # Extract only the generated part
         response = full_response[len(prompt):].strip()
 
@@ -510,22 +993,327 @@ class LSTMModelTrainer:
         return response
 
 
+class InferenceServer:
+    """
+    Long-lived local inference server sharing one loaded model between clients
+
+    Serves JSON over localhost HTTP:
+        POST /generate  {"prompt": ..., "max_length": 100, "temperature": 0.7, "top_k": 0, "top_p": 1.0}
+        GET  /stats     queue depth, batch sizes and p50/p95/p99 latency
+        GET  /health
+    Requests from any number of front-end processes are queued and run as
+    micro-batches: a batch closes when it holds max_batch_size requests or
+    max_wait_ms after its first request arrived, whichever comes first.
+    All generation happens on one worker thread, so the model is loaded
+    and warmed up once; max_length caps the words one request may ask
+    for, so a single client can't hold that thread for long.
+    """
+
+    def __init__(self, trainer: 'LSTMModelTrainer', host: str = '127.0.0.1', port: int = 8765,
+                 max_batch_size: int = 16, max_wait_ms: float = 10.0, latency_window: int = 10000,
+                 max_length: int = 500):
+        if trainer.model is None:
+            raise ValueError("Model not loaded. Train or load a model first.")
+
+        self.trainer = trainer
+        self.host = host
+        self.port = port
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_length = max_length
+
+        self.requests = queue.Queue()
+        self.latencies = deque(maxlen=latency_window)  # Seconds from arrival to answer
+        self.batch_sizes = deque(maxlen=latency_window)
+        self.total_requests = 0
+        self.in_flight = 0
+        self.started_at = None
+
+        # Guards the stats above: the worker appends while HTTP threads read them
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker = None
+        self._httpd = None
+        self._http_thread = None
+
+    def warm_up(self):
+        """
+        Run a tiny batch so the first real request doesn't pay for graph setup
+        """
+        start_time = time.perf_counter()
+        self.trainer.get_responses_batch(["warm up"] * min(2, self.max_batch_size), max_length=2)
+        print(f"Model warmed up in {time.perf_counter() - start_time:.2f}s")
+
+    def submit(self, prompt: str, max_length: int = 100, temperature: float = 0.7,
+               top_k: int = 0, top_p: float = 1.0) -> Future:
+        """
+        Queue a request; the future resolves to the response text
+
+        Raises ValueError for a malformed request, before it can reach a batch.
+        """
+        if not isinstance(prompt, str):
+            raise ValueError("prompt must be a string")
+        self._check_number('max_length', max_length, integer=True, minimum=1, maximum=self.max_length)
+        self._check_number('temperature', temperature, minimum=0.0)
+        self._check_number('top_k', top_k, integer=True, minimum=0)
+        self._check_number('top_p', top_p, minimum=0.0, maximum=1.0)
+        if top_p == 0:
+            raise ValueError("top_p must be greater than 0")
+
+        future = Future()
+        self.requests.put({
+            'prompt': prompt,
+            'max_length': int(max_length),
+            'temperature': float(temperature),
+            'top_k': int(top_k),
+            'top_p': float(top_p),
+            'future': future,
+            'arrived': time.perf_counter()
+        })
+        return future
+
+    @staticmethod
+    def _check_number(name: str, value, integer: bool = False,
+                      minimum: float = None, maximum: float = None):
+        # bool is an int subclass, and JSON true / false is never a valid setting here
+        valid_types = (int, np.integer) if integer else (int, float, np.integer, np.floating)
+        if isinstance(value, bool) or not isinstance(value, valid_types) or not np.isfinite(value):
+            raise ValueError(f"{name} must be {'an integer' if integer else 'a number'}, got {value!r}")
+        if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+            bounds = f">= {minimum}" if maximum is None else f"between {minimum} and {maximum}"
+            raise ValueError(f"{name} must be {bounds}, got {value!r}")
+
+    def _next_batch(self) -> List[dict]:
+        """
+        Block for a first request, then gather more until the batch is full or its deadline passes
+        """
+        try:
+            batch = [self.requests.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        deadline = batch[0]['arrived'] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run_batch(self, batch: List[dict]):
+        # Sampling filters are per batch: requests that differ in them run as separate groups
+        groups = defaultdict(list)
+        for request in batch:
+            groups[(request['top_k'], request['top_p'])].append(request)
+
+        for (top_k, top_p), group in groups.items():
+            self._run_group(group, top_k, top_p)
+
+    def _run_group(self, group: List[dict], top_k: int, top_p: float):
+        try:
+            responses = self.trainer.get_responses_batch(
+                [request['prompt'] for request in group],
+                max_length=[request['max_length'] for request in group],
+                temperature=[request['temperature'] for request in group],
+                top_k=top_k, top_p=top_p)
+        except Exception as e:
+            if len(group) == 1:
+                group[0]['future'].set_exception(e)
+                return
+            # Retry the rows one at a time, so only the request that caused the failure gets it
+            for request in group:
+                self._run_group([request], top_k, top_p)
+            return
+
+        finished = time.perf_counter()
+        with self._stats_lock:
+            self.latencies.extend(finished - request['arrived'] for request in group)
+            self.batch_sizes.append(len(group))
+            self.total_requests += len(group)
+        for request, response in zip(group, responses):
+            request['future'].set_result(response)
+
+    def _batch_loop(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            self.in_flight = len(batch)
+            self._run_batch(batch)
+            self.in_flight = 0
+
+        # Fail whatever is still waiting rather than leaving clients hanging
+        while True:
+            try:
+                self.requests.get_nowait()['future'].set_exception(RuntimeError("Inference server stopped"))
+            except queue.Empty:
+                break
+
+    def stats(self) -> dict:
+        """
+        Queue depth, throughput and latency percentiles over the recent window
+        """
+        with self._stats_lock:
+            latencies = np.array(self.latencies) * 1000.0
+            batch_sizes = list(self.batch_sizes)
+            total_requests = self.total_requests
+
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+        return {
+            'queue_depth': self.requests.qsize(),
+            'in_flight': self.in_flight,
+            'requests': total_requests,
+            'batches': len(batch_sizes),
+            'avg_batch_size': float(np.mean(batch_sizes)) if batch_sizes else 0.0,
+            'latency_ms': {'p50': float(p50), 'p95': float(p95), 'p99': float(p99)},
+            'uptime_s': time.time() - self.started_at if self.started_at else 0.0
+        }
+
+    def start(self) -> str:
+        """
+        Warm up, then serve in background threads; returns the server URL
+        """
+        self.warm_up()
+        self._stop.clear()
+        self.started_at = time.time()
+        self._worker = threading.Thread(target=self._batch_loop, name="inference-batcher", daemon=True)
+        self._worker.start()
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _InferenceRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.inference = self
+        self.port = self._httpd.server_address[1]
+        self._http_thread = threading.Thread(target=self._httpd.serve_forever, name="inference-http", daemon=True)
+        self._http_thread.start()
+
+        url = f"http://{self.host}:{self.port}"
+        print(f"Inference server listening on {url} "
+              f"(max batch {self.max_batch_size}, max wait {self.max_wait * 1000:.0f}ms)")
+        return url
+
+    def serve_forever(self):
+        """
+        start() and block until interrupted
+        """
+        self.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("\nStopping inference server...")
+        finally:
+            self.stop()
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+
+class _InferenceRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON endpoints of InferenceServer
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            self._send_json(200, self.server.inference.stats())
+        elif self.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        else:
+            self._send_json(404, {'error': f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/generate':
+            self._send_json(404, {'error': f"Unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(request, dict):
+                raise ValueError("body must be a JSON object")
+            if 'prompt' not in request:
+                raise ValueError("prompt is required")
+            future = self.server.inference.submit(
+                request['prompt'],
+                max_length=request.get('max_length', 100),
+                temperature=request.get('temperature', 0.7),
+                top_k=request.get('top_k', 0),
+                top_p=request.get('top_p', 1.0))
+        except (KeyError, TypeError, ValueError) as e:
+            self._send_json(400, {'error': f"Invalid request: {e}"})
+            return
+
+        try:
+            self._send_json(200, {'response': future.result()})
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+
+
+class InferenceClient:
+    """
+    Front-end side of an InferenceServer, with the get_response signature
+    """
+
+    def __init__(self, url: str = "http://127.0.0.1:8765", timeout: float = 300.0):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def get_response(self, prompt: str, max_length: int = 150, temperature: float = 0.7,
+                     top_k: int = 0, top_p: float = 1.0) -> str:
+        response = self.session.post(f"{self.url}/generate", json={
+            'prompt': prompt,
+            'max_length': max_length,
+            'temperature': temperature,
+            'top_k': top_k,
+            'top_p': top_p
+        }, timeout=self.timeout)
+        payload = response.json()
+        if response.status_code != 200:
+            raise RuntimeError(payload.get('error', f"HTTP {response.status_code}"))
+        return payload['response']
+
+    def stats(self) -> dict:
+        return self.session.get(f"{self.url}/stats", timeout=self.timeout).json()
+
+
 class APIAIModel:
     """
     Main class to manage API data fetching and model training
     """
 
     def __init__(self):
-        self.data_fetcher = APIDataFetcher(max_workers=5)
+        self.data_fetcher = APIDataFetcher(max_workers=5, cache_dir="./api_data/http_cache")
         self.model_trainer = None
         self.api_configs = []
         self.training_data = []
 
     def add_api_endpoint(self, url: str, method: str = 'GET',
                          params: dict = None, headers: dict = None,
-                         data: dict = None, name: str = None):
+                         data: dict = None, name: str = None, stream: bool = False):
         """
         Add an API endpoint to fetch data from
+
+        stream=True parses the response incrementally, for very large payloads.
         """
         if not name:
             # Generate name from URL
@@ -539,7 +1327,8 @@ class APIAIModel:
             'params': params or {},
             'headers': headers or {},
             'data': data,
-            'timeout': 30
+            'timeout': 30,
+            'stream': stream
         }
 
         self.api_configs.append(api_config)
@@ -577,9 +1366,19 @@ class APIAIModel:
 
     def train_model(self, model_name: str = "api_trained_model",
                     seq_length: int = 50, epochs: int = 50,
-                    batch_size: int = 64, test_size: float = 0.1):
+                    batch_size: int = 64, test_size: float = 0.1,
+                    use_token_corpus: bool = False,
+                    resume: bool = False):
         """
         Train LSTM model on fetched API data
+
+        With use_token_corpus=True the texts are tokenized once into a
+        memory-mapped corpus under ./api_data/token_corpus and training
+        windows are streamed from it instead of held as in-memory arrays.
+
+        Full checkpoints are written every epoch under
+        ./trained_models/<model_name>_checkpoint; resume=True continues an
+        interrupted run from there.
         """
         if not self.training_data:
             print("No training data available. Please fetch data from APIs first.")
@@ -600,10 +1399,19 @@ class APIAIModel:
             print("No valid text data after preprocessing.")
             return False
 
+        checkpoint_dir = os.path.join("./trained_models", f"{model_name}_checkpoint")
+        first_epoch = TrainingCheckpoint(checkpoint_dir, []).saved_epoch() if resume else 0
+
         # Prepare sequences
         print("\n2. Preparing training sequences...")
         try:
-            X, y = self.model_trainer.prepare_sequences(processed_texts, seq_length)
+            if use_token_corpus:
+                corpus = self.model_trainer.build_token_corpus(processed_texts, seq_length=seq_length)
+                train_dataset, val_dataset = self.model_trainer.create_training_datasets(
+                    corpus, batch_size=batch_size, validation_split=test_size,
+                    first_epoch=first_epoch)
+            else:
+                X, y = self.model_trainer.prepare_sequences(processed_texts, seq_length)
         except ValueError as e:
             print(f"Error preparing sequences: {e}")
             return False
@@ -618,16 +1426,27 @@ class APIAIModel:
 
         # Train model
         print("\n4. Training model...")
-        history = self.model_trainer.train(
-            X, y,
-            epochs=epochs,
-            batch_size=batch_size,
-            validation_split=test_size
-        )
+        if use_token_corpus:
+            history = self.model_trainer.train_on_dataset(
+                train_dataset, val_dataset,
+                epochs=epochs,
+                checkpoint_dir=checkpoint_dir,
+                resume=resume
+            )
+        else:
+            history = self.model_trainer.train(
+                X, y,
+                epochs=epochs,
+                batch_size=batch_size,
+                validation_split=test_size,
+                checkpoint_dir=checkpoint_dir,
+                resume=resume
+            )
 
         # Save model
         print("\n5. Saving trained model...")
         self.model_trainer.save_model()
+        self.model_trainer.save_bundle()
 
         # Display results
         print("\n" + "="*60)
@@ -644,7 +1463,12 @@ class APIAIModel:
         """
         try:
             self.model_trainer = LSTMModelTrainer(model_name=model_name)
-            self.model_trainer.load_model()
+
+            # Prefer the fast-loading bundle, fall back to .h5 + pickle artifacts
+            if os.path.exists(self.model_trainer.bundle_path()):
+                self.model_trainer.load_bundle()
+            else:
+                self.model_trainer.load_model()
             print(f"Model '{model_name}' loaded successfully!")
             return True
         except Exception as e:
@@ -679,14 +1503,33 @@ class APIAIModel:
             print(f"   Response: {response}")
             print("-"*50)
 
-    def interactive_chat(self):
+    def serve_model(self, host: str = '127.0.0.1', port: int = 8765,
+                    max_batch_size: int = 16, max_wait_ms: float = 10.0, max_length: int = 500):
         """
-        Interactive chat with the AI model
+        Serve the loaded model to other processes until interrupted, see InferenceServer
         """
         if self.model_trainer is None or self.model_trainer.model is None:
             print("Model not loaded. Please train or load a model first.")
             return
 
+        InferenceServer(self.model_trainer, host=host, port=port, max_batch_size=max_batch_size,
+                        max_wait_ms=max_wait_ms, max_length=max_length).serve_forever()
+
+    def interactive_chat(self, server_url: str = None):
+        """
+        Interactive chat with the AI model
+
+        With server_url, responses come from a running InferenceServer
+        instead of a model loaded into this process.
+        """
+        if server_url:
+            responder = InferenceClient(server_url)
+        elif self.model_trainer is None or self.model_trainer.model is None:
+            print("Model not loaded. Please train or load a model first.")
+            return
+        else:
+            responder = self.model_trainer
+
         print("\n" + "="*60)
         print("AI CHAT INTERFACE")
         print("="*60)
@@ -738,7 +1581,7 @@ class APIAIModel:
 
                 # Get AI response
                 start_time = time.time()
-                response = self.model_trainer.get_response(
+                response = responder.get_response(
                     prompt=user_input,
                     max_length=response_length,
                     temperature=temperature
@@ -791,9 +1634,10 @@ def main():
         print("5. Test model")
         print("6. Interactive chat")
         print("7. View training data")
-        print("8. Exit")
+        print("8. Serve model (local inference server)")
+        print("9. Exit")
 
-        choice = input("\nEnter choice (1-8): ").strip()
+        choice = input("\nEnter choice (1-9): ").strip()
 
         if choice == '1':
             print("\nAdd API Endpoints")
@@ -860,7 +1704,8 @@ def main():
             ai_system.test_model()
 
         elif choice == '6':
-            ai_system.interactive_chat()
+            server_url = input("Inference server URL (empty for the loaded model): ").strip()
+            ai_system.interactive_chat(server_url or None)
 
         elif choice == '7':
             if ai_system.training_data:
@@ -874,11 +1719,15 @@ def main():
                 print("No training data available.")
 
         elif choice == '8':
+            port = input("Port [8765]: ").strip()
+            ai_system.serve_model(port=int(port) if port else 8765)
+
+        elif choice == '9':
             print("\nThank you for using the API AI Model!")
             break
 
         else:
-            print("Invalid choice. Please enter 1-8.")
+            print("Invalid choice. Please enter 1-9.")
 
 
 def quick_start_example():
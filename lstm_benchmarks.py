@@ -0,0 +1,289 @@
+"""
+Offline micro-benchmarks for the paragraph LSTM hot paths
+
+Builds synthetic property records and a tiny randomly initialized model,
+so every benchmark runs in seconds without network access or a trained
+model:
+
+    python lstm_benchmarks.py --save-baseline    # store results as the baseline
+    python lstm_benchmarks.py                    # compare against the baseline
+    python lstm_benchmarks.py --tolerance 0.25   # ... with a looser tolerance
+
+A benchmark whose throughput falls more than the tolerance below the
+baseline (or whose peak memory rises more than the tolerance above it)
+fails the run with exit status 1; a missing baseline fails it with
+status 2. Peak memory is the Python-level allocation peak (tracemalloc)
+of one extra untimed run of each benchmark. Baselines are
+machine-specific: record one on the machine that runs the comparison.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+import tensorflow as tf
+
+from improved_lstm import LSTMModelTrainer, ParagraphCreator
+from lstm import TextExtractor
+
+DEFAULT_BASELINE = "lstm_benchmark_baseline.json"
+
+# Allocation peaks below this much growth are noise, whatever the tolerance says
+MEMORY_SLACK_MB = 1.0
+
+LOCATIONS = ['DHA Phase 1', 'DHA Phase 2', 'DHA Phase 5', 'DHA Phase 6', 'Bahria Town',
+             'Gulberg', 'Johar Town', 'Model Town', 'Clifton', 'F-7 Islamabad']
+PROPERTY_TYPES = ['residential', 'commercial', 'apartment', 'plot', 'villa']
+
+
+def make_properties(count: int, seed: int = 0) -> List[dict]:
+    """
+    Synthetic property records with the fields ParagraphCreator reads
+    """
+    rng = random.Random(seed)
+    return [{
+        'id': i,
+        'location': rng.choice(LOCATIONS),
+        'property_type': rng.choice(PROPERTY_TYPES),
+        'bedrooms': rng.randint(1, 6),
+        'area': rng.randint(120, 2000),
+        'price': rng.randint(20, 900) * 100000
+    } for i in range(count)]
+
+
+def make_api_responses(count: int, items_per_response: int, seed: int = 0) -> List[dict]:
+    """
+    Synthetic nested listing API responses with text, metadata and comment threads
+    """
+    rng = random.Random(seed)
+    return [{
+        'status': 'ok',
+        'data': [{
+            'id': i,
+            'attributes': {
+                'title': f"{rng.choice(PROPERTY_TYPES).title()} for sale in {rng.choice(LOCATIONS)}",
+                'description': ' '.join(rng.choice(LOCATIONS + PROPERTY_TYPES) for _ in range(rng.randint(5, 30))),
+                'tags': rng.sample(PROPERTY_TYPES, 2),
+                'meta': {'created': '2024-01-01T00:00:00', 'agent': {'name': 'Prime Estate Agency', 'phone': '0300-1234567'}},
+                'comments': [{'user': f"user{j}", 'comment': ' '.join(rng.choice(LOCATIONS) for _ in range(rng.randint(1, 8))),
+                              'rating': rng.randint(1, 5)} for j in range(rng.randint(0, 4))]
+            }
+        } for i in range(items_per_response)],
+        'links': {'next': None}
+    } for _ in range(count)]
+
+
+def _best_time(fn: Callable, repeats: int) -> Tuple[float, object]:
+    """
+    Best wall time over repeats, with the function's progress prints silenced
+    """
+    best, result = None, None
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start_time = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - start_time
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _peak_memory_mb(fn: Callable) -> float:
+    """
+    Peak memory allocated during one untimed call, in MB
+
+    Kept out of _best_time because tracing every allocation slows the call down.
+    """
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1e6
+
+
+def _result(name: str, unit: str, items: int, seconds: float, fn: Callable) -> dict:
+    return {
+        'name': name,
+        'unit': unit,
+        'items': items,
+        'seconds': seconds,
+        'throughput': items / seconds if seconds > 0 else 0.0,
+        'peak_memory_mb': _peak_memory_mb(fn)
+    }
+
+
+def _generated_tokens(text: str, prompt: str) -> int:
+    # Raw (post_process=False) output is the prompt followed by one word per sampled token
+    return len(text.split()) - len(prompt.split())
+
+
+def run_benchmarks(num_properties: int = 300, num_words: int = 40,
+                   repeats: int = 3, seed: int = 0) -> List[dict]:
+    """
+    Run every benchmark and return one result dict per benchmark
+    """
+    random.seed(seed)
+    tf.keras.utils.set_random_seed(seed)
+    results = []
+
+    properties = make_properties(num_properties, seed)
+    creator = ParagraphCreator()
+    trainer = LSTMModelTrainer(model_name="benchmark_model")
+
+    def transform():
+        return creator.transform_to_paragraphs(properties)
+
+    seconds, paragraphs = _best_time(transform, repeats)
+    results.append(_result("transform_to_paragraphs", "paragraphs/sec", len(paragraphs), seconds, transform))
+
+    def preprocess():
+        return trainer.preprocess_paragraphs(paragraphs)
+
+    seconds, processed = _best_time(preprocess, repeats)
+    results.append(_result("preprocess_paragraphs", "paragraphs/sec", len(paragraphs), seconds, preprocess))
+
+    def prepare():
+        return trainer.prepare_sequences_from_paragraphs(processed, seq_length=20)
+
+    seconds, (X, _) = _best_time(prepare, repeats)
+    results.append(_result("prepare_sequences_from_paragraphs", "windows/sec", len(X), seconds, prepare))
+
+    responses = make_api_responses(20, num_properties, seed)
+    payload_mb = sum(len(json.dumps(response)) for response in responses) / 1e6
+    for name, extractor in [("extract_texts_batch", TextExtractor()),
+                            ("extract_texts_batch_selectors",
+                             TextExtractor(selectors=['$.data[*].attributes.comments[*].comment', '$..tags[*]']))]:
+        def extract(extractor=extractor):
+            return extractor.extract_batch(responses)
+
+        seconds, _ = _best_time(extract, repeats)
+        results.append(_result(name, "MB/sec", payload_mb, seconds, extract))
+
+    # Tiny untrained model: generation cost depends on shapes, not on what was learned
+    with contextlib.redirect_stdout(io.StringIO()):
+        trainer.build_paragraph_model(embedding_dim=16, lstm_units=32, dropout_rate=0.1,
+                                      bidirectional=False)
+    seed_text = "what is the property rate in dha phase 5"
+
+    for name, stateful in [("generate_paragraph", False), ("generate_paragraph_stateful", True)]:
+        def generate(stateful=stateful):
+            trainer.get_sampler().reseed(seed)
+            return trainer.generate_paragraph(seed_text, num_words=num_words, stateful=stateful,
+                                              post_process=False)
+
+        _best_time(generate, 1)  # Warm-up: tracing and stateful model construction
+        seconds, text = _best_time(generate, repeats)
+        results.append(_result(name, "tokens/sec", _generated_tokens(text, seed_text), seconds, generate))
+
+    prompts = [f"tell me about {location.lower()}" for location in LOCATIONS[:8]]
+
+    def generate_batch():
+        trainer.get_sampler().reseed(seed)
+        return trainer.generate_paragraphs_batch(prompts, num_words=num_words, post_process=False)
+
+    _best_time(generate_batch, 1)
+    seconds, texts = _best_time(generate_batch, repeats)
+    tokens = sum(_generated_tokens(text, prompt) for text, prompt in zip(texts, prompts))
+    results.append(_result("generate_paragraphs_batch", "tokens/sec", tokens, seconds, generate_batch))
+
+    return results
+
+
+def compare_to_baseline(results: List[dict], baseline: dict, tolerance: float) -> List[str]:
+    """
+    Describe every benchmark that regressed beyond the tolerance
+    """
+    regressions = []
+    baseline_results = {result['name']: result for result in baseline['results']}
+
+    for result in results:
+        reference = baseline_results.get(result['name'])
+        if reference is None:
+            continue
+
+        ratio = result['throughput'] / reference['throughput'] if reference['throughput'] else 1.0
+        result['baseline_ratio'] = ratio
+        if ratio < 1 - tolerance:
+            regressions.append(f"{result['name']}: {result['throughput']:.1f} {result['unit']} vs "
+                               f"baseline {reference['throughput']:.1f} ({ratio:.0%})")
+
+        reference_peak = reference.get('peak_memory_mb')
+        if reference_peak and result['peak_memory_mb'] > max(reference_peak * (1 + tolerance),
+                                                             reference_peak + MEMORY_SLACK_MB):
+            regressions.append(f"{result['name']} peak memory: {result['peak_memory_mb']:.1f} MB vs "
+                               f"baseline {reference_peak:.1f} MB")
+
+    return regressions
+
+
+def print_results(results: List[dict]):
+    print(f"\n{'Benchmark':<36}{'Throughput':>16}  {'Unit':<16}{'Peak mem':>10}{'vs baseline':>13}")
+    print("-" * 91)
+    for result in results:
+        memory = f"{result['peak_memory_mb']:.1f} MB"
+        ratio = f"{result['baseline_ratio']:.0%}" if 'baseline_ratio' in result else "-"
+        print(f"{result['name']:<36}{result['throughput']:>16.1f}  {result['unit']:<16}{memory:>10}{ratio:>13}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Paragraph LSTM micro-benchmarks")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed fractional slowdown before failing (default: 0.2)")
+    parser.add_argument('--properties', type=int, default=300, help="number of synthetic property records")
+    parser.add_argument('--words', type=int, default=40, help="words generated per paragraph")
+    parser.add_argument('--repeats', type=int, default=3, help="runs per benchmark; the best is kept")
+    parser.add_argument('--output', help="also write the results JSON here")
+    args = parser.parse_args()
+
+    # Fail before spending minutes on a run that has nothing to compare against
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        parser.error(f"no baseline at {args.baseline}; run with --save-baseline to record one")
+
+    results = run_benchmarks(args.properties, args.words, args.repeats)
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'settings': {'properties': args.properties, 'words': args.words, 'repeats': args.repeats},
+        'results': results
+    }
+
+    regressions = []
+    if not args.save_baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('settings') != report['settings']:
+            print(f"Warning: baseline {args.baseline} was recorded with settings {baseline.get('settings')}")
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"\nPERFORMANCE REGRESSION (tolerance {args.tolerance:.0%}):")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
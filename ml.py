@@ -27,6 +27,9 @@ from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
 import warnings
 import pickle
+
+from token_sampler import TokenSampler
+from seq2seq_decoder import Seq2SeqDecoder
 warnings.filterwarnings('ignore')
 
 print("STEP 1: CREATING SAMPLE DATA")
@@ -1334,34 +1337,17 @@ decoder_model = Model(
 # new # start_token = output_tokenizer.word_index['<start>']
 stop_token = output_tokenizer.word_index['<end>']
 
-def decode_sequence(input_seq):
-    states_value = encoder_model.predict(input_seq, verbose=0)
-
-    target_seq = np.zeros((1, 1))
-    target_seq[0, 0] = start_token
-
-    decoded_sentence = ""
-
-    while True:
-        output_tokens, h, c = decoder_model.predict(
-            [target_seq] + states_value, verbose=0)
-
-        sampled_token_index = np.argmax(output_tokens[0, -1, :])
+# Greedy picks plus an id -> word table, shared by the decoders below
+output_sampler = TokenSampler.from_tokenizer(output_tokenizer, vocab_size=vocab_size)
 
-        if sampled_token_index == stop_token:
-            break
+# Batched decoding: one encoder call per batch, all rows stepped together.
+# Padding or <end> ends a response; like the old loop, it stops after max_output_len + 1 words
+response_decoder = Seq2SeqDecoder(encoder_model, decoder_model, output_sampler,
+                                  start_id=start_token, stop_ids=[0, stop_token],
+                                  max_length=max_output_len + 1)
 
-        sampled_word = output_tokenizer.index_word.get(sampled_token_index, "")
-
-        decoded_sentence += " " + sampled_word
-
-        target_seq[0, 0] = sampled_token_index
-        states_value = [h, c]
-
-        if len(decoded_sentence.split()) > max_output_len:
-            break
-
-    return decoded_sentence.strip()
+def decode_sequence(input_seq):
+    return response_decoder.decode(input_seq)[0]
 
 
 
@@ -1392,71 +1378,44 @@ print("\n" + "="*60)
 print("TESTING THE CHATBOT")
 print("="*60)
 
-def decode_sequence(input_seq):
-    """Decode sequence for inference"""
-    # Encode the input as state vectors
-    states_value = encoder_model.predict(input_seq, verbose=0)
-
-    # Generate empty target sequence of length 1
-    target_seq = np.zeros((1, 1))
-    # Populate the first character with start token
-    target_seq[0, 0] = output_tokenizer.word_index['<OOV>']
-
-    # Sampling loop
-    stop_condition = False
-    decoded_sentence = ''
-    max_decoded_len = 30
-
-    while not stop_condition and len(decoded_sentence.split()) < max_decoded_len:
-        output_tokens, h, c = decoder_model.predict(
-            [target_seq] + states_value, verbose=0)
-
-        # Sample a token
-        sampled_token_index = np.argmax(output_tokens[0, -1, :])
-        sampled_word = None
+# The <OOV> id doubles as the start token; padding or <OOV> ends a response
+max_decoded_len = 30
+response_decoder = Seq2SeqDecoder(encoder_model, decoder_model, output_sampler,
+                                  start_id=output_tokenizer.word_index['<OOV>'],
+                                  stop_ids=[0, output_tokenizer.word_index['<OOV>']],
+                                  max_length=max_decoded_len - 1)
 
-        for word, index in output_tokenizer.word_index.items():
-            if index == sampled_token_index:
-                sampled_word = word
-                break
+def decode_sequences(input_seqs, beam_width=1, length_penalty=0.6):
+    """Decode a batch of padded input sequences (greedy, or beam search for beam_width > 1)"""
+    return response_decoder.decode(input_seqs, beam_width=beam_width, length_penalty=length_penalty)
 
-        if sampled_word is None or sampled_word == '<OOV>':
-            sampled_word = ''
+def decode_sequence(input_seq):
+    """Decode sequence for inference"""
+    return decode_sequences(input_seq)[0]
 
-        # Exit condition: either max length or stop word
-        if (sampled_word == '' or
-            len(decoded_sentence.split()) >= max_decoded_len - 1):
-            stop_condition = True
-        else:
-            decoded_sentence += ' ' + sampled_word
+def predict_responses(user_inputs, user_context=None, beam_width=1):
+    """Generate responses for a batch of inputs with one batched decode"""
+    # Preprocess inputs
+    input_seqs = input_tokenizer.texts_to_sequences([user_input.lower() for user_input in user_inputs])
+    input_padded_seqs = pad_sequences(input_seqs, maxlen=max_input_len, padding='post')
 
-        # Update the target sequence
-        target_seq = np.zeros((1, 1))
-        target_seq[0, 0] = sampled_token_index
+    responses = []
+    for response in decode_sequences(input_padded_seqs, beam_width=beam_width):
+        # Personalize if user context provided
+        if user_context and user_context.get('first_name'):
+            name = user_context['first_name']
+            # Simple personalization
+            if 'you' in response.lower():
+                response = response.replace('you', name)
+                response = response.replace('your', f"{name}'s")
 
-        # Update states
-        states_value = [h, c]
+        responses.append(response if response else "I'm not sure how to answer that.")
 
-    return decoded_sentence.strip()
+    return responses
 
-def predict_response(user_input, user_context=None):
+def predict_response(user_input, user_context=None, beam_width=1):
     """Generate response using trained model"""
-    # Preprocess input
-    input_seq = input_tokenizer.texts_to_sequences([user_input.lower()])
-    input_padded_seq = pad_sequences(input_seq, maxlen=max_input_len, padding='post')
-
-    # Generate response
-    response = decode_sequence(input_padded_seq)
-
-    # Personalize if user context provided
-    if user_context and user_context.get('first_name'):
-        name = user_context['first_name']
-        # Simple personalization
-        if 'you' in response.lower():
-            response = response.replace('you', name)
-            response = response.replace('your', f"{name}'s")
-
-    return response if response else "I'm not sure how to answer that."
+    return predict_responses([user_input], user_context, beam_width)[0]
 
     # Test with different inputs
 test_inputs = [
@@ -1472,8 +1431,7 @@ test_inputs = [
 print("🤖 Chatbot Testing:")
 print("-" * 50)
 
-for test_input in test_inputs:
-    response = predict_response(test_input)
+for test_input, response in zip(test_inputs, predict_responses(test_inputs)):
     print(f"👤 User: {test_input}")
     print(f"🤖 Bot: {response}")
     print()
@@ -0,0 +1,150 @@
+"""
+Versioned, memory-mappable model bundles shared by the LSTM trainers
+
+A bundle is a directory holding manifest.json (format version,
+architecture, tokenizer settings, weight index), weights/NNN.npy (one
+array per weight, so large matrices can be memory-mapped) and vocab.txt.
+Both trainers read and write it through ModelBundleMixin, so there is a
+single definition of the layout and of MODEL_BUNDLE_VERSION.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.preprocessing.text import Tokenizer
+
+
+# Bump when the bundle layout written by save_bundle changes
+MODEL_BUNDLE_VERSION = 1
+
+
+class ModelBundleMixin:
+    """
+    save_bundle / load_bundle for a trainer with model, tokenizer, vocab_size and max_sequence_len
+    """
+
+    def _model_updated(self):
+        """
+        Forget everything derived from the previous weights; trainers with caches override this
+        """
+    def bundle_path(self, save_dir: str = "./trained_models") -> str:
+        """
+        Directory holding this model's bundle
+        """
+        return os.path.join(save_dir, f"{self.model_name}.bundle")
+
+    def save_bundle(self, save_dir: str = "./trained_models") -> str:
+        """
+        Save the model as a versioned bundle directory
+
+        Layout: manifest.json (format version, architecture, tokenizer
+        settings, weight index), weights/NNN.npy (one array per weight, so
+        large matrices can be memory-mapped) and vocab.txt (one word per
+        line in id order, only the ids the model can emit).
+        """
+        if self.model is None:
+            raise ValueError("Model not loaded. Train or load a model first.")
+
+        bundle_dir = self.bundle_path(save_dir)
+        os.makedirs(os.path.join(bundle_dir, "weights"), exist_ok=True)
+
+        # Weights, one .npy per array
+        weight_entries = []
+        for i, weight in enumerate(self.model.get_weights()):
+            weight_file = os.path.join("weights", f"{i:03d}.npy")
+            np.save(os.path.join(bundle_dir, weight_file), weight)
+            weight_entries.append({'file': weight_file, 'shape': list(weight.shape), 'dtype': weight.dtype.name})
+
+        # Compact vocabulary: word for id 1, 2, ... up to vocab_size - 1
+        index_word = {idx: word for word, idx in self.tokenizer.word_index.items()}
+        with open(os.path.join(bundle_dir, "vocab.txt"), 'w', encoding='utf-8') as f:
+            for idx in range(1, self.vocab_size):
+                f.write(index_word.get(idx, '') + '\n')
+
+        manifest = {
+            'format_version': MODEL_BUNDLE_VERSION,
+            'model_name': self.model_name,
+            'vocab_size': self.vocab_size,
+            'max_sequence_len': self.max_sequence_len,
+            'architecture': json.loads(self.model.to_json()),
+            'tokenizer': {
+                'num_words': self.tokenizer.num_words,
+                'oov_token': self.tokenizer.oov_token,
+                'filters': self.tokenizer.filters,
+                'lower': self.tokenizer.lower,
+                'split': self.tokenizer.split,
+                'char_level': self.tokenizer.char_level
+            },
+            'vocab_file': "vocab.txt",
+            'weights': weight_entries
+        }
+
+        with open(os.path.join(bundle_dir, "manifest.json"), 'w') as f:
+            json.dump(manifest, f)
+
+        print(f"Model bundle saved to {bundle_dir}")
+        return bundle_dir
+
+    def load_bundle(self, save_dir: str = "./trained_models") -> dict:
+        """
+        Load a model bundle, reading only what inference needs
+
+        Weights are memory-mapped and copied straight into the model; the
+        tokenizer is rebuilt from its settings and the vocab table alone.
+        Returns the cold-start timings in seconds.
+        """
+        bundle_dir = self.bundle_path(save_dir)
+        manifest_path = os.path.join(bundle_dir, "manifest.json")
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError(f"File not found: {manifest_path}")
+
+        timings = {}
+        start_time = time.perf_counter()
+
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+
+        if manifest['format_version'] > MODEL_BUNDLE_VERSION:
+            raise ValueError(f"Bundle format {manifest['format_version']} is newer than "
+                             f"supported version {MODEL_BUNDLE_VERSION}")
+        timings['manifest'] = time.perf_counter() - start_time
+
+        # Tokenizer from settings plus the compact vocab
+        step_time = time.perf_counter()
+        self.tokenizer = Tokenizer(**manifest['tokenizer'])
+        with open(os.path.join(bundle_dir, manifest['vocab_file']), 'r', encoding='utf-8') as f:
+            words = f.read().split('\n')[:-1]
+        self.tokenizer.word_index = {word: idx for idx, word in enumerate(words, 1) if word}
+        self.tokenizer.index_word = {idx: word for word, idx in self.tokenizer.word_index.items()}
+        self.sampler = None
+        timings['vocab'] = time.perf_counter() - step_time
+
+        # Architecture, then memory-mapped weights
+        step_time = time.perf_counter()
+        self.model = tf.keras.models.model_from_json(json.dumps(manifest['architecture']))
+        weights = [np.load(os.path.join(bundle_dir, entry['file']), mmap_mode='r')
+                   for entry in manifest['weights']]
+        self.model.set_weights(weights)
+        self.training_model = None
+        timings['model'] = time.perf_counter() - step_time
+
+        self.vocab_size = manifest['vocab_size']
+        self.max_sequence_len = manifest['max_sequence_len']
+        self._model_updated()
+        timings['total'] = time.perf_counter() - start_time
+
+        print(f"Model bundle loaded from {bundle_dir} in {timings['total']:.2f}s "
+              f"(manifest {timings['manifest']:.3f}s, vocab {timings['vocab']:.3f}s, "
+              f"model {timings['model']:.3f}s)")
+        print(f"Vocabulary size: {self.vocab_size}")
+        return timings
+
+    def convert_to_bundle(self, model_dir: str = "./trained_models", save_dir: str = None) -> str:
+        """
+        Convert saved .h5 + tokenizer .pkl + metadata artifacts into a bundle
+        """
+        self.load_model(model_dir)
+        return self.save_bundle(save_dir or model_dir)
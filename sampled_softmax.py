@@ -0,0 +1,89 @@
+"""
+Sampled-softmax training head shared by the LSTM trainers
+
+SampledSoftmaxLoss scores only a sample of the vocabulary per training
+step while reusing the full-softmax output layer's weights, so the model
+used for generation always carries what was trained.
+"""
+
+import tensorflow as tf
+from tensorflow.keras.layers import Dense
+
+
+class SampledSoftmaxLoss(tf.keras.layers.Layer):
+    """
+    Training-only output head that scores a sample of the vocabulary
+
+    Wraps the model's full-softmax Dense output layer and uses its kernel
+    and bias directly, so the inference model always carries the trained
+    weights. Emits per-sample loss: sampled softmax while training, exact
+    full-softmax cross-entropy during evaluation.
+    """
+
+    def __init__(self, output_layer: Dense, num_sampled: int = 512, seed: int = 42, **kwargs):
+        super().__init__(**kwargs)
+        self.output_layer = output_layer
+        self.num_sampled = min(num_sampled, output_layer.units - 1)
+        self.seed = seed
+
+    def build(self, input_shape):
+        hidden_shape, _ = input_shape
+        if not self.output_layer.built:
+            self.output_layer.build(hidden_shape)
+
+        # Candidates are drawn statelessly from (seed, step), so a restored
+        # training checkpoint continues the exact same sample sequence
+        self.sample_step = self.add_weight(name='sample_step', shape=(), dtype='int64',
+                                           initializer='zeros', trainable=False)
+        super().build(input_shape)
+
+    def _sample_candidates(self, labels):
+        """
+        Log-uniform (Zipfian) candidates, drawn with replacement, and expected counts
+        """
+        num_classes = self.output_layer.units
+        seed = tf.stack([tf.constant(self.seed, tf.int64), tf.convert_to_tensor(self.sample_step)])
+        self.sample_step.assign_add(1)
+
+        # Same distribution as tf.random.log_uniform_candidate_sampler
+        log_range = tf.math.log(tf.constant(num_classes + 1, tf.float64))
+        uniform = tf.random.stateless_uniform([self.num_sampled], seed=seed, dtype=tf.float64)
+        sampled = tf.cast(tf.floor(tf.exp(uniform * log_range)) - 1, tf.int64)
+        sampled = tf.clip_by_value(sampled, 0, num_classes - 1)
+
+        def expected_count(ids):
+            ids = tf.cast(ids, tf.float64)
+            probability = (tf.math.log(ids + 2) - tf.math.log(ids + 1)) / log_range
+            return tf.cast(self.num_sampled * probability, tf.float32)
+
+        return sampled, expected_count(labels), expected_count(sampled)
+
+    def compute_output_shape(self, input_shape):
+        return (input_shape[0][0],)
+
+    def call(self, inputs, training=None):
+        hidden, labels = inputs
+        labels = tf.cast(tf.reshape(labels, (-1, 1)), tf.int64)
+        kernel = self.output_layer.kernel
+        bias = self.output_layer.bias
+
+        if training:
+            return tf.nn.sampled_softmax_loss(
+                weights=tf.transpose(kernel),
+                biases=bias,
+                labels=labels,
+                inputs=hidden,
+                num_sampled=self.num_sampled,
+                num_classes=self.output_layer.units,
+                sampled_values=self._sample_candidates(labels)
+            )
+
+        logits = tf.matmul(hidden, kernel) + bias
+        return tf.nn.sparse_softmax_cross_entropy_with_logits(labels=labels[:, 0], logits=logits)
+
+
+def sampled_softmax_passthrough_loss(y_true, y_pred):
+    """
+    Keras loss for SampledSoftmaxLoss outputs, which already are the loss
+    """
+    return y_pred
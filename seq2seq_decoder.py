@@ -0,0 +1,168 @@
+"""
+Batched greedy and beam-search decoding for the seq2seq chatbot models
+
+Encodes a whole batch of queries in one encoder call and advances every
+decoder row together through a compiled single-step function, instead of
+one decoder_model.predict call per output token for a single query. Ids
+are turned back into words through the TokenSampler id -> word table.
+"""
+
+import numpy as np
+import tensorflow as tf
+from typing import Iterable, List
+
+from token_sampler import TokenSampler
+
+
+class Seq2SeqDecoder:
+    """
+    Greedy and vectorized beam decoding over encoder / one-step decoder models
+    """
+
+    def __init__(self, encoder_model, decoder_model, sampler: TokenSampler,
+                 start_id: int, stop_ids: Iterable[int] = (0,), max_length: int = 30):
+        self.encoder_model = encoder_model
+        self.decoder_model = decoder_model
+        self.sampler = sampler
+        self.start_id = int(start_id)
+        self.stop_ids = np.asarray(sorted(set(int(idx) for idx in stop_ids)), dtype=np.int64)
+        self.max_length = max_length
+
+        # Direct model calls, traced once per batch shape instead of predict() per token
+        self._encode = tf.function(self._encode_step, reduce_retracing=True)
+        self._decode = tf.function(self._decode_step, reduce_retracing=True)
+
+    def _encode_step(self, input_seqs):
+        return self.encoder_model(input_seqs, training=False)
+
+    def _decode_step(self, target_ids, state_h, state_c):
+        output_tokens, h, c = self.decoder_model([target_ids, state_h, state_c], training=False)
+        return output_tokens[:, -1, :], h, c
+
+    def encode(self, input_seqs: np.ndarray) -> List[np.ndarray]:
+        """
+        Encoder states [h, c] for a batch of padded input sequences
+        """
+        state_h, state_c = self._encode(tf.convert_to_tensor(np.asarray(input_seqs, dtype=np.int32)))
+        return [state_h.numpy(), state_c.numpy()]
+
+    def step(self, target_ids: np.ndarray, state_h: np.ndarray, state_c: np.ndarray):
+        """
+        One decoder step: next-token probabilities and the new states
+        """
+        probabilities, h, c = self._decode(
+            tf.convert_to_tensor(np.asarray(target_ids, dtype=np.int32).reshape(-1, 1)),
+            tf.convert_to_tensor(state_h), tf.convert_to_tensor(state_c))
+        return probabilities.numpy(), h.numpy(), c.numpy()
+
+    def greedy(self, input_seqs: np.ndarray, max_length: int = None) -> List[List[int]]:
+        """
+        Greedy ids for every query, each cut before its first stop id
+        """
+        max_length = self.max_length if max_length is None else max_length
+        state_h, state_c = self.encode(input_seqs)
+        batch_size = len(state_h)
+
+        target_ids = np.full(batch_size, self.start_id, dtype=np.int64)
+        decoded = [[] for _ in range(batch_size)]
+        active = np.ones(batch_size, dtype=bool)
+
+        for _ in range(max_length):
+            rows = np.flatnonzero(active)
+            if not len(rows):
+                break
+
+            probabilities, h, c = self.step(target_ids[rows], state_h[rows], state_c[rows])
+            sampled_ids = self.sampler.sample(probabilities, greedy=True)
+
+            # Rows that produced a stop id drop out of the batch
+            stopped = np.isin(sampled_ids, self.stop_ids)
+            for row, sampled_id, stop in zip(rows, sampled_ids, stopped):
+                if not stop:
+                    decoded[row].append(int(sampled_id))
+            active[rows[stopped]] = False
+
+            target_ids[rows] = sampled_ids
+            state_h[rows], state_c[rows] = h, c
+
+        return decoded
+
+    def beam_search(self, input_seqs: np.ndarray, beam_width: int = 4,
+                    length_penalty: float = 0.6, max_length: int = None) -> List[List[int]]:
+        """
+        Best beam-search ids for every query, all beams stepped as one batch
+
+        Hypotheses are ranked by log-probability / ((5 + length) / 6) ** length_penalty,
+        so length_penalty=0 compares raw log-probabilities. A hypothesis
+        ends when it produces a stop id, which is not part of its output.
+        """
+        max_length = self.max_length if max_length is None else max_length
+        state_h, state_c = self.encode(input_seqs)
+        batch_size = len(state_h)
+        vocab_size = len(self.sampler.id_to_word)
+        beam_width = max(1, min(beam_width, vocab_size))
+
+        # Row-major [batch, beam] layout flattened to batch * beam decoder rows
+        state_h = np.repeat(state_h, beam_width, axis=0)
+        state_c = np.repeat(state_c, beam_width, axis=0)
+        target_ids = np.full(batch_size * beam_width, self.start_id, dtype=np.int64)
+
+        # Only the first beam is live at the start, so the first step doesn't pick duplicates
+        scores = np.full((batch_size, beam_width), -np.inf)
+        scores[:, 0] = 0.0
+        lengths = np.zeros((batch_size, beam_width), dtype=np.int64)
+        finished = np.zeros((batch_size, beam_width), dtype=bool)
+        history = np.zeros((batch_size, beam_width, max_length), dtype=np.int64)
+
+        is_stop = np.zeros(vocab_size, dtype=bool)
+        is_stop[self.stop_ids[self.stop_ids < vocab_size]] = True
+        batch_index = np.arange(batch_size)[:, None]
+
+        for t in range(max_length):
+            if finished.all():
+                break
+
+            probabilities, h, c = self.step(target_ids, state_h, state_c)
+            log_probs = np.log(probabilities.reshape(batch_size, beam_width, vocab_size) + 1e-10)
+
+            # A finished hypothesis carries over unchanged through a single padding continuation
+            log_probs[finished] = -np.inf
+            log_probs[finished, 0] = 0.0
+
+            candidate_scores = (scores[:, :, None] + log_probs).reshape(batch_size, -1)
+            grows = ~finished[:, :, None] & ~is_stop[None, None, :]
+            candidate_lengths = (lengths[:, :, None] + grows).reshape(batch_size, -1)
+            ranking = candidate_scores / ((5.0 + candidate_lengths) / 6.0) ** length_penalty
+
+            # Top beam_width candidates per query, best first
+            best = np.argpartition(-ranking, beam_width - 1, axis=1)[:, :beam_width]
+            best = np.take_along_axis(best, np.argsort(-np.take_along_axis(ranking, best, axis=1), axis=1), axis=1)
+            parents, token_ids = np.divmod(best, vocab_size)
+
+            parent_finished = finished[batch_index, parents]
+            stopped = ~parent_finished & is_stop[token_ids]
+            grown = ~parent_finished & ~stopped
+
+            scores = np.take_along_axis(candidate_scores, best, axis=1)
+            lengths = lengths[batch_index, parents] + grown
+            finished = parent_finished | stopped
+            history = history[batch_index, parents]
+            history[:, :, t] = np.where(grown, token_ids, 0)
+
+            flat_parents = (parents + batch_index * beam_width).ravel()
+            state_h, state_c = h[flat_parents], c[flat_parents]
+            target_ids = token_ids.ravel()
+
+        # Beams stay sorted by their ranking, so beam 0 is each query's best hypothesis
+        return [history[row, 0, :lengths[row, 0]].tolist() for row in range(batch_size)]
+
+    def decode(self, input_seqs: np.ndarray, beam_width: int = 1,
+               length_penalty: float = 0.6, max_length: int = None) -> List[str]:
+        """
+        Response strings for a batch of queries (greedy for beam_width=1)
+        """
+        if beam_width > 1:
+            decoded = self.beam_search(input_seqs, beam_width, length_penalty, max_length)
+        else:
+            decoded = self.greedy(input_seqs, max_length)
+        return [' '.join(self.sampler.words(np.asarray(ids, dtype=np.int64))).strip() for ids in decoded]
@@ -0,0 +1,82 @@
+"""
+Streaming text cleanup and JSONL storage shared by the LSTM trainers
+
+Texts are cleaned chunk by chunk, optionally in a process pool, and can
+be written to and read back from JSONL files as they stream, so corpora
+larger than memory never have to be held as one list.
+"""
+
+import hashlib
+import itertools
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional
+
+
+def stream_cleaned_texts(texts: Iterable,
+                         clean_chunk: Callable[[List], List[Optional[str]]],
+                         num_workers: int = None,
+                         chunk_size: int = 512) -> Iterator[str]:
+    """
+    Clean texts chunk by chunk, yielding them in input order without rejects or duplicates
+
+    Chunks are cleaned in a process pool (num_workers=1 cleans in this
+    process). At most two chunks per worker are in flight, so memory use
+    does not grow with the input; only a 16-byte digest is kept per
+    unique text for deduplication.
+    """
+    texts = iter(texts)
+    chunks = iter(lambda: list(itertools.islice(texts, chunk_size)), [])
+
+    def cleaned_chunks():
+        if num_workers == 1:
+            yield from map(clean_chunk, chunks)
+            return
+
+        max_in_flight = 2 * (num_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            in_flight = deque()
+            for chunk in chunks:
+                in_flight.append(executor.submit(clean_chunk, chunk))
+                if len(in_flight) >= max_in_flight:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+
+    seen = set()
+    for cleaned in cleaned_chunks():
+        for text in cleaned:
+            if text is None:
+                continue
+            text_hash = hashlib.md5(text.encode()).digest()
+            if text_hash not in seen:
+                seen.add(text_hash)
+                yield text
+
+
+def write_jsonl_texts(texts: Iterable[str], output_path: str) -> int:
+    """
+    Write texts as {"text": ...} lines as they arrive; returns the count
+    """
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for text in texts:
+            f.write(json.dumps({'text': text}) + '\n')
+            count += 1
+            if count % 100000 == 0:
+                print(f"  {count} texts written...")
+    return count
+
+
+def read_jsonl_texts(input_path: str) -> Iterator[str]:
+    """
+    Stream texts back from a file written by write_jsonl_texts
+    """
+    with open(input_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)['text']
@@ -0,0 +1,144 @@
+"""
+Memory-mapped token corpus shared by the LSTM trainers
+
+Texts are tokenized once into a flat token file plus per-text offsets;
+training windows are streamed from it as tf.data batches instead of
+being materialized as one large n-gram array.
+"""
+
+import itertools
+import json
+import os
+import random
+from typing import List
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.preprocessing.text import Tokenizer
+
+from fast_tokenizer import FastTokenizer
+
+
+class TokenCorpus:
+    """
+    Pre-tokenized corpus stored as one flat token file plus paragraph offsets
+
+    The token file is memory-mapped and training windows are sliding-window
+    views into it, so only the batch being trained on is ever copied out.
+    """
+
+    TOKENS_FILE = "tokens.bin"
+    OFFSETS_FILE = "offsets.npy"
+    META_FILE = "corpus.json"
+
+    def __init__(self, corpus_dir: str):
+        self.corpus_dir = corpus_dir
+
+        with open(os.path.join(corpus_dir, self.META_FILE), 'r') as f:
+            self.metadata = json.load(f)
+
+        self.tokens = np.memmap(os.path.join(corpus_dir, self.TOKENS_FILE),
+                                dtype=self.metadata['dtype'], mode='r')
+        self.offsets = np.load(os.path.join(corpus_dir, self.OFFSETS_FILE))
+
+    @classmethod
+    def build(cls, texts: List[str], tokenizer: Tokenizer, corpus_dir: str) -> 'TokenCorpus':
+        """
+        Tokenize texts once and write them as a flat token file
+        """
+        os.makedirs(corpus_dir, exist_ok=True)
+
+        # Smallest unsigned type that holds every id the tokenizer can emit
+        max_id = tokenizer.num_words or (len(tokenizer.word_index) + 1)
+        dtype = np.uint16 if max_id <= np.iinfo(np.uint16).max + 1 else np.uint32
+
+        fast_tokenizer = FastTokenizer.from_keras(tokenizer)
+        offsets = [0]
+        with open(os.path.join(corpus_dir, cls.TOKENS_FILE), 'wb') as f:
+            for text in texts:
+                token_list = np.asarray(fast_tokenizer.encode(text), dtype=dtype)
+                f.write(token_list.tobytes())
+                offsets.append(offsets[-1] + len(token_list))
+
+        np.save(os.path.join(corpus_dir, cls.OFFSETS_FILE), np.asarray(offsets, dtype=np.int64))
+
+        metadata = {
+            'dtype': np.dtype(dtype).name,
+            'num_texts': len(offsets) - 1,
+            'num_tokens': offsets[-1]
+        }
+        with open(os.path.join(corpus_dir, cls.META_FILE), 'w') as f:
+            json.dump(metadata, f, indent=2)
+
+        print(f"Token corpus written to {corpus_dir}: {metadata['num_tokens']} tokens "
+              f"from {metadata['num_texts']} texts ({metadata['dtype']})")
+        return cls(corpus_dir)
+
+    @property
+    def num_texts(self) -> int:
+        return len(self.offsets) - 1
+
+    def window_starts(self, seq_length: int, text_ids: np.ndarray = None) -> np.ndarray:
+        """
+        Flat start positions of every (seq_length + 1)-token window
+
+        Windows never cross a text boundary, matching the overlapping
+        n-grams the trainers build in memory.
+        """
+        if text_ids is None:
+            text_ids = np.arange(self.num_texts)
+
+        text_starts = self.offsets[text_ids]
+        counts = np.maximum(self.offsets[text_ids + 1] - text_starts - seq_length, 0)
+
+        # Text start repeated per window, plus the window's position in its text
+        total = int(counts.sum())
+        first_window = np.cumsum(counts) - counts
+        positions = np.arange(total) - np.repeat(first_window, counts)
+        return np.repeat(text_starts, counts) + positions
+
+    def to_dataset(self, seq_length: int, batch_size: int = 128,
+                   text_ids: np.ndarray = None, shuffle: bool = True,
+                   seed: int = None, first_epoch: int = 0) -> tf.data.Dataset:
+        """
+        Stream (X, y) batches of windows straight from the memory-mapped tokens
+
+        Each pass is shuffled from seed and its epoch number (counting from
+        first_epoch), so a resumed run sees the same order as an
+        uninterrupted one.
+        """
+        starts = self.window_starts(seq_length, text_ids)
+        windows = np.lib.stride_tricks.sliding_window_view(self.tokens, seq_length + 1)
+
+        def gather_windows(batch_starts):
+            batch = windows[batch_starts].astype(np.int32)
+            return batch[:, :-1], batch[:, -1]
+
+        def fetch_batch(batch_starts):
+            X, y = tf.numpy_function(gather_windows, [batch_starts], (tf.int32, tf.int32))
+            X.set_shape([None, seq_length])
+            y.set_shape([None])
+            return X, y
+
+        if shuffle:
+            if seed is None:
+                seed = random.randrange(2 ** 31)
+            epoch_numbers = itertools.count(first_epoch)
+
+            def next_epoch():
+                return np.int64(next(epoch_numbers))
+
+            def epoch_order(epoch):
+                return np.random.default_rng([seed, int(epoch)]).permutation(starts).astype(np.int64)
+
+            # Every new iterator (one per Keras epoch) draws the next epoch number
+            dataset = tf.data.Dataset.from_tensors(np.int64(0))
+            dataset = dataset.map(lambda _: tf.numpy_function(next_epoch, [], tf.int64))
+            dataset = dataset.flat_map(lambda epoch: tf.data.Dataset.from_tensor_slices(
+                tf.numpy_function(epoch_order, [epoch], tf.int64)))
+        else:
+            dataset = tf.data.Dataset.from_tensor_slices(starts)
+
+        dataset = dataset.batch(batch_size)
+        dataset = dataset.map(fetch_batch, num_parallel_calls=tf.data.AUTOTUNE)
+        return dataset.prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,134 @@
+"""
+Shared next-token sampler for the LSTM and seq2seq generators
+
+Turns rows of next-word probabilities into word ids (greedy, temperature,
+top-k and top-p) and maps ids back to words through a precomputed table,
+instead of scanning tokenizer.word_index for every generated word.
+"""
+
+import numpy as np
+from typing import Dict, List, Sequence, Union
+
+
+class TokenSampler:
+    """
+    Vectorized greedy / temperature / top-k / top-p sampler over probability rows
+    """
+
+    def __init__(self, index_word: Dict[int, str], vocab_size: int = None, seed: int = None):
+        if vocab_size is None:
+            vocab_size = max(index_word, default=0) + 1
+
+        # Reverse vocabulary table: id -> word, '' for padding and unknown ids
+        self.id_to_word = np.full(vocab_size, '', dtype=object)
+        for idx, word in index_word.items():
+            if 0 < idx < vocab_size:
+                self.id_to_word[idx] = word
+
+        self.rng = np.random.default_rng(seed)
+        self._buffer = None
+
+    @classmethod
+    def from_tokenizer(cls, tokenizer, vocab_size: int = None, seed: int = None) -> 'TokenSampler':
+        """
+        Build a sampler from a fitted Keras Tokenizer
+        """
+        index_word = {idx: word for word, idx in tokenizer.word_index.items()}
+        return cls(index_word, vocab_size=vocab_size, seed=seed)
+
+    def reseed(self, seed: int = None):
+        """
+        Restart the random stream, e.g. for reproducible generation
+        """
+        self.rng = np.random.default_rng(seed)
+
+    def _work_buffer(self, shape) -> np.ndarray:
+        # Reused across calls so generation loops don't allocate a vocab-sized array per token
+        if self._buffer is None or self._buffer.shape != shape:
+            self._buffer = np.empty(shape, dtype=np.float64)
+        return self._buffer
+
+    def sample(self, probabilities: np.ndarray,
+               temperature: Union[float, np.ndarray] = 1.0,
+               top_k: int = 0,
+               top_p: float = 1.0,
+               min_prob: float = 0.0,
+               greedy: bool = False,
+               rng: Union[np.random.Generator, Sequence[np.random.Generator]] = None) -> np.ndarray:
+        """
+        Pick one id per probability row
+
+        temperature may be a scalar or one value per row; rows with a
+        temperature <= 0 are sampled from the unscaled distribution, as the
+        generators always did. top_k=0 and top_p=1.0 disable those filters.
+        min_prob drops candidates whose tempered probability is below it
+        (the most likely candidate is always kept). rng overrides the
+        sampler's own random stream for this call: one Generator for all
+        rows, or one per row so each row's draws don't depend on the others.
+        """
+        probabilities = np.atleast_2d(probabilities)
+        batch_size, vocab_size = probabilities.shape
+
+        if greedy:
+            return np.argmax(probabilities, axis=1)
+
+        # Log-probabilities scaled by each row's temperature
+        logits = self._work_buffer((batch_size, vocab_size))
+        np.add(probabilities, 1e-10, out=logits)
+        np.log(logits, out=logits)
+
+        temperature = np.broadcast_to(np.asarray(temperature, dtype=np.float64), (batch_size,))
+        scale = np.where(temperature > 0, temperature, 1.0)
+        logits /= scale[:, None]
+
+        # Candidate set: top-k by partial partition, otherwise the whole vocabulary
+        if 0 < top_k < vocab_size:
+            candidates = np.argpartition(logits, vocab_size - top_k, axis=1)[:, vocab_size - top_k:]
+        else:
+            candidates = np.broadcast_to(np.arange(vocab_size), (batch_size, vocab_size))
+        candidate_logits = np.take_along_axis(logits, candidates, axis=1)
+
+        # Nucleus filtering needs candidates sorted by probability
+        if top_p < 1.0:
+            order = np.argsort(-candidate_logits, axis=1)
+            candidates = np.take_along_axis(candidates, order, axis=1)
+            candidate_logits = np.take_along_axis(candidate_logits, order, axis=1)
+
+        # Softmax over the candidates only
+        candidate_probs = np.exp(candidate_logits - candidate_logits.max(axis=1, keepdims=True))
+        candidate_probs /= candidate_probs.sum(axis=1, keepdims=True)
+
+        keep = np.ones_like(candidate_probs, dtype=bool)
+        if top_p < 1.0:
+            # Keep the smallest prefix whose mass reaches top_p
+            cumulative = np.cumsum(candidate_probs, axis=1)
+            keep &= (cumulative - candidate_probs) < top_p
+        if min_prob > 0:
+            keep &= candidate_probs >= min_prob
+        keep[np.arange(batch_size), np.argmax(candidate_probs, axis=1)] = True
+        candidate_probs = np.where(keep, candidate_probs, 0.0)
+
+        # Inverse-CDF sampling on every row at once
+        cumulative = np.cumsum(candidate_probs, axis=1)
+        if rng is None or isinstance(rng, np.random.Generator):
+            uniforms = (self.rng if rng is None else rng).random(batch_size)
+        else:
+            uniforms = np.array([row_rng.random() for row_rng in rng])
+        draws = uniforms * cumulative[:, -1]
+        positions = np.minimum((cumulative <= draws[:, None]).sum(axis=1), candidates.shape[1] - 1)
+
+        return candidates[np.arange(batch_size), positions]
+
+    def words(self, ids: np.ndarray) -> List[str]:
+        """
+        Map ids to words; padding and unknown ids map to ''
+        """
+        ids = np.asarray(ids)
+        in_range = (ids >= 0) & (ids < len(self.id_to_word))
+        return np.where(in_range, self.id_to_word[np.where(in_range, ids, 0)], '').tolist()
+
+    def word(self, idx: int) -> str:
+        """
+        Map a single id to its word
+        """
+        return self.words([idx])[0]
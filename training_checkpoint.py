@@ -0,0 +1,253 @@
+"""
+Resumable full training checkpoints shared by the LSTM trainers
+
+TrainingCheckpoint is a Keras callback that periodically saves the
+model and optimizer variables, the history, the tracked callbacks'
+state and the RNG states, so an interrupted fit can continue where it
+stopped. CheckpointedTrainingMixin is the fit / resume / seeding logic
+both trainers run it with, so that behaviour lives in one place.
+"""
+
+import json
+import os
+import random
+import shutil
+
+from typing import Tuple
+
+import numpy as np
+import tensorflow as tf
+
+from token_corpus import TokenCorpus
+
+
+class TrainingCheckpoint(tf.keras.callbacks.Callback):
+    """
+    Periodic full training checkpoint, so an interrupted run can resume
+
+    Saves every model variable (weights and dropout seed state), the
+    optimizer variables (slots, step count, learning rate), the epoch to
+    resume from, the history so far, the state of the other callbacks
+    (EarlyStopping / ReduceLROnPlateau / ModelCheckpoint counters and
+    bests) and the Python / NumPy / TensorFlow RNG states, which restore
+    puts back so a resumed run continues the same random streams. Place it
+    after the callbacks whose state it tracks.
+    """
+
+    STATE_FILE = "state.json"
+    ARRAYS_FILE = "arrays.npz"
+    CALLBACK_ATTRIBUTES = ('wait', 'best', 'best_epoch', 'stopped_epoch', 'cooldown_counter')
+
+    def __init__(self, checkpoint_dir: str, tracked_callbacks: list,
+                 every_n_epochs: int = 1, seed: int = 42):
+        super().__init__()
+        self.checkpoint_dir = checkpoint_dir
+        self.tracked_callbacks = tracked_callbacks
+        self.every_n_epochs = every_n_epochs
+        self.seed = seed
+        self.history = {}
+        self._pending_callback_state = None
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.checkpoint_dir, self.STATE_FILE))
+
+    def saved_epoch(self) -> int:
+        """
+        Epoch a resumed run starts from; 0 when there is no checkpoint
+        """
+        if not self.exists():
+            return 0
+        with open(os.path.join(self.checkpoint_dir, self.STATE_FILE), 'r') as f:
+            return json.load(f)['next_epoch']
+
+    def on_train_begin(self, logs=None):
+        # The tracked callbacks reset themselves in their own on_train_begin
+        if self._pending_callback_state is not None:
+            callback_states, best_weights = self._pending_callback_state
+            for callback, state in zip(self.tracked_callbacks, callback_states):
+                for name, value in state.items():
+                    setattr(callback, name, value)
+                if id(callback) in best_weights:
+                    callback.best_weights = best_weights[id(callback)]
+            self._pending_callback_state = None
+
+    def on_epoch_end(self, epoch, logs=None):
+        for name, value in (logs or {}).items():
+            self.history.setdefault(name, []).append(float(value))
+        if (epoch + 1) % self.every_n_epochs == 0:
+            self.save(epoch + 1)
+
+    def save(self, next_epoch: int):
+        """
+        Write the checkpoint to a temporary directory, then swap it in
+        """
+        arrays = {}
+        for i, variable in enumerate(self.model.variables):
+            arrays[f'model_{i}'] = np.asarray(variable)
+        for i, variable in enumerate(self.model.optimizer.variables):
+            arrays[f'optimizer_{i}'] = np.asarray(variable)
+
+        callback_states = []
+        for c, callback in enumerate(self.tracked_callbacks):
+            state = {}
+            for name in self.CALLBACK_ATTRIBUTES:
+                value = getattr(callback, name, None)
+                if isinstance(value, (int, float, np.number)):
+                    state[name] = value.item() if isinstance(value, np.number) else value
+            callback_states.append(state)
+
+            for i, weight in enumerate(getattr(callback, 'best_weights', None) or []):
+                arrays[f'callback_{c}_best_{i}'] = np.asarray(weight)
+
+        numpy_state = np.random.get_state()
+        arrays['numpy_rng_keys'] = numpy_state[1]
+        arrays['tf_rng_state'] = tf.random.get_global_generator().state.numpy()
+
+        python_state = random.getstate()
+        state = {
+            'next_epoch': next_epoch,
+            'seed': self.seed,
+            'history': self.history,
+            'callbacks': callback_states,
+            'num_model_variables': len(self.model.variables),
+            'num_optimizer_variables': len(self.model.optimizer.variables),
+            'python_rng': [python_state[0], list(python_state[1]), python_state[2]],
+            'numpy_rng': [numpy_state[0], int(numpy_state[2]), int(numpy_state[3]), float(numpy_state[4])]
+        }
+
+        temp_dir = self.checkpoint_dir + ".tmp"
+        old_dir = self.checkpoint_dir + ".old"
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        os.makedirs(temp_dir)
+        np.savez(os.path.join(temp_dir, self.ARRAYS_FILE), **arrays)
+        with open(os.path.join(temp_dir, self.STATE_FILE), 'w') as f:
+            json.dump(state, f)
+
+        # Keep the previous checkpoint until the new one is fully in place
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(self.checkpoint_dir):
+            os.replace(self.checkpoint_dir, old_dir)
+        os.replace(temp_dir, self.checkpoint_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def restore(self, model: tf.keras.Model) -> int:
+        """
+        Load the checkpoint into a compiled model; returns the epoch to resume from
+        """
+        with open(os.path.join(self.checkpoint_dir, self.STATE_FILE), 'r') as f:
+            state = json.load(f)
+
+        # Slots only exist once the optimizer is built
+        model.optimizer.build(model.trainable_variables)
+        if (len(model.variables) != state['num_model_variables'] or
+                len(model.optimizer.variables) != state['num_optimizer_variables']):
+            raise ValueError(f"Checkpoint in {self.checkpoint_dir} does not match the current model")
+
+        with np.load(os.path.join(self.checkpoint_dir, self.ARRAYS_FILE)) as arrays:
+            for i, variable in enumerate(model.variables):
+                variable.assign(arrays[f'model_{i}'])
+            for i, variable in enumerate(model.optimizer.variables):
+                variable.assign(arrays[f'optimizer_{i}'])
+
+            best_weights = {}
+            for c, callback in enumerate(self.tracked_callbacks):
+                weights = [arrays[key] for key in sorted(
+                    (key for key in arrays.files if key.startswith(f'callback_{c}_best_')),
+                    key=lambda key: int(key.rsplit('_', 1)[1]))]
+                if weights:
+                    best_weights[id(callback)] = weights
+
+            numpy_rng_keys = arrays['numpy_rng_keys']
+            tf.random.get_global_generator().reset(arrays['tf_rng_state'])
+
+        python_rng = state['python_rng']
+        random.setstate((python_rng[0], tuple(python_rng[1]), python_rng[2]))
+        numpy_rng = state['numpy_rng']
+        np.random.set_state((numpy_rng[0], numpy_rng_keys, *numpy_rng[1:]))
+
+        self.seed = state['seed']
+        self.history = state['history']
+        self._pending_callback_state = (state['callbacks'], best_weights)
+
+        print(f"Resuming from checkpoint in {self.checkpoint_dir} at epoch {state['next_epoch'] + 1}")
+        return state['next_epoch']
+
+
+class CheckpointedTrainingMixin:
+    """
+    fit with optional checkpoint / resume for a trainer with model, training_model and max_sequence_len
+    """
+
+    def _fit(self, fit_model: tf.keras.Model, callbacks: list,
+             checkpoint_dir: str = None, resume: bool = False,
+             extra_callbacks: list = None, **fit_kwargs) -> dict:
+        """
+        Run fit, with periodic full checkpoints when checkpoint_dir is set
+
+        With resume=True and a checkpoint present, training continues from
+        the checkpointed epoch and the returned history covers the whole run.
+        """
+        checkpoint = None
+        initial_epoch = 0
+        if checkpoint_dir:
+            checkpoint = TrainingCheckpoint(checkpoint_dir, list(callbacks))
+            if resume and checkpoint.exists():
+                # Variables must exist before they can be restored
+                if not fit_model.built:
+                    fit_model.build((None, self.max_sequence_len - 1))
+                initial_epoch = checkpoint.restore(fit_model)
+            else:
+                # Seed fresh runs once; a resumed run keeps the RNG states restore put back
+                tf.keras.utils.set_random_seed(checkpoint.seed)
+            callbacks = callbacks + [checkpoint]
+
+        if extra_callbacks:
+            callbacks = callbacks + list(extra_callbacks)
+
+        history = fit_model.fit(callbacks=callbacks, initial_epoch=initial_epoch, **fit_kwargs)
+        return checkpoint.history if checkpoint else history.history
+
+    def _fit_datasets(self, train_dataset: tf.data.Dataset, val_dataset: tf.data.Dataset,
+                      callbacks: list, epochs: int, checkpoint_dir: str = None,
+                      resume: bool = False, extra_callbacks: list = None) -> dict:
+        """
+        _fit on streaming (X, y) datasets, feeding labels to a sampled-softmax head if there is one
+        """
+        if self.training_model is not None:
+            # Labels are also a model input for the sampled-softmax head
+            def with_label_input(X, y):
+                return (X, tf.reshape(y, (-1, 1))), y
+
+            fit_model = self.training_model
+            train_dataset = train_dataset.map(with_label_input)
+            val_dataset = val_dataset.map(with_label_input)
+        else:
+            fit_model = self.model
+
+        return self._fit(
+            fit_model, callbacks, checkpoint_dir, resume, extra_callbacks,
+            x=train_dataset,
+            epochs=epochs,
+            validation_data=val_dataset,
+            verbose=1
+        )
+
+    def _split_corpus_datasets(self, corpus: TokenCorpus, batch_size: int, validation_split: float,
+                               seed: int, first_epoch: int) -> Tuple[tf.data.Dataset, tf.data.Dataset]:
+        """
+        Seeded split of a token corpus by text into streaming train/validation datasets
+        """
+        seq_length = self.max_sequence_len - 1
+
+        # Hold out whole texts so no validation window overlaps a training one
+        text_ids = np.random.default_rng(seed).permutation(corpus.num_texts)
+        num_val = int(round(corpus.num_texts * validation_split))
+        val_ids, train_ids = np.sort(text_ids[:num_val]), np.sort(text_ids[num_val:])
+
+        train_dataset = corpus.to_dataset(seq_length, batch_size, train_ids, shuffle=True,
+                                          seed=seed, first_epoch=first_epoch)
+        val_dataset = corpus.to_dataset(seq_length, batch_size, val_ids, shuffle=False)
+
+        print(f"Training windows: {len(corpus.window_starts(seq_length, train_ids))}, "
+              f"validation windows: {len(corpus.window_starts(seq_length, val_ids))}")
+        return train_dataset, val_dataset